@@ -1,7 +1,42 @@
-from flask import Flask, request, jsonify, send_file
+import time
+
+# Import-to-ready time is measured from here (see create_app()).
+_import_started = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import mysql.connector
+import base64
+import hashlib
+import importlib.util
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from cache import PersistentLRUCache, SizedLRUCache, TTLCache, estimate_size
+from db_pool import ConnectionPool, PoolTimeout
+from fastpath import match_question, render_sql
+from metrics import (
+    LLM_TOKENS,
+    QUERY_SOURCES,
+    REGISTRY,
+    REQUEST_SECONDS,
+    RESPONSE_BYTES,
+    RESULT_ROWS,
+    STAGE_SECONDS,
+    CallbackMetric,
+    annotate,
+    end_trace,
+    span,
+    start_trace,
+)
+from query_guard import QueryRejected, estimate_rows_examined, summarize_plan, with_limit
+from questions import KEY_VERSION as QUESTION_KEY_VERSION, build_asset_aliases, normalize_question
+from serialization import COMPRESSIBLE_MIMETYPES, choose_encoding, compress, dumps, to_columnar
+from singleflight import SingleFlight
+from static_assets import AssetBundle, etag_for, select_variant
 
 # Optional: load .env automatically if python-dotenv is installed
 try:
@@ -11,11 +46,11 @@ try:
 except ImportError:
     pass
 
-# --- LLM imports / setup (Claude) ---
-try:
-    from anthropic import Anthropic
-except ImportError:
-    Anthropic = None  # We'll handle this gracefully below
+# numpy (the in-memory series store) and anthropic are slow to import, so
+# both are imported on first use or during warm-up; see get_timeseries()
+# and get_anthropic_client().
+timeseries = None
+_timeseries_checked = False
 
 APP_VERSION = "v11-llm-env-vars"
 
@@ -42,14 +77,10 @@ CORS(
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 ANTHROPIC_MODEL = os.environ.get("ANTHROPIC_MODEL", "claude-haiku-4-5-20251001")
 
-anthropic_client = (
-    Anthropic(api_key=ANTHROPIC_API_KEY) if (Anthropic and ANTHROPIC_API_KEY) else None
-)
-
-print("DEBUG Anthropic imported?:", bool(Anthropic))
-print("DEBUG API key present?:", bool(ANTHROPIC_API_KEY))
-print("DEBUG anthropic_client created?:", bool(anthropic_client))
-print("DEBUG model:", ANTHROPIC_MODEL)
+# Built by get_anthropic_client(); benchmarks may assign a stand-in.
+anthropic_client = None
+_anthropic_checked = False
+_anthropic_lock = threading.Lock()
 
 # Database configuration from env
 DB_CONFIG = {
@@ -60,23 +91,168 @@ DB_CONFIG = {
     "database": os.environ.get("MYSQL_DATABASE", "market_data"),
 }
 
+# Where reads are served from: "mysql" (default), or an embedded "sqlite" or
+# "duckdb" file built by `load_data.py --embedded` at EMBEDDED_DB_PATH.
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql").lower()
+SQL_DIALECTS = {"mysql": "MySQL", "sqlite": "SQLite", "duckdb": "DuckDB"}
+if DB_BACKEND not in SQL_DIALECTS:
+    raise ValueError(f"DB_BACKEND must be one of: {', '.join(SQL_DIALECTS)}")
+SQL_DIALECT = SQL_DIALECTS[DB_BACKEND]
+
+# Connection pool settings (shared by every route)
+POOL_CONFIG = {
+    "size": int(os.environ.get("MYSQL_POOL_SIZE", "5")),
+    "max_overflow": int(os.environ.get("MYSQL_POOL_MAX_OVERFLOW", "10")),
+    "recycle": int(os.environ.get("MYSQL_POOL_RECYCLE", "1800")),
+    "pre_ping": os.environ.get("MYSQL_POOL_PRE_PING", "true").lower()
+    in ("1", "true", "yes"),
+    "timeout": float(os.environ.get("MYSQL_POOL_TIMEOUT", "10")),
+}
+
+# Server-side time limit for every statement run on a pooled connection (0 = off).
+QUERY_MAX_EXECUTION_MS = int(os.environ.get("QUERY_MAX_EXECUTION_MS", "10000"))
+
+
+def _connect_mysql():
+    conn = mysql.connector.connect(**DB_CONFIG)
+    if QUERY_MAX_EXECUTION_MS:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET SESSION MAX_EXECUTION_TIME = %s", (QUERY_MAX_EXECUTION_MS,))
+        except mysql.connector.Error as e:
+            print(f"WARNING: could not set MAX_EXECUTION_TIME: {e}")
+        finally:
+            cursor.close()
+    return conn
+
+
+if DB_BACKEND == "mysql":
+    db_pool = ConnectionPool(_connect_mysql, **POOL_CONFIG)
+else:
+    EMBEDDED_DB_PATH = os.environ.get("EMBEDDED_DB_PATH") or (
+        "market_data.duckdb" if DB_BACKEND == "duckdb" else "market_data.sqlite"
+    )
+
+    def _connect_embedded():
+        # Imported on first connect, so importing the app loads no backend code
+        import embedded_db
+
+        return embedded_db.connect(EMBEDDED_DB_PATH, DB_BACKEND)
+
+    # Pre-ping also notices when load_data.py has replaced the file.
+    db_pool = ConnectionPool(_connect_embedded, **POOL_CONFIG)
+
 
 def get_db_connection():
-    """Create and return a database connection."""
+    """Borrow a pooled database connection; close() returns it to the pool."""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn
-    except mysql.connector.Error as e:
+        with span("db_connect"):
+            return db_pool.get_connection()
+    except (mysql.connector.Error, PoolTimeout) as e:
         print(f"Database connection error: {e}")
         return None
 
 
+# Admin endpoints (cache invalidation). When unset, only localhost may call them.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# The Asset table rarely changes, so the list shown to the LLM is cached.
+ASSET_CACHE_TTL = int(os.environ.get("ASSET_CACHE_TTL", "3600"))
+asset_cache = TTLCache(ttl=ASSET_CACHE_TTL)
+
+# Answer common questions (latest price, price on a date, min/max/avg over a
+# range, two-symbol comparison) from fixed SQL templates without the LLM.
+FASTPATH_ENABLED = os.environ.get("FASTPATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Question -> SQL cache, persisted to disk so it survives restarts. Entries
+# written by another model or app version are discarded on load.
+SQL_CACHE_ENABLED = os.environ.get("SQL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SQL_CACHE_PATH = os.environ.get("SQL_CACHE_PATH", os.path.join(".cache", "sql_cache.json"))
+SQL_CACHE_MAX_ENTRIES = int(os.environ.get("SQL_CACHE_MAX_ENTRIES", "1000"))
+question_cache = PersistentLRUCache(
+    SQL_CACHE_PATH,
+    max_entries=SQL_CACHE_MAX_ENTRIES,
+    namespace=f"{APP_VERSION}|{ANTHROPIC_MODEL}|{DB_BACKEND}|q{QUESTION_KEY_VERSION}",
+)
+
+# Query results, keyed on normalized SQL plus the data version that
+# load_data.py bumps on every load, so a load invalidates exactly.
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+result_cache = SizedLRUCache(max_bytes=RESULT_CACHE_MAX_BYTES)
+_result_cache_version = None
+# The version itself is re-read at most every DATA_VERSION_TTL seconds, so a
+# result cache hit needs no database round-trip; load_data.py drops it
+# through the invalidation endpoint after a load.
+DATA_VERSION_TTL = float(os.environ.get("DATA_VERSION_TTL", "5"))
+data_version_cache = TTLCache(ttl=DATA_VERSION_TTL)
+
+# Hard cap on rows returned by /api/query (JSON, paginated and streamed).
+MAX_RESULT_ROWS = int(os.environ.get("MAX_RESULT_ROWS", "10000"))
+# Rows fetched from the server-side cursor per NDJSON chunk when streaming.
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", "500"))
+# /api/query result layouts: "rows" (list of objects) or "columnar" (column
+# names once, one value array per column).
+RESPONSE_FORMATS = ("rows", "columnar")
+
+# gzip/brotli for JSON responses of at least COMPRESS_MIN_BYTES, when the
+# client accepts it.
+COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+
+# EXPLAIN-based cost guard: queries estimated to examine more rows than the
+# budget are rejected, or wrapped in a LIMIT when the action is "limit".
+# The estimate reads MySQL's EXPLAIN output, so embedded backends skip it.
+QUERY_GUARD_ENABLED = (
+    os.environ.get("QUERY_GUARD_ENABLED", "true").lower() in ("1", "true", "yes")
+    and DB_BACKEND == "mysql"
+)
+QUERY_ROW_BUDGET = int(os.environ.get("QUERY_ROW_BUDGET", "2000000"))
+QUERY_OVER_BUDGET_ACTION = os.environ.get("QUERY_OVER_BUDGET_ACTION", "reject").lower()
+QUERY_AUTO_LIMIT = int(os.environ.get("QUERY_AUTO_LIMIT", str(MAX_RESULT_ROWS + 1)))
+
+# In-memory copy of DailyMarketData behind /api/series and /api/analytics. It
+# is rebuilt when load_data.py drops the cached data version, when the
+# version (re-read every DATA_VERSION_TTL seconds) changes, or after
+# SERIES_REFRESH_SECONDS when the version can't be read.
+SERIES_REFRESH_SECONDS = int(os.environ.get("SERIES_REFRESH_SECONDS", "300"))
+SERIES_MAX_WINDOW = 1000
+_series_store = None
+_series_built_at = 0.0
+_series_lock = threading.Lock()
+
+# Concurrent requests for the same question (LLM stage) or the same SQL
+# (execution stage) wait for one shared call instead of each making their own.
+SINGLEFLIGHT_ENABLED = os.environ.get("SINGLEFLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+llm_flight = SingleFlight()
+query_flight = SingleFlight()
+
+# At most LLM_MAX_CONCURRENCY Anthropic calls are in flight at once, across
+# all requests. /api/query/batch answers up to BATCH_MAX_QUESTIONS questions
+# per request on BATCH_WORKERS shared threads.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+llm_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+BATCH_MAX_QUESTIONS = int(os.environ.get("BATCH_MAX_QUESTIONS", "50"))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "8"))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+# The static part of the prompt (rules, schema, asset list) is sent as a
+# cache-marked system block so Anthropic can reuse it between questions, and
+# the answer is streamed so reading stops at the end of the SQL statement.
+LLM_PROMPT_CACHE_ENABLED = os.environ.get("LLM_PROMPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_STREAM_ENABLED = os.environ.get("LLM_STREAM_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Requests slower than this are logged with their per-stage breakdown (0 = off).
+# Stage timings are always collected and exposed on /metrics.
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+
+
 # =========================
 # LLM (Claude) SQL generator
 # =========================
 
-DB_SCHEMA_DESCRIPTION = """
-You are an assistant that translates natural language questions into SQL for a MySQL database.
+DB_SCHEMA_DESCRIPTION = f"""
+You are an assistant that translates natural language questions into SQL for a {SQL_DIALECT} database.
 The database schema is:
 
 Table: AssetType
@@ -98,6 +274,20 @@ Table: DailyMarketData
 - volume BIGINT
 Primary key: (asset_id, obs_date)
 Constraints: price > 0, volume IS NULL OR volume >= 0
+
+Tables: WeeklyMarketData, MonthlyMarketData, YearlyMarketData
+(precomputed per-asset rollups of DailyMarketData, one row per asset per period)
+- asset_id INT REFERENCES Asset(asset_id)
+- period_start DATE  -- Monday of the week, first day of the month, or January 1
+- first_date DATE, last_date DATE  -- first and last observation in the period
+- open_price DECIMAL(18,4)  -- price on first_date
+- close_price DECIMAL(18,4)  -- price on last_date
+- high_price DECIMAL(18,4), low_price DECIMAL(18,4), avg_price DECIMAL(18,4)
+- total_volume BIGINT  -- NULL if no volume was recorded in the period
+- obs_count INT  -- number of daily observations in the period
+Primary key: (asset_id, period_start)
+For weekly, monthly or yearly questions (e.g. "monthly average price of NVDA",
+"yearly high for Gold") query these tables instead of aggregating DailyMarketData.
 """
 
 
@@ -106,22 +296,46 @@ def get_asset_reference_list():
     Fetch the list of assets to show the LLM what actually exists.
     Returns a list of dicts: {asset_id, name, symbol}.
     """
-    conn = get_db_connection()
-    if not conn:
-        print("WARNING: Could not connect to DB to fetch asset list.")
-        return []
+    with span("asset_list"):
+        conn = get_db_connection()
+        if not conn:
+            print("WARNING: Could not connect to DB to fetch asset list.")
+            return []
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT asset_id, name, symbol FROM Asset ORDER BY asset_id")
+            rows = cursor.fetchall()
+            return rows
+        except mysql.connector.Error as e:
+            print(f"ERROR fetching asset reference list: {e}")
+            return []
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def build_asset_reference(assets):
+    """(assets, asset_reference_text, asset_aliases) for a list of Asset rows."""
+    if assets:
+        asset_reference_text = "\n".join(
+            f"- id {row['asset_id']}: {row['name']} (symbol: {row['symbol']})"
+            for row in assets
+        )
+    else:
+        asset_reference_text = "WARNING: Could not load assets from the database."
+    return assets, asset_reference_text, build_asset_aliases(assets)
 
-    cursor = conn.cursor(dictionary=True)
-    try:
-        cursor.execute("SELECT asset_id, name, symbol FROM Asset ORDER BY asset_id")
-        rows = cursor.fetchall()
-        return rows
-    except mysql.connector.Error as e:
-        print(f"ERROR fetching asset reference list: {e}")
-        return []
-    finally:
-        cursor.close()
-        conn.close()
+
+def _load_asset_reference():
+    assets = get_asset_reference_list()
+    # Don't cache a failed lookup; retry on the next question instead.
+    return build_asset_reference(assets), bool(assets)
+
+
+def get_asset_reference():
+    """Return (assets, asset_reference_text, asset_aliases) from the asset cache."""
+    return asset_cache.get("assets", _load_asset_reference)
 
 
 def is_safe_sql(sql: str) -> bool:
@@ -160,25 +374,51 @@ def is_safe_sql(sql: str) -> bool:
     return True
 
 
-def generate_sql_from_llm(user_query: str) -> str:
-    """Call Claude to generate a SQL query from the user question."""
-    if not anthropic_client:
-        raise RuntimeError(
-            "Anthropic client not configured. "
-            "Make sure 'anthropic' is installed and ANTHROPIC_API_KEY is set."
-        )
+def get_anthropic_client():
+    """The Anthropic client, built on first use; None without the package or a key."""
+    global anthropic_client, _anthropic_checked
+    if anthropic_client is None and not _anthropic_checked:
+        with _anthropic_lock:
+            if not _anthropic_checked:
+                try:
+                    from anthropic import Anthropic
+                except ImportError:
+                    Anthropic = None
+                if Anthropic and ANTHROPIC_API_KEY:
+                    anthropic_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+                _anthropic_checked = True
+    return anthropic_client
 
-    assets = get_asset_reference_list()
-    if assets:
-        asset_reference_text = "\n".join(
-            f"- id {row['asset_id']}: {row['name']} (symbol: {row['symbol']})"
-            for row in assets
-        )
-    else:
-        asset_reference_text = "WARNING: Could not load assets from the database."
 
-    prompt = f"""
-You are a MySQL expert. Given a user's question and the database schema, write a single
+def llm_enabled():
+    """
+    Whether get_anthropic_client() has built, or can build, a client. Until
+    the first LLM call or warm-up this checks for the key and the package
+    without importing it.
+    """
+    if anthropic_client is not None:
+        return True
+    if _anthropic_checked:
+        return False
+    return bool(ANTHROPIC_API_KEY) and importlib.util.find_spec("anthropic") is not None
+
+
+_prompt_prefix = (None, None)
+
+
+def get_prompt_prefix(asset_reference_text: str) -> str:
+    """
+    Everything in the prompt except the question. It only changes with the
+    asset list, and must stay byte-identical between calls for the prompt
+    cache to hit, so it is built once per asset list.
+    """
+    global _prompt_prefix
+    cached_text, prefix = _prompt_prefix
+    if cached_text == asset_reference_text:
+        return prefix
+
+    prefix = f"""
+You are a {SQL_DIALECT} expert. Given a user's question and the database schema, write a single
 safe SQL SELECT query that answers the question.
 
 Here is the ACTUAL list of assets in the database:
@@ -196,65 +436,672 @@ Important rules about assets:
 General rules:
 - Only use the tables and columns from the schema.
 - NEVER modify data: no INSERT, UPDATE, DELETE, DROP, ALTER, TRUNCATE, CREATE, etc.
-- Only output the SQL query, nothing else.
+- Only output the SQL query, nothing else, and end it with a semicolon.
 - Prefer using Asset.symbol to identify assets instead of numeric ids.
 
 Database schema:
 {DB_SCHEMA_DESCRIPTION}
-
-User question:
-{user_query}
 """.strip()
-
-    resp = anthropic_client.messages.create(
-        model=ANTHROPIC_MODEL,
-        max_tokens=400,
-        messages=[
+    _prompt_prefix = (asset_reference_text, prefix)
+    return prefix
+
+
+def build_llm_request(user_query: str, asset_reference_text: str):
+    """messages.create() arguments: the cached prompt prefix plus the question."""
+    system_block = {"type": "text", "text": get_prompt_prefix(asset_reference_text)}
+    if LLM_PROMPT_CACHE_ENABLED:
+        system_block["cache_control"] = {"type": "ephemeral"}
+    return {
+        "model": ANTHROPIC_MODEL,
+        "max_tokens": 400,
+        "system": [system_block],
+        "messages": [
             {
                 "role": "user",
-                "content": [{"type": "text", "text": prompt}],
+                "content": [{"type": "text", "text": f"User question:\n{user_query}"}],
             }
         ],
+    }
+
+
+def sql_statement_end(text: str) -> int:
+    """Index of the first ';' outside a string literal, or -1."""
+    quote = None
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif ch == ";":
+            return i
+    return -1
+
+
+def stream_sql_from_llm(client, request_args):
+    """
+    (text, usage) from a streamed call. Reading stops at the end of the first
+    SQL statement; closing the stream early drops whatever the model would
+    have written after it.
+    """
+    started = time.perf_counter()
+    text = ""
+    with client.messages.stream(**request_args) as stream:
+        for chunk in stream.text_stream:
+            if not text:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_token")
+            text += chunk
+            end = sql_statement_end(text)
+            if end >= 0:
+                text = text[: end + 1]
+                break
+        usage = getattr(stream.current_message_snapshot, "usage", None)
+    return text, usage
+
+
+def record_llm_usage(usage):
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    LLM_TOKENS.inc(usage.input_tokens, direction="input")
+    LLM_TOKENS.inc(cache_read, direction="cache_read")
+    LLM_TOKENS.inc(cache_write, direction="cache_write")
+    LLM_TOKENS.inc(usage.output_tokens, direction="output")
+    annotate(
+        llm_input_tokens=usage.input_tokens,
+        llm_cache_read_tokens=cache_read,
+        llm_cache_write_tokens=cache_write,
+        llm_output_tokens=usage.output_tokens,
     )
 
-    text = resp.content[0].text.strip()
+
+def generate_sql_from_llm(user_query: str) -> str:
+    """Call Claude to generate a SQL query from the user question."""
+    client = get_anthropic_client()
+    if not client:
+        raise RuntimeError(
+            "Anthropic client not configured. "
+            "Make sure 'anthropic' is installed and ANTHROPIC_API_KEY is set."
+        )
+
+    _, asset_reference_text, _ = get_asset_reference()
+    request_args = build_llm_request(user_query, asset_reference_text)
+
+    with span("llm_wait"):
+        llm_slots.acquire()
+    try:
+        with span("llm"):
+            if LLM_STREAM_ENABLED:
+                text, usage = stream_sql_from_llm(client, request_args)
+            else:
+                resp = client.messages.create(**request_args)
+                text, usage = resp.content[0].text, getattr(resp, "usage", None)
+    finally:
+        llm_slots.release()
+
+    if usage is not None:
+        record_llm_usage(usage)
+
+    text = strip_code_fences(text)
+    print("Generated SQL from LLM:", text)  # helpful for debugging
+    return text
+
+
+def strip_code_fences(text: str) -> str:
+    """The SQL from a model answer, without a surrounding ```sql fence."""
+    text = text.strip()
 
     if text.startswith("```"):
         text = text.strip("`")
         if text.lower().startswith("sql\n"):
             text = text[4:]
         text = text.strip()
-
-    print("Generated SQL from LLM:", text)  # helpful for debugging
     return text
 
 
-def run_sql(sql: str):
-    """Execute raw SQL and return rows or an error string."""
+def coalesced(flight, stage, key, fn):
+    """fn() shared with concurrent callers of the same key (see singleflight.py)."""
+    if not SINGLEFLIGHT_ENABLED:
+        return fn()
+    result, shared = flight.do(key, fn)
+    if shared:
+        annotate(coalesced=stage)
+    return result
+
+
+def get_sql_for_question(user_query: str):
+    """
+    Return (sql, params, source, cache_key) for a question. source is
+    "fastpath" when a fixed template matched (params then holds its values),
+    "cache" when the SQL came from the question cache and "llm" otherwise.
+    """
+    _, _, asset_aliases = get_asset_reference()
+    if FASTPATH_ENABLED:
+        with span("fastpath"):
+            matched = match_question(user_query, asset_aliases)
+        if matched:
+            return matched.sql, matched.params, "fastpath", None
+
+    normalized = normalize_question(user_query, asset_aliases)
+    cache_key = normalized if SQL_CACHE_ENABLED else None
+    if cache_key:
+        cached_sql = question_cache.get(cache_key)
+        if cached_sql:
+            return cached_sql, None, "cache", cache_key
+
+    sql = coalesced(llm_flight, "llm", normalized, lambda: generate_sql_from_llm(user_query))
+    return sql, None, "llm", cache_key
+
+
+def _load_data_version():
+    with span("data_version"):
+        conn = get_db_connection()
+        if not conn:
+            return None, False
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT version FROM DataVersion WHERE name = 'market_data'")
+            row = cursor.fetchone()
+            version = row[0] if row else None
+            return version, version is not None
+        except mysql.connector.Error as e:
+            print(f"WARNING: could not read data version: {e}")
+            return None, False
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def get_data_version():
+    """
+    Current DailyMarketData version from the DataVersion table (cached for
+    DATA_VERSION_TTL seconds), or None if it can't be read (results are then
+    not cached).
+    """
+    return data_version_cache.get("market_data", _load_data_version)
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and drop a trailing semicolon (literals keep their case)."""
+    return " ".join(sql.split()).rstrip(";").rstrip()
+
+
+def check_query_cost(sql: str, params=None) -> str:
+    """
+    EXPLAIN a query and compare its estimated rows examined with
+    QUERY_ROW_BUDGET. Returns the SQL to run (wrapped in a LIMIT when over
+    budget and the action is "limit") or raises QueryRejected.
+    """
+    if not QUERY_GUARD_ENABLED:
+        return sql
+
+    with span("cost_check"):
+        conn = get_db_connection()
+        if not conn:
+            return sql  # execution will report the connection failure
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("EXPLAIN " + sql, params)
+            plan = cursor.fetchall()
+        except mysql.connector.Error as e:
+            print(f"WARNING: EXPLAIN failed, running without cost check: {e}")
+            return sql
+        finally:
+            cursor.close()
+            conn.close()
+
+    return apply_cost_budget(sql, plan)
+
+
+def apply_cost_budget(sql: str, plan) -> str:
+    """The cost guard's decision for an EXPLAIN plan (see check_query_cost())."""
+    estimated = estimate_rows_examined(plan)
+    if estimated <= QUERY_ROW_BUDGET:
+        return sql
+
+    if QUERY_OVER_BUDGET_ACTION == "limit":
+        print(f"Cost guard: ~{estimated:,} rows examined, adding LIMIT {QUERY_AUTO_LIMIT}")
+        return with_limit(sql, QUERY_AUTO_LIMIT)
+
+    raise QueryRejected(
+        f"Query rejected: it would examine about {estimated:,} rows "
+        f"(budget {QUERY_ROW_BUDGET:,}).",
+        estimated,
+        QUERY_ROW_BUDGET,
+        summarize_plan(plan),
+    )
+
+
+def result_cache_key(data_version, sql: str, params, max_rows):
+    """Result cache key; also drops the cache when the data version has moved on."""
+    global _result_cache_version
+
+    if data_version is not None and data_version != _result_cache_version:
+        # Entries for older versions can never be hit again; free them now.
+        result_cache.invalidate()
+        _result_cache_version = data_version
+    return (data_version, normalize_sql(sql), tuple(params or ()), max_rows)
+
+
+def run_sql_cached(sql: str, params=None, max_rows=None):
+    """
+    run_sql() behind the result cache and the cost guard (only misses are
+    EXPLAINed). Returns (rows, error, from_cache); may raise QueryRejected.
+    """
+    data_version = get_data_version() if RESULT_CACHE_ENABLED else None
+    key = result_cache_key(data_version, sql, params, max_rows)
+    if data_version is not None:
+        rows = result_cache.get(key)
+        annotate(result_cache_hit=rows is not None)
+        if rows is not None:
+            return rows, None, True
+
+    def execute():
+        rows, error = run_sql(check_query_cost(sql, params), params, max_rows)
+        if not error and data_version is not None:
+            result_cache.put(key, rows, estimate_size(rows))
+        return rows, error
+
+    rows, error = coalesced(query_flight, "query", key, execute)
+    return rows, error, False
+
+
+def run_sql(sql: str, params=None, max_rows=None):
+    """
+    Execute SQL and return (rows, error). With max_rows, at most max_rows + 1
+    rows are fetched so the caller can tell the result was truncated.
+    """
     conn = get_db_connection()
     if not conn:
         return None, "Database connection failed."
 
     cursor = conn.cursor(dictionary=True)
+    unread = False
     try:
-        cursor.execute(sql)
-        rows = cursor.fetchall()
+        with span("db_execute"):
+            cursor.execute(sql, params)
+        with span("db_fetch"):
+            if max_rows is None:
+                rows = cursor.fetchall()
+            else:
+                rows = cursor.fetchmany(max_rows + 1)
+                # A query already limited to max_rows + 1 has nothing left to read.
+                unread = len(rows) > max_rows and cursor.fetchone() is not None
         return rows, None
     except mysql.connector.Error as e:
         return None, str(e)
+    finally:
+        if unread:
+            # Rows may still be on the wire; dropping the connection is
+            # cheaper than reading them just to throw them away.
+            conn.discard()
+        else:
+            cursor.close()
+            conn.close()
+
+
+# =========================
+# Pagination and streaming
+# =========================
+
+
+def _sql_fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_page_cursor(sql: str, row) -> str:
+    """Continuation token pointing just after `row` in (asset_id, obs_date) order."""
+    payload = {"q": _sql_fingerprint(sql), "a": row["asset_id"], "d": str(row["obs_date"])}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_page_cursor(sql: str, token: str):
+    """Return (asset_id, obs_date) from a continuation token, or raise ValueError."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        position = (int(payload["a"]), str(payload["d"]))
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if payload.get("q") != _sql_fingerprint(sql):
+        raise ValueError("Cursor does not belong to this query.")
+    return position
+
+
+def build_keyset_page_sql(sql: str, page_size: int, after=None, sql_params=None):
+    """
+    Wrap a generated query for keyset pagination on (asset_id, obs_date).
+    The result must expose both columns; pages are ordered by them.
+    Returns (sql, params); page_size + 1 rows are requested to detect a next page.
+    """
+    inner = sql.strip().rstrip(";").rstrip()
+    if sql_params is None:
+        # The inner SQL is not parameterised, so escape % for the driver.
+        inner = inner.replace("%", "%%")
+    parts = [f"SELECT * FROM ({inner}) AS page"]
+    params = list(sql_params or ())
+    if after:
+        parts.append("WHERE (page.asset_id, page.obs_date) > (%s, %s)")
+        params.extend(after)
+    parts.append("ORDER BY page.asset_id, page.obs_date LIMIT %s")
+    params.append(page_size + 1)
+    return " ".join(parts), tuple(params)
+
+
+def stream_query_response(sql: str, meta, params=None, on_success=None):
+    """
+    Stream a query as NDJSON from an unbuffered server-side cursor: a "meta"
+    line, one "rows" line per fetched chunk, then an "end" line (or "error").
+    Memory stays bounded by STREAM_CHUNK_ROWS however large the result is.
+    on_success() is called once every row has been read without an error.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"success": False, "error": "Database connection failed."}), 500
+
+    def line(obj):
+        return app.json.dumps(obj) + "\n"
+
+    def generate():
+        cursor = conn.cursor(dictionary=True)
+        count = 0
+        truncated = False
+        failed = False
+        try:
+            cursor.execute(sql, params)
+            yield line({"type": "meta", "columns": list(cursor.column_names), **meta})
+            while not truncated:
+                chunk = cursor.fetchmany(STREAM_CHUNK_ROWS)
+                if not chunk:
+                    break
+                if count + len(chunk) > MAX_RESULT_ROWS:
+                    chunk = chunk[: MAX_RESULT_ROWS - count]
+                    truncated = True
+                count += len(chunk)
+                if chunk:
+                    yield line({"type": "rows", "data": chunk})
+            if on_success:
+                on_success()
+            yield line(
+                {
+                    "type": "end",
+                    "row_count": count,
+                    "row_cap": MAX_RESULT_ROWS,
+                    "truncated": truncated,
+                }
+            )
+        except mysql.connector.Error as e:
+            failed = True
+            yield line({"type": "error", "error": f"Database error: {e}"})
+        finally:
+            # Unread rows or a failed query: don't hand the connection back.
+            if truncated or failed:
+                conn.discard()
+            else:
+                cursor.close()
+                conn.close()
+
+    response = Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+# =========================
+# Series store (analytics)
+# =========================
+
+
+def get_timeseries():
+    """The timeseries module, imported on first use; None without numpy."""
+    global timeseries, _timeseries_checked
+    if not _timeseries_checked:
+        try:
+            import timeseries as module
+        except ImportError:
+            module = None
+        timeseries, _timeseries_checked = module, True
+    return timeseries
+
+
+def load_series_store(version):
+    """Read DailyMarketData into a SeriesStore, or None on failure."""
+    assets, _, _ = get_asset_reference()
+    if not assets:
+        return None
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT asset_id, obs_date, price, volume FROM DailyMarketData")
+        rows = cursor.fetchall()
+    except mysql.connector.Error as e:
+        print(f"ERROR loading series store: {e}")
+        return None
     finally:
         cursor.close()
         conn.close()
 
+    started = time.perf_counter()
+    store = timeseries.SeriesStore.from_rows(assets, rows, version)
+    print(
+        f"Series store built: {len(rows):,} rows, data version {version}, "
+        f"{(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+    return store
+
+
+def get_series_store():
+    """
+    Current SeriesStore, rebuilt when the data version has moved on. The
+    version comes from data_version_cache, so this normally needs no database
+    round-trip. While one thread rebuilds, others keep using the previous copy.
+    """
+    global _series_store, _series_built_at
+
+    version = get_data_version()
+    store = _series_store
+    if store is not None:
+        if version is not None and version == store.version:
+            return store
+        if version is None and time.monotonic() - _series_built_at < SERIES_REFRESH_SECONDS:
+            return store
+        if not _series_lock.acquire(blocking=False):
+            return store
+    else:
+        _series_lock.acquire()
+    try:
+        if _series_store is not store:
+            return _series_store  # rebuilt while we waited
+        fresh = load_series_store(version)
+        if fresh is not None:
+            _series_store = fresh
+            _series_built_at = time.monotonic()
+        return _series_store
+    finally:
+        _series_lock.release()
+
+
+def series_request_args():
+    """(symbols, start, end) from the query string; raises ValueError if malformed."""
+    symbols = [s.strip() for s in request.args.get("symbols", "").split(",") if s.strip()]
+    start = request.args.get("start") or None
+    end = request.args.get("end") or None
+    for value in (start, end):
+        if value is not None:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"Invalid date {value!r}; use YYYY-MM-DD.")
+    return symbols, start, end
+
+
+# =========================
+# Request metrics
+# =========================
+
+
+def cache_stats():
+    return {
+        "assets": asset_cache.stats(),
+        "questions": question_cache.stats(),
+        "results": result_cache.stats(),
+        "data_version": data_version_cache.stats(),
+    }
+
+
+def _pool_metric(keys):
+    def collect():
+        stats = db_pool.stats()
+        return [({"state": key}, stats.get(key)) for key in keys]
+
+    return collect
+
+
+def _cache_metric(key):
+    return lambda: [({"cache": name}, stats[key]) for name, stats in cache_stats().items()]
+
+
+REGISTRY.register(
+    CallbackMetric(
+        "market_api_db_pool_connections",
+        "Pooled database connections by state.",
+        "gauge",
+        _pool_metric(("open", "idle", "checked_out")),
+    )
+)
+REGISTRY.register(
+    CallbackMetric(
+        "market_api_db_pool_events_total",
+        "Connection pool borrows, waits, timeouts and reconnects.",
+        "counter",
+        _pool_metric(("borrows", "waits", "timeouts", "created", "recycled", "ping_failures")),
+    )
+)
+REGISTRY.register(
+    CallbackMetric("market_api_cache_entries", "Entries held per cache.", "gauge", _cache_metric("entries"))
+)
+REGISTRY.register(
+    CallbackMetric("market_api_cache_hits_total", "Cache hits.", "counter", _cache_metric("hits"))
+)
+REGISTRY.register(
+    CallbackMetric("market_api_cache_misses_total", "Cache misses.", "counter", _cache_metric("misses"))
+)
+
+
+REGISTRY.register(
+    CallbackMetric(
+        "market_api_coalesced_requests_total",
+        "Requests that shared another request's in-flight LLM call or query.",
+        "counter",
+        lambda: [
+            ({"stage": "llm"}, llm_flight.stats()["coalesced"]),
+            ({"stage": "query"}, query_flight.stats()["coalesced"]),
+        ],
+    )
+)
+
+
+@app.before_request
+def start_request_trace():
+    g.trace_token = start_trace()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe duration, rows and payload size; log the request if it was slow."""
+    token = g.pop("trace_token", None)
+    if token is None:
+        return response
+    trace = end_trace(token)
+    elapsed = trace.elapsed()
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, status=str(response.status_code))
+    if "rows" in trace.attrs:
+        RESULT_ROWS.observe(trace.attrs["rows"], endpoint=endpoint)
+    # Streamed responses have no length up front and are not counted.
+    payload_bytes = None if response.is_streamed else response.calculate_content_length()
+    if payload_bytes is not None:
+        RESPONSE_BYTES.observe(payload_bytes, endpoint=endpoint)
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        entry = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "stages_ms": {stage: round(s * 1000, 2) for stage, s in trace.spans.items()},
+            "bytes": payload_bytes,
+            **trace.attrs,
+        }
+        print("SLOW REQUEST:", json.dumps(entry, default=str))
+    return response
+
+
+# after_request hooks run in reverse order of registration, so this runs
+# before record_request_metrics() and payload bytes are counted as sent.
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-encode large JSON bodies for clients that accept it."""
+    if (
+        not COMPRESSION_ENABLED
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    coding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if coding is None:
+        return response
+    with span("compress"):
+        response.set_data(compress(body, coding))
+    response.headers["Content-Encoding"] = coding
+    return response
+
+
+@app.teardown_request
+def discard_request_trace(exc):
+    # after_request is skipped when a view raises; don't leak the trace.
+    token = g.pop("trace_token", None)
+    if token is not None:
+        end_trace(token)
+
 
 # =========================
 # API routes
 # =========================
 
 
+def query_rejected_response(e: QueryRejected, sql: str):
+    """400 response for the cost guard, with the plan summary for budget tuning."""
+    return (
+        jsonify(
+            {
+                "success": False,
+                "error": str(e),
+                "sql": sql,
+                "estimated_rows": e.estimated_rows,
+                "row_budget": e.row_budget,
+                "plan": e.plan,
+            }
+        ),
+        400,
+    )
+
+
 @app.route("/api/query", methods=["POST", "OPTIONS"])
 def handle_query():
-    """Handle natural language query using Claude-generated SQL only."""
+    """Handle natural language query with fast-path or Claude-generated SQL."""
     if request.method == "OPTIONS":
         response = jsonify({"status": "ok"})
         response.headers.add("Access-Control-Allow-Origin", "*")
@@ -270,10 +1117,28 @@ def handle_query():
 
     if not user_query:
         return jsonify({"success": False, "error": "Query is required"}), 400
+    annotate(question=user_query[:200])
 
+    response_format = (request.args.get("format") or data.get("format") or "rows").lower()
+    if response_format not in RESPONSE_FORMATS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": f"format must be one of: {', '.join(RESPONSE_FORMATS)}",
+                }
+            ),
+            400,
+        )
+    if response_format == "columnar" and data.get("stream"):
+        return (
+            jsonify({"success": False, "error": "format=columnar cannot be streamed."}),
+            400,
+        )
 
+    started = time.perf_counter()
     try:
-        sql = generate_sql_from_llm(user_query)
+        sql, sql_params, sql_source, cache_key = get_sql_for_question(user_query)
     except Exception as e:
         return (
             jsonify(
@@ -284,41 +1149,252 @@ def handle_query():
             ),
             500,
         )
+    sql_generation_ms = round((time.perf_counter() - started) * 1000, 2)
+    # Fast-path SQL is parameterised; show it with the values filled in.
+    shown_sql = render_sql(sql, sql_params)
+    annotate(sql_source=sql_source)
 
 
-    if not is_safe_sql(sql):
+    with span("safety_check"):
+        safe = is_safe_sql(sql)
+    if not safe:
         return (
             jsonify(
                 {
                     "success": False,
                     "error": "Generated SQL was rejected as unsafe.",
-                    "sql": sql,
+                    "sql": shown_sql,
                 }
             ),
             400,
         )
 
 
-    rows, db_error = run_sql(sql)
+    # Only remember SQL that passed the safety check (and, below, actually ran).
+    def remember_sql():
+        if sql_source == "llm" and cache_key:
+            question_cache.put(cache_key, sql)
+
+    if data.get("stream"):
+        try:
+            stream_sql = check_query_cost(sql, sql_params)
+        except QueryRejected as e:
+            return query_rejected_response(e, shown_sql)
+        # Cached once the stream has run to the end without a database error
+        return stream_query_response(
+            stream_sql, {"sql": shown_sql, "sql_source": sql_source}, sql_params, remember_sql
+        )
+
+    page_size = data.get("page_size")
+    page_token = data.get("cursor")
+    paginated = page_size is not None or page_token is not None
+    exec_sql, params, row_limit = sql, sql_params, MAX_RESULT_ROWS
+    if paginated:
+        try:
+            page_size = int(page_size or MAX_RESULT_ROWS)
+            if page_size < 1:
+                raise ValueError("page_size must be positive.")
+            after = decode_page_cursor(shown_sql, page_token) if page_token else None
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e), "sql": shown_sql}), 400
+        row_limit = min(page_size, MAX_RESULT_ROWS)
+        exec_sql, params = build_keyset_page_sql(sql, row_limit, after, sql_params)
+
+    try:
+        rows, db_error, from_cache = run_sql_cached(exec_sql, params, max_rows=row_limit)
+    except QueryRejected as e:
+        return query_rejected_response(e, shown_sql)
+    if db_error and paginated and "Unknown column" in db_error:
+        db_error = (
+            f"{db_error} (pagination needs asset_id and obs_date columns in the result)"
+        )
     if db_error:
         return (
             jsonify(
                 {
                     "success": False,
                     "error": f"Database error: {db_error}",
-                    "sql": sql,
+                    "sql": shown_sql,
                 }
             ),
             500,
         )
 
+    remember_sql()
+    QUERY_SOURCES.inc(sql_source=sql_source)
+
+    truncated = len(rows) > row_limit
+    rows = rows[:row_limit]
+    annotate(rows=len(rows))
+
+    origin = "Fast-path" if sql_source == "fastpath" else "LLM-generated"
     resp = {
         "success": True,
-        "message": f"LLM-generated query executed successfully. Returned {len(rows)} row(s).",
-        "sql": sql,
+        "message": f"{origin} query executed successfully. Returned {len(rows)} row(s).",
+        "sql": shown_sql,
+        "sql_source": sql_source,
+        "sql_generation_ms": sql_generation_ms,
+        "from_cache": from_cache,
+        "row_cap": MAX_RESULT_ROWS,
+        "truncated": truncated and not paginated,
         "data": rows,
     }
-    response = jsonify(resp)
+    if paginated:
+        resp["next_cursor"] = encode_page_cursor(shown_sql, rows[-1]) if truncated else None
+    if response_format == "columnar":
+        resp["format"] = "columnar"
+        resp["columns"], resp["data"] = to_columnar(rows)
+        with span("serialize"):
+            response = Response(dumps(resp), mimetype="application/json")
+    else:
+        with span("serialize"):
+            response = jsonify(resp)
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+def answer_batch_item(index: int, user_query: str, response_format: str):
+    """
+    One /api/query/batch result line: the /api/query pipeline for a single
+    question (no pagination or streaming), with failures reported in the
+    item instead of as an HTTP status.
+    """
+    started = time.perf_counter()
+    item = {"type": "result", "index": index, "query": user_query}
+    try:
+        sql, sql_params, sql_source, cache_key = get_sql_for_question(user_query)
+    except Exception as e:
+        return {**item, "success": False, "error": f"LLM error: {e}"}
+    item["sql"] = render_sql(sql, sql_params)
+    item["sql_source"] = sql_source
+    item["sql_generation_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    if not is_safe_sql(sql):
+        return {**item, "success": False, "error": "Generated SQL was rejected as unsafe."}
+    try:
+        rows, db_error, from_cache = run_sql_cached(sql, sql_params, max_rows=MAX_RESULT_ROWS)
+    except QueryRejected as e:
+        return {
+            **item,
+            "success": False,
+            "error": str(e),
+            "estimated_rows": e.estimated_rows,
+            "row_budget": e.row_budget,
+        }
+    if db_error:
+        return {**item, "success": False, "error": f"Database error: {db_error}"}
+
+    if sql_source == "llm" and cache_key:
+        question_cache.put(cache_key, sql)
+    QUERY_SOURCES.inc(sql_source=sql_source)
+
+    truncated = len(rows) > MAX_RESULT_ROWS
+    rows = rows[:MAX_RESULT_ROWS]
+    item.update(
+        success=True,
+        from_cache=from_cache,
+        row_cap=MAX_RESULT_ROWS,
+        truncated=truncated,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+    if response_format == "columnar":
+        item["format"] = "columnar"
+        item["columns"], item["data"] = to_columnar(rows)
+    else:
+        item["data"] = rows
+    return item
+
+
+@app.route("/api/query/batch", methods=["POST", "OPTIONS"])
+def handle_query_batch():
+    """
+    Answer a list of questions concurrently. Each question is generated and
+    executed on its own worker, so SQL runs as soon as its LLM call returns;
+    results stream back as NDJSON in completion order, tagged with the
+    question's index.
+    """
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "Content-Type")
+        response.headers.add("Access-Control-Allow-Methods", "POST, OPTIONS")
+        return response
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"success": False, "error": "Invalid JSON"}), 400
+
+    queries = data.get("queries")
+    if (
+        not isinstance(queries, list)
+        or not queries
+        or not all(isinstance(q, str) and q.strip() for q in queries)
+    ):
+        return (
+            jsonify({"success": False, "error": "queries must be a non-empty list of questions"}),
+            400,
+        )
+    if len(queries) > BATCH_MAX_QUESTIONS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": f"At most {BATCH_MAX_QUESTIONS} questions per batch.",
+                }
+            ),
+            400,
+        )
+
+    response_format = (request.args.get("format") or data.get("format") or "rows").lower()
+    if response_format not in RESPONSE_FORMATS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": f"format must be one of: {', '.join(RESPONSE_FORMATS)}",
+                }
+            ),
+            400,
+        )
+    annotate(batch_size=len(queries))
+
+    started = time.perf_counter()
+    futures = {
+        batch_executor.submit(answer_batch_item, index, query.strip(), response_format): index
+        for index, query in enumerate(queries)
+    }
+
+    def generate():
+        failed = 0
+        try:
+            yield dumps({"type": "meta", "count": len(queries)}) + b"\n"
+            for future in as_completed(futures):
+                try:
+                    item = future.result()
+                except Exception as e:
+                    item = {
+                        "type": "result",
+                        "index": futures[future],
+                        "success": False,
+                        "error": f"Internal error: {e}",
+                    }
+                if not item["success"]:
+                    failed += 1
+                yield dumps(item) + b"\n"
+            yield dumps(
+                {
+                    "type": "end",
+                    "count": len(queries),
+                    "failed": failed,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+                }
+            ) + b"\n"
+        finally:
+            # Client went away: don't start questions nobody will read.
+            for future in futures:
+                future.cancel()
+
+    response = Response(generate(), mimetype="application/x-ndjson")
     response.headers.add("Access-Control-Allow-Origin", "*")
     return response
 
@@ -356,6 +1432,191 @@ def get_assets():
         conn.close()
 
 
+ANALYTICS_METRICS = ("returns", "rolling_mean", "rolling_volatility", "drawdown", "correlation")
+
+
+def series_unavailable_response():
+    if get_timeseries() is None:
+        error = "numpy is not installed; the series store is unavailable."
+    else:
+        error = "Series store could not be loaded from the database."
+    return jsonify({"success": False, "error": error}), 503
+
+
+@app.route("/api/series", methods=["GET", "OPTIONS"])
+def get_series():
+    """Date-aligned prices (and optionally volumes) from the in-memory store."""
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response
+
+    store = get_series_store() if get_timeseries() else None
+    if store is None:
+        return series_unavailable_response()
+
+    try:
+        symbols, start, end = series_request_args()
+        rows = store.rows_for(symbols)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    fields = [f.strip() for f in request.args.get("fields", "price").split(",") if f.strip()]
+    if not fields or set(fields) - {"price", "volume"}:
+        return jsonify({"success": False, "error": "fields must be price and/or volume."}), 400
+
+    columns = store.date_slice(start, end)
+    matrices = {"price": store.prices, "volume": store.volumes}
+    series = {}
+    for row in rows:
+        entry = {"name": store.names[row]}
+        for field in fields:
+            entry[field] = timeseries.to_json_list(matrices[field][row, columns])
+        series[store.symbols[row]] = entry
+
+    annotate(rows=len(series))
+    with span("serialize"):
+        response = jsonify(
+            {
+                "success": True,
+                "data_version": store.version,
+                "dates": timeseries.dates_to_json(store.dates[columns]),
+                "series": series,
+            }
+        )
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+@app.route("/api/analytics", methods=["GET", "OPTIONS"])
+def get_analytics():
+    """
+    Vectorized analytics over the in-memory store, no SQL involved:
+    returns, rolling_mean, rolling_volatility, drawdown or correlation.
+    """
+    if request.method == "OPTIONS":
+        response = jsonify({"status": "ok"})
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        return response
+
+    metric = request.args.get("metric", "")
+    if metric not in ANALYTICS_METRICS:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "error": f"metric must be one of: {', '.join(ANALYTICS_METRICS)}",
+                }
+            ),
+            400,
+        )
+
+    store = get_series_store() if get_timeseries() else None
+    if store is None:
+        return series_unavailable_response()
+
+    try:
+        symbols, start, end = series_request_args()
+        rows = store.rows_for(symbols)
+        window = int(request.args.get("window", "20"))
+        if not 2 <= window <= SERIES_MAX_WINDOW:
+            raise ValueError(f"window must be between 2 and {SERIES_MAX_WINDOW}.")
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    columns = store.date_slice(start, end)
+    names = [store.symbols[row] for row in rows]
+    resp = {"success": True, "metric": metric, "data_version": store.version}
+
+    if metric == "correlation":
+        matrix, counts = store.correlation(rows, columns)
+        resp.update(
+            {
+                "symbols": names,
+                "matrix": [timeseries.to_json_list(line) for line in matrix],
+                "observations": counts.tolist(),
+            }
+        )
+    elif metric == "drawdown":
+        drawdown, summary = store.drawdowns(rows, columns)
+        dates = store.dates[columns]
+        resp["dates"] = timeseries.dates_to_json(dates)
+        resp["series"] = {
+            name: timeseries.to_json_list(line) for name, line in zip(names, drawdown)
+        }
+        resp["max_drawdown"] = {
+            name: {
+                "value": None if value is None else round(value, 6),
+                "peak_date": None if peak is None else str(dates[peak]),
+                "trough_date": None if trough is None else str(dates[trough]),
+            }
+            for name, (value, peak, trough) in zip(names, summary)
+        }
+    else:
+        # Windows and returns look back before `start`, so compute on the
+        # full history and slice afterwards.
+        if metric == "returns":
+            values = store.daily_returns(rows)
+            resp["total_return"] = dict(
+                zip(names, timeseries.to_json_list(store.total_returns(rows, columns)))
+            )
+        elif metric == "rolling_mean":
+            values = store.rolling_mean(rows, window)
+            resp["window"] = window
+        else:
+            annualize = request.args.get("annualize", "true").lower() in ("1", "true", "yes")
+            values = store.rolling_volatility(rows, window, annualize=annualize)
+            resp.update({"window": window, "annualized": annualize})
+        resp["dates"] = timeseries.dates_to_json(store.dates[columns])
+        resp["series"] = {
+            name: timeseries.to_json_list(line) for name, line in zip(names, values[:, columns])
+        }
+
+    with span("serialize"):
+        response = jsonify(resp)
+    response.headers.add("Access-Control-Allow-Origin", "*")
+    return response
+
+
+def is_admin_request():
+    """Allow admin calls with the ADMIN_TOKEN header, or from localhost if no token is set."""
+    if ADMIN_TOKEN:
+        return request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@app.route("/api/admin/cache/invalidate", methods=["POST"])
+def invalidate_caches():
+    """Drop cached data (called by load_data.py after a load)."""
+    if not is_admin_request():
+        return jsonify({"success": False, "error": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    caches = {
+        "assets": asset_cache,
+        "questions": question_cache,
+        "results": result_cache,
+        "data_version": data_version_cache,
+    }
+    # Generated SQL doesn't depend on the data, so the question cache (and
+    # the LLM work in it) is only dropped when asked for by name
+    names = data.get("caches") or ["assets", "results", "data_version"]
+    unknown = [name for name in names if name not in caches]
+    if unknown:
+        return (
+            jsonify({"success": False, "error": f"Unknown cache(s): {unknown}"}),
+            400,
+        )
+
+    for name in names:
+        caches[name].invalidate()
+    # A load just finished: rebuild the series store now instead of making
+    # the next /api/series request notice the new version and wait for it
+    if "data_version" in names and _series_store is not None:
+        threading.Thread(target=get_series_store, name="series-rebuild", daemon=True).start()
+    return jsonify({"success": True, "invalidated": names})
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint."""
@@ -363,53 +1624,129 @@ def health_check():
         {
             "status": "ok",
             "version": APP_VERSION,
-            "llm_enabled": bool(anthropic_client),
+            "ready": _ready.is_set(),
+            "startup": dict(_startup),
+            "llm_enabled": llm_enabled(),
             "model": ANTHROPIC_MODEL,
+            "db_backend": DB_BACKEND,
+            "db_pool": db_pool.stats(),
+            "caches": cache_stats(),
+            "singleflight": {"llm": llm_flight.stats(), "query": query_flight.stats()},
+            "series_store": _series_store.stats() if _series_store else None,
         }
     )
 
 
+# Readiness borrows and pings a pooled connection, at most once per
+# READY_PROBE_INTERVAL seconds; the pool wait is capped at READY_PROBE_TIMEOUT.
+READY_PROBE_INTERVAL = float(os.environ.get("READY_PROBE_INTERVAL", "2"))
+READY_PROBE_TIMEOUT = float(os.environ.get("READY_PROBE_TIMEOUT", "2"))
+_db_probe = (None, None)  # (monotonic time of the last probe, its result)
+_db_probe_lock = threading.Lock()
+
+
+def probe_database() -> str:
+    """
+    "ok", "busy" (every connection is checked out, so the database is up
+    but saturated) or "unreachable: <error>". Cached for READY_PROBE_INTERVAL.
+    """
+    global _db_probe
+    with _db_probe_lock:
+        checked_at, result = _db_probe
+        if checked_at is not None and time.monotonic() - checked_at < READY_PROBE_INTERVAL:
+            return result
+        try:
+            conn = db_pool.get_connection(timeout=READY_PROBE_TIMEOUT)
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                conn.discard()
+                raise
+            conn.close()
+            result = "ok"
+        except PoolTimeout:
+            result = "busy"
+        except Exception as e:
+            result = f"unreachable: {e}"
+        _db_probe = (time.monotonic(), result)
+        return result
+
+
+@app.route("/health/ready", methods=["GET"])
+def readiness_check():
+    """
+    Readiness: 503 until warm-up has finished, and while the database can't
+    be reached (/health only reports liveness).
+    """
+    ready = _ready.is_set()
+    database = probe_database() if ready else "not checked"
+    if database.startswith("unreachable"):
+        ready = False
+    elif ready:
+        _startup["errors"].pop("db_pool", None)
+    body = {"ready": ready, "database": database, "startup": dict(_startup)}
+    return jsonify(body), 200 if ready else 503
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Request, stage, LLM token, pool and cache metrics in Prometheus text format."""
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Web UI files are read, fingerprinted and compressed once, during warm-up or
+# on first use. Fingerprinted URLs never change content, so browsers may
+# cache them forever; the HTML shell and the legacy unversioned URLs are
+# revalidated by ETag.
+static_bundle = AssetBundle(app.static_folder, build=False)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def static_asset_response(asset, cache_control):
+    """Serve an in-memory asset, honouring Accept-Encoding and If-None-Match."""
+    body, coding = select_variant(asset, request.headers.get("Accept-Encoding", ""))
+    etag = etag_for(asset, coding)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=asset.mimetype)
+        if coding:
+            response.headers["Content-Encoding"] = coding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
 @app.route("/")
 def index():
-    """Serve the main HTML page with no-cache headers."""
-    response = send_file(os.path.join(app.static_folder, "index.html"))
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+    """Serve the main HTML page; it links to fingerprinted CSS/JS URLs."""
+    static_bundle.refresh()
+    return static_asset_response(static_bundle.index, "no-cache")
+
+
+@app.route("/assets/<name>")
+def serve_asset(name):
+    """Serve a fingerprinted CSS/JS file with far-future caching."""
+    static_bundle.ensure_built()
+    asset = static_bundle.assets.get(name)
+    if asset is None:
+        return "", 404
+    return static_asset_response(asset, IMMUTABLE_CACHE_CONTROL)
 
 
 @app.route("/style.css")
 def serve_css():
-    """Serve CSS file with no-cache headers."""
-    try:
-        response = send_file(
-            os.path.join(app.static_folder, "style.css"), mimetype="text/css"
-        )
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
-        return response
-    except Exception as e:
-        print(f"Error serving CSS: {e}")
-        return "", 404
+    """Serve CSS at its unversioned URL (revalidated on every use)."""
+    static_bundle.ensure_built()
+    return static_asset_response(static_bundle.files["style.css"], "no-cache")
 
 
 @app.route("/script.js")
 def serve_js():
-    """Serve JavaScript file with no-cache headers."""
-    try:
-        response = send_file(
-            os.path.join(app.static_folder, "script.js"),
-            mimetype="application/javascript",
-        )
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
-        return response
-    except Exception as e:
-        print(f"Error serving JS: {e}")
-        return "", 404
+    """Serve JavaScript at its unversioned URL (revalidated on every use)."""
+    static_bundle.ensure_built()
+    return static_asset_response(static_bundle.files["script.js"], "no-cache")
 
 
 @app.route("/favicon.ico")
@@ -418,10 +1755,123 @@ def favicon():
     return "", 204
 
 
+# =========================
+# Startup, warm-up and readiness
+# =========================
+
+# "background": create_app() returns at once and warms up on a thread;
+# "blocking": it returns once warmed up; "off": no warm-up.
+WARM_UP_MODES = ("background", "blocking", "off")
+WARM_UP = os.environ.get("WARM_UP", "background").lower()
+
+_startup = {
+    "import_seconds": None,
+    "warm_up_seconds": None,
+    "ready_seconds": None,
+    "steps": {},
+    "errors": {},
+}
+_ready = threading.Event()
+_app_created = False
+_create_lock = threading.Lock()
+
+
+def warm_up():
+    """
+    Do the work the first requests would otherwise pay for: open the pool's
+    connections, load the asset list, build the prompt prefix, import and
+    build the Anthropic client, compress the static files and build the
+    series store. A failed step is logged and recorded and its work is
+    retried on demand; while the db_pool step hasn't succeeded,
+    /health/ready answers 503.
+    """
+    started = time.perf_counter()
+    steps = [
+        ("db_pool", db_pool.warm),
+        ("asset_cache", get_asset_reference),
+        ("prompt_prefix", lambda: get_prompt_prefix(get_asset_reference()[1])),
+        ("llm_client", get_anthropic_client),
+        ("static_assets", static_bundle.ensure_built),
+        ("series_store", lambda: get_timeseries() and get_series_store()),
+    ]
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            _startup["errors"][name] = str(e)
+            print(f"WARNING: warm-up step {name} failed: {e}")
+        _startup["steps"][name] = round(time.perf_counter() - step_started, 3)
+    _startup["warm_up_seconds"] = round(time.perf_counter() - started, 3)
+    mark_ready()
+
+
+def mark_ready():
+    _startup["ready_seconds"] = round(time.perf_counter() - _import_started, 3)
+    _ready.set()
+    warm_up_seconds = _startup["warm_up_seconds"]
+    warm_up_text = "skipped" if warm_up_seconds is None else f"{warm_up_seconds}s"
+    print(
+        f"Ready {_startup['ready_seconds']}s after import started "
+        f"(import {_startup['import_seconds']}s, warm-up {warm_up_text})"
+    )
+
+
+def create_app(warm_up_mode=None):
+    """
+    Return the Flask app and, on the first call, start the warm-up
+    (WARM_UP, or warm_up_mode). Importing this module builds no clients,
+    opens no connections and prints nothing; that all happens here.
+
+        gunicorn "app:create_app()"
+    """
+    global _app_created
+    mode = (warm_up_mode or WARM_UP).lower()
+    if mode not in WARM_UP_MODES:
+        raise ValueError(f"warm-up mode must be one of: {', '.join(WARM_UP_MODES)}")
+    with _create_lock:
+        if _app_created:
+            return app
+        _app_created = True
+
+    print(
+        f"Model: {ANTHROPIC_MODEL}, API key present: {bool(ANTHROPIC_API_KEY)}, "
+        f"DB backend: {DB_BACKEND}, warm-up: {mode}"
+    )
+    if mode == "blocking":
+        warm_up()
+    elif mode == "background":
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    else:
+        mark_ready()
+    return app
+
+
+def _startup_metric():
+    return [
+        ({"phase": phase}, _startup[f"{phase}_seconds"])
+        for phase in ("import", "warm_up", "ready")
+        if _startup[f"{phase}_seconds"] is not None
+    ]
+
+
+REGISTRY.register(
+    CallbackMetric(
+        "market_api_startup_seconds",
+        "Seconds spent importing app.py, warming up, and from import to ready.",
+        "gauge",
+        _startup_metric,
+    )
+)
+
+_startup["import_seconds"] = round(time.perf_counter() - _import_started, 3)
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("FLASK_PORT", "5001"))
     print("Starting Flask server...")
     print("Open your browser and navigate to:")
     print(f"  http://127.0.0.1:{port}")
     print("Press Ctrl+C to stop the server")
+    create_app()
     app.run(debug=True, host="127.0.0.1", port=port, threaded=True)
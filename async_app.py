@@ -0,0 +1,573 @@
+"""
+Asyncio serving mode for the /api/query pipeline.
+
+app.py answers each request on its own thread, so a question waiting on the
+LLM holds an OS thread for the whole multi-second call. This module serves
+the same API from a single event loop with Quart: Claude is called through
+AsyncAnthropic and MySQL through an aiomysql pool, so a waiting question
+costs a coroutine instead of a thread.
+
+Settings, caches, the prompt, the fast path, the safety check and the cost
+guard all come from app.py; only the I/O differs. Embedded backends
+(DB_BACKEND=sqlite/duckdb) are local file reads and run on app.py's pool in
+worker threads.
+
+Routes: /api/query (rows or columnar, pagination; not "stream"),
+/api/assets, /health and /metrics. The web UI, /api/series, /api/analytics,
+/api/query/batch and the admin endpoint stay on app.py.
+
+Usage:
+    python async_app.py
+    hypercorn async_app:app --bind 127.0.0.1:5001
+"""
+
+import asyncio
+import os
+import time
+
+from quart import Quart, Response, g, jsonify, request
+
+import app as pipeline
+from fastpath import match_question, render_sql
+from metrics import (
+    QUERY_SOURCES,
+    REGISTRY,
+    REQUEST_SECONDS,
+    RESPONSE_BYTES,
+    RESULT_ROWS,
+    STAGE_SECONDS,
+    annotate,
+    end_trace,
+    span,
+    start_trace,
+)
+from query_guard import QueryRejected
+from questions import normalize_question
+from serialization import COMPRESSIBLE_MIMETYPES, choose_encoding, compress, dumps, to_columnar
+from singleflight import AsyncSingleFlight
+
+try:
+    import aiomysql
+except ImportError:
+    aiomysql = None  # only needed for DB_BACKEND=mysql
+
+try:
+    from anthropic import AsyncAnthropic
+except ImportError:
+    AsyncAnthropic = None
+
+app = Quart(__name__)
+
+# /api/query requests handled at once; more are turned away with 503.
+ASYNC_MAX_REQUESTS = int(os.environ.get("ASYNC_MAX_REQUESTS", "1000"))
+# Give up on an LLM call or a SQL statement after this long (HTTP 504).
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "30"))
+QUERY_TIMEOUT_SECONDS = float(os.environ.get("QUERY_TIMEOUT_SECONDS", "30"))
+
+anthropic_client = (
+    AsyncAnthropic(api_key=pipeline.ANTHROPIC_API_KEY)
+    if (AsyncAnthropic and pipeline.ANTHROPIC_API_KEY)
+    else None
+)
+
+llm_slots = asyncio.Semaphore(pipeline.LLM_MAX_CONCURRENCY)
+asset_flight = AsyncSingleFlight()
+version_flight = AsyncSingleFlight()
+llm_flight = AsyncSingleFlight()
+query_flight = AsyncSingleFlight()
+
+db_pool = None  # aiomysql pool, opened when serving starts (MySQL only)
+_in_flight = 0
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+# =========================
+# Database
+# =========================
+
+
+@app.before_serving
+async def open_db_pool():
+    global db_pool
+    if pipeline.DB_BACKEND != "mysql":
+        return
+    if aiomysql is None:
+        raise RuntimeError("async_app.py needs aiomysql for DB_BACKEND=mysql (pip install aiomysql).")
+    init_command = None
+    if pipeline.QUERY_MAX_EXECUTION_MS:
+        init_command = f"SET SESSION MAX_EXECUTION_TIME = {int(pipeline.QUERY_MAX_EXECUTION_MS)}"
+    config = pipeline.DB_CONFIG
+    db_pool = await aiomysql.create_pool(
+        host=config["host"],
+        port=config["port"],
+        user=config["user"],
+        password=config["password"],
+        db=config["database"],
+        minsize=0,
+        maxsize=pipeline.POOL_CONFIG["size"] + pipeline.POOL_CONFIG["max_overflow"],
+        pool_recycle=pipeline.POOL_CONFIG["recycle"],
+        autocommit=True,
+        init_command=init_command,
+    )
+
+
+@app.after_serving
+async def close_db_pool():
+    if db_pool is not None:
+        db_pool.close()
+        await db_pool.wait_closed()
+
+
+async def run_sql(sql: str, params=None, max_rows=None):
+    """
+    Async run_sql(): (rows, error), fetching at most max_rows + 1 rows.
+    Raises QueryTimeout after QUERY_TIMEOUT_SECONDS.
+    """
+    if db_pool is None:
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(pipeline.run_sql, sql, params, max_rows), QUERY_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            raise QueryTimeout(f"Query timed out after {QUERY_TIMEOUT_SECONDS:g}s.")
+
+    try:
+        with span("db_connect"):
+            conn = await asyncio.wait_for(db_pool.acquire(), pipeline.POOL_CONFIG["timeout"])
+    except (asyncio.TimeoutError, aiomysql.MySQLError, OSError) as e:
+        print(f"Database connection error: {e!r}")
+        return None, "Database connection failed."
+
+    # The connection goes back to the pool only after a clean, fully read
+    # result; anything else (unread rows, timeout, error) closes it.
+    reusable = False
+    try:
+        # Unbuffered, so a capped result doesn't pull every row over the wire.
+        cursor = await conn.cursor(aiomysql.SSDictCursor)
+        with span("db_execute"):
+            await asyncio.wait_for(cursor.execute(sql, params), QUERY_TIMEOUT_SECONDS)
+        with span("db_fetch"):
+            if max_rows is None:
+                rows = await cursor.fetchall()
+            else:
+                rows = await cursor.fetchmany(max_rows + 1)
+                if len(rows) > max_rows and await cursor.fetchone() is not None:
+                    return list(rows), None
+        await cursor.close()
+        reusable = True
+        return list(rows), None
+    except asyncio.TimeoutError:
+        raise QueryTimeout(f"Query timed out after {QUERY_TIMEOUT_SECONDS:g}s.")
+    except aiomysql.MySQLError as e:
+        return None, str(e)
+    finally:
+        if not reusable:
+            conn.close()
+        db_pool.release(conn)
+
+
+async def load_data_version():
+    with span("data_version"):
+        try:
+            rows, error = await run_sql("SELECT version FROM DataVersion WHERE name = 'market_data'")
+        except QueryTimeout as e:
+            rows, error = None, str(e)
+    if error:
+        print(f"WARNING: could not read data version: {error}")
+        return None
+    version = rows[0]["version"] if rows else None
+    if version is not None:
+        pipeline.data_version_cache.put("market_data", version)
+    return version
+
+
+async def get_data_version():
+    """Async get_data_version(), sharing app.py's version cache; None if it can't be read."""
+    version = pipeline.data_version_cache.peek("market_data")
+    if version is None:
+        version, _ = await version_flight.do("market_data", load_data_version)
+    return version
+
+
+async def check_query_cost(sql: str, params=None) -> str:
+    """Async check_query_cost(): EXPLAIN, then app.apply_cost_budget()."""
+    if not pipeline.QUERY_GUARD_ENABLED:
+        return sql
+
+    with span("cost_check"):
+        try:
+            plan, error = await run_sql("EXPLAIN " + sql, params)
+        except QueryTimeout as e:
+            plan, error = None, str(e)
+    if error:
+        print(f"WARNING: EXPLAIN failed, running without cost check: {error}")
+        return sql
+    return pipeline.apply_cost_budget(sql, plan)
+
+
+async def run_sql_cached(sql: str, params=None, max_rows=None):
+    """Async run_sql_cached(): (rows, error, from_cache); may raise QueryRejected."""
+    data_version = await get_data_version() if pipeline.RESULT_CACHE_ENABLED else None
+    key = pipeline.result_cache_key(data_version, sql, params, max_rows)
+    if data_version is not None:
+        rows = pipeline.result_cache.get(key)
+        annotate(result_cache_hit=rows is not None)
+        if rows is not None:
+            return rows, None, True
+
+    async def execute():
+        rows, error = await run_sql(await check_query_cost(sql, params), params, max_rows)
+        if not error and data_version is not None:
+            pipeline.result_cache.put(key, rows, pipeline.estimate_size(rows))
+        return rows, error
+
+    rows, error = await coalesced(query_flight, "query", key, execute)
+    return rows, error, False
+
+
+# =========================
+# Asset list and LLM
+# =========================
+
+
+async def load_asset_reference():
+    with span("asset_list"):
+        try:
+            rows, error = await run_sql("SELECT asset_id, name, symbol FROM Asset ORDER BY asset_id")
+        except QueryTimeout as e:
+            rows, error = None, str(e)
+    if error:
+        print(f"ERROR fetching asset reference list: {error}")
+    reference = pipeline.build_asset_reference(rows or [])
+    # Don't cache a failed lookup; retry on the next question instead.
+    if rows:
+        pipeline.asset_cache.put("assets", reference)
+    return reference
+
+
+async def get_asset_reference():
+    """Async get_asset_reference(), sharing app.py's asset cache."""
+    reference = pipeline.asset_cache.peek("assets")
+    if reference is None:
+        reference, _ = await asset_flight.do("assets", load_asset_reference)
+    return reference
+
+
+async def call_llm(request_args):
+    """(text, usage), streamed and cut at the end of the SQL statement like app.py."""
+    if not pipeline.LLM_STREAM_ENABLED:
+        resp = await anthropic_client.messages.create(**request_args)
+        return resp.content[0].text, getattr(resp, "usage", None)
+
+    started = time.perf_counter()
+    text = ""
+    async with anthropic_client.messages.stream(**request_args) as stream:
+        async for chunk in stream.text_stream:
+            if not text:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_token")
+            text += chunk
+            end = pipeline.sql_statement_end(text)
+            if end >= 0:
+                text = text[: end + 1]
+                break
+        usage = getattr(stream.current_message_snapshot, "usage", None)
+    return text, usage
+
+
+async def generate_sql_from_llm(user_query: str) -> str:
+    """Call Claude to generate a SQL query from the user question."""
+    if not anthropic_client:
+        raise RuntimeError(
+            "Anthropic client not configured. "
+            "Make sure 'anthropic' is installed and ANTHROPIC_API_KEY is set."
+        )
+
+    _, asset_reference_text, _ = await get_asset_reference()
+    request_args = pipeline.build_llm_request(user_query, asset_reference_text)
+
+    with span("llm_wait"):
+        await llm_slots.acquire()
+    try:
+        with span("llm"):
+            text, usage = await asyncio.wait_for(call_llm(request_args), LLM_TIMEOUT_SECONDS)
+    finally:
+        llm_slots.release()
+
+    if usage is not None:
+        pipeline.record_llm_usage(usage)
+    text = pipeline.strip_code_fences(text)
+    return text
+
+
+async def coalesced(flight, stage, key, coro_fn):
+    if not pipeline.SINGLEFLIGHT_ENABLED:
+        return await coro_fn()
+    result, shared = await flight.do(key, coro_fn)
+    if shared:
+        annotate(coalesced=stage)
+    return result
+
+
+async def get_sql_for_question(user_query: str):
+    """Async get_sql_for_question(): (sql, params, source, cache_key)."""
+    _, _, asset_aliases = await get_asset_reference()
+    if pipeline.FASTPATH_ENABLED:
+        with span("fastpath"):
+            matched = match_question(user_query, asset_aliases)
+        if matched:
+            return matched.sql, matched.params, "fastpath", None
+
+    normalized = normalize_question(user_query, asset_aliases)
+    cache_key = normalized if pipeline.SQL_CACHE_ENABLED else None
+    if cache_key:
+        cached_sql = pipeline.question_cache.get(cache_key)
+        if cached_sql:
+            return cached_sql, None, "cache", cache_key
+
+    sql = await coalesced(
+        llm_flight, "llm", normalized, lambda: generate_sql_from_llm(user_query)
+    )
+    return sql, None, "llm", cache_key
+
+
+# =========================
+# Request hooks
+# =========================
+
+
+@app.before_request
+async def start_request_trace():
+    g.trace_token = start_trace()
+
+
+@app.after_request
+async def finish_response(response):
+    """CORS header, compression and request metrics (app.py's hooks, combined)."""
+    response.headers["Access-Control-Allow-Origin"] = "*"
+
+    if (
+        pipeline.COMPRESSION_ENABLED
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and "Content-Encoding" not in response.headers
+        and response.status_code >= 200
+        and response.status_code not in (204, 304)
+    ):
+        response.vary.add("Accept-Encoding")
+        body = await response.get_data()
+        coding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if len(body) >= pipeline.COMPRESS_MIN_BYTES and coding is not None:
+            with span("compress"):
+                response.set_data(compress(body, coding))
+            response.headers["Content-Encoding"] = coding
+
+    token = g.pop("trace_token", None)
+    if token is not None:
+        trace = end_trace(token)
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(trace.elapsed(), endpoint=endpoint, status=str(response.status_code))
+        if "rows" in trace.attrs:
+            RESULT_ROWS.observe(trace.attrs["rows"], endpoint=endpoint)
+        if response.content_length is not None:
+            RESPONSE_BYTES.observe(response.content_length, endpoint=endpoint)
+    return response
+
+
+@app.teardown_request
+async def discard_request_trace(exc):
+    token = g.pop("trace_token", None)
+    if token is not None:
+        end_trace(token)
+
+
+# =========================
+# API routes
+# =========================
+
+
+def error_response(status, error, **extra):
+    return jsonify({"success": False, "error": error, **extra}), status
+
+
+def options_response(methods):
+    response = jsonify({"status": "ok"})
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    response.headers["Access-Control-Allow-Methods"] = methods
+    return response
+
+
+@app.route("/api/query", methods=["POST", "OPTIONS"])
+async def handle_query():
+    """Same request and response as app.py's /api/query, without "stream"."""
+    global _in_flight
+    if request.method == "OPTIONS":
+        return options_response("POST, OPTIONS")
+
+    if _in_flight >= ASYNC_MAX_REQUESTS:
+        return error_response(503, "Server is busy, try again shortly.")
+    _in_flight += 1
+    try:
+        return await answer_query()
+    finally:
+        _in_flight -= 1
+
+
+async def answer_query():
+    data = await request.get_json(silent=True)
+    if not data:
+        return error_response(400, "Invalid JSON")
+
+    user_query = (data.get("query") or "").strip()
+    if not user_query:
+        return error_response(400, "Query is required")
+    annotate(question=user_query[:200])
+
+    response_format = (request.args.get("format") or data.get("format") or "rows").lower()
+    if response_format not in pipeline.RESPONSE_FORMATS:
+        return error_response(400, f"format must be one of: {', '.join(pipeline.RESPONSE_FORMATS)}")
+    if data.get("stream"):
+        return error_response(400, "stream is not supported by the async server; use app.py.")
+
+    started = time.perf_counter()
+    try:
+        sql, sql_params, sql_source, cache_key = await get_sql_for_question(user_query)
+    except asyncio.TimeoutError:
+        return error_response(504, f"LLM error: no answer within {LLM_TIMEOUT_SECONDS:g}s")
+    except Exception as e:
+        return error_response(500, f"LLM error: {e}")
+    sql_generation_ms = round((time.perf_counter() - started) * 1000, 2)
+    shown_sql = render_sql(sql, sql_params)
+    annotate(sql_source=sql_source)
+
+    with span("safety_check"):
+        safe = pipeline.is_safe_sql(sql)
+    if not safe:
+        return error_response(400, "Generated SQL was rejected as unsafe.", sql=shown_sql)
+
+    page_size = data.get("page_size")
+    page_token = data.get("cursor")
+    paginated = page_size is not None or page_token is not None
+    exec_sql, params, row_limit = sql, sql_params, pipeline.MAX_RESULT_ROWS
+    if paginated:
+        try:
+            page_size = int(page_size or pipeline.MAX_RESULT_ROWS)
+            if page_size < 1:
+                raise ValueError("page_size must be positive.")
+            after = pipeline.decode_page_cursor(shown_sql, page_token) if page_token else None
+        except ValueError as e:
+            return error_response(400, str(e), sql=shown_sql)
+        row_limit = min(page_size, pipeline.MAX_RESULT_ROWS)
+        exec_sql, params = pipeline.build_keyset_page_sql(sql, row_limit, after, sql_params)
+
+    try:
+        rows, db_error, from_cache = await run_sql_cached(exec_sql, params, max_rows=row_limit)
+    except QueryRejected as e:
+        return error_response(
+            400,
+            str(e),
+            sql=shown_sql,
+            estimated_rows=e.estimated_rows,
+            row_budget=e.row_budget,
+            plan=e.plan,
+        )
+    except QueryTimeout as e:
+        return error_response(504, f"Database error: {e}", sql=shown_sql)
+    if db_error and paginated and "Unknown column" in db_error:
+        db_error = f"{db_error} (pagination needs asset_id and obs_date columns in the result)"
+    if db_error:
+        return error_response(500, f"Database error: {db_error}", sql=shown_sql)
+
+    if sql_source == "llm" and cache_key:
+        # The question cache writes its file on every put.
+        await asyncio.to_thread(pipeline.question_cache.put, cache_key, sql)
+    QUERY_SOURCES.inc(sql_source=sql_source)
+
+    truncated = len(rows) > row_limit
+    rows = rows[:row_limit]
+    annotate(rows=len(rows))
+
+    origin = "Fast-path" if sql_source == "fastpath" else "LLM-generated"
+    resp = {
+        "success": True,
+        "message": f"{origin} query executed successfully. Returned {len(rows)} row(s).",
+        "sql": shown_sql,
+        "sql_source": sql_source,
+        "sql_generation_ms": sql_generation_ms,
+        "from_cache": from_cache,
+        "row_cap": pipeline.MAX_RESULT_ROWS,
+        "truncated": truncated and not paginated,
+        "data": rows,
+    }
+    if paginated:
+        resp["next_cursor"] = (
+            pipeline.encode_page_cursor(shown_sql, rows[-1]) if truncated else None
+        )
+    if response_format == "columnar":
+        resp["format"] = "columnar"
+        resp["columns"], resp["data"] = to_columnar(rows)
+    with span("serialize"):
+        return Response(dumps(resp), mimetype="application/json")
+
+
+@app.route("/api/assets", methods=["GET", "OPTIONS"])
+async def get_assets():
+    """Get list of all assets (non-LLM helper endpoint)."""
+    if request.method == "OPTIONS":
+        return options_response("GET, OPTIONS")
+
+    try:
+        assets, error = await run_sql(
+            """
+            SELECT a.asset_id, a.name, a.symbol, at.name as type_name
+            FROM Asset a
+            JOIN AssetType at ON a.asset_type_id = at.asset_type_id
+            ORDER BY a.name
+        """
+        )
+    except QueryTimeout as e:
+        return error_response(504, str(e))
+    if error:
+        return error_response(500, error)
+    return Response(dumps({"success": True, "data": assets}), mimetype="application/json")
+
+
+@app.route("/health", methods=["GET"])
+async def health_check():
+    """Health check endpoint."""
+    if db_pool is not None:
+        pool_stats = {"size": db_pool.size, "idle": db_pool.freesize, "max_size": db_pool.maxsize}
+    else:
+        pool_stats = pipeline.db_pool.stats()
+    return jsonify(
+        {
+            "status": "ok",
+            "version": pipeline.APP_VERSION,
+            "server": "async",
+            "llm_enabled": bool(anthropic_client),
+            "model": pipeline.ANTHROPIC_MODEL,
+            "db_backend": pipeline.DB_BACKEND,
+            "db_pool": pool_stats,
+            "caches": pipeline.cache_stats(),
+            "singleflight": {"llm": llm_flight.stats(), "query": query_flight.stats()},
+            "requests": {"in_flight": _in_flight, "max": ASYNC_MAX_REQUESTS},
+        }
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+async def prometheus_metrics():
+    """Request, stage, LLM token, pool and cache metrics in Prometheus text format."""
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+if __name__ == "__main__":
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    port = int(os.environ.get("FLASK_PORT", "5001"))
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    print(f"Starting async server on http://127.0.0.1:{port} (API only)")
+    asyncio.run(serve(app, config))
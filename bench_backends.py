@@ -0,0 +1,164 @@
+"""
+Compare read backends (MySQL, embedded SQLite, embedded DuckDB) on the same
+generated SQL: the canned LLM answers in a question corpus plus the fast-path
+templates its questions match. Each query is timed on every backend and
+the row counts are checked against each other.
+
+The embedded files are built from the CSV into a temporary directory first.
+MySQL is skipped when it can't be reached.
+
+Usage:
+    python bench_backends.py                        # bench_corpus.jsonl, all backends, 20 runs
+    python bench_backends.py --backends sqlite,duckdb --runs 50
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import mysql.connector
+from tabulate import tabulate
+
+import embedded_db
+from fastpath import match_question
+from load_data import DB_CONFIG
+from questions import build_asset_aliases
+
+BACKENDS = ('mysql', 'sqlite', 'duckdb')
+
+
+def corpus_queries(corpus_path, schema_path='create_schema.sql'):
+    """[(label, sql, params)] for every corpus question with canned or fast-path SQL."""
+    _, assets = embedded_db.reference_rows(schema_path)
+    aliases = build_asset_aliases(
+        [{'asset_id': a[0], 'name': a[1], 'symbol': a[2]} for a in assets]
+    )
+    queries, seen = [], set()
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('sql'):
+                sql, params = entry['sql'], None
+            else:
+                matched = match_question(entry['query'], aliases)
+                if matched is None:
+                    continue
+                sql, params = matched.sql, matched.params
+            if (sql, params) not in seen:
+                seen.add((sql, params))
+                queries.append((entry['query'], sql, params))
+    return queries
+
+
+def connect(backend, workdir, csv_file_path):
+    if backend == 'mysql':
+        return mysql.connector.connect(**DB_CONFIG)
+    path = os.path.join(workdir, embedded_db.default_path(backend))
+    started = time.perf_counter()
+    count = embedded_db.build_database(path, csv_file_path, engine=backend)
+    print(f"Built {backend} database: {count:,} rows in {time.perf_counter() - started:.2f}s")
+    return embedded_db.connect(path, backend)
+
+
+def _percentile(sorted_values, pct):
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def time_queries(conn, queries, runs):
+    """{label: {'p50_ms', 'p95_ms', 'rows'} or {'error'}} after one warm-up run per query."""
+    cursor = conn.cursor()
+    results = {}
+    for label, sql, params in queries:
+        try:
+            cursor.execute(sql, params)
+            rows = len(cursor.fetchall())
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+        except mysql.connector.Error as err:
+            results[label] = {'error': str(err).splitlines()[0]}
+            continue
+        timings.sort()
+        results[label] = {
+            'p50_ms': _percentile(timings, 50),
+            'p95_ms': _percentile(timings, 95),
+            'rows': rows,
+        }
+    cursor.close()
+    return results
+
+
+def print_comparison(queries, snapshots):
+    """One row per query with p50 per backend, the fastest backend and a row-count check."""
+    names = [name for name, _ in snapshots]
+    headers = ['query'] + [f'{name} p50 ms' for name in names] + ['fastest', 'rows']
+    table = []
+    totals = {name: 0.0 for name in names}
+    for label, _, _ in queries:
+        row = [label if len(label) <= 48 else label[:45] + '...']
+        timed = {}
+        for name, results in snapshots:
+            result = results[label]
+            if 'error' in result:
+                row.append('error')
+            else:
+                row.append(f"{result['p50_ms']:.2f}")
+                timed[name] = result
+                totals[name] += result['p50_ms']
+        row.append(min(timed, key=lambda n: timed[n]['p50_ms']) if timed else '-')
+        counts = {result['rows'] for result in timed.values()}
+        row.append(str(counts.pop()) if len(counts) == 1 else 'MISMATCH ' + '/'.join(
+            str(timed[n]['rows']) for n in timed))
+        table.append(row)
+    table.append(['total (queries that ran)'] + [f'{totals[name]:.2f}' for name in names] + ['', ''])
+    print(tabulate(table, headers=headers, tablefmt='grid', disable_numparse=True))
+
+    for name, results in snapshots:
+        for label, result in results.items():
+            if 'error' in result:
+                print(f"{name}: {label}: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default='bench_corpus.jsonl')
+    parser.add_argument('--csv', default='Stock Market Dataset.csv', help='data for the embedded backends')
+    parser.add_argument('--backends', default=','.join(BACKENDS),
+                        help='comma-separated subset of: ' + ', '.join(BACKENDS))
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backend(s): {', '.join(unknown)}")
+
+    queries = corpus_queries(args.corpus)
+    workdir = tempfile.mkdtemp(prefix='bench_backends_')
+    snapshots = []
+    for backend in backends:
+        try:
+            conn = connect(backend, workdir, args.csv)
+        except (mysql.connector.Error, RuntimeError) as err:
+            print(f"Skipping {backend}: {err}")
+            continue
+        try:
+            snapshots.append((backend, time_queries(conn, queries, args.runs)))
+        finally:
+            conn.close()
+
+    if snapshots:
+        print(f"\n{len(queries)} queries, {args.runs} timed runs each:")
+        print_comparison(queries, snapshots)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Query workload benchmark for the market_data schema: point lookups,
+date-range scans, cross-sectional queries and symbol joins, timed against
+the live database. migrate.py --benchmark runs it before and after each
+migration; it can also be run on its own.
+
+Usage:
+    python bench_queries.py             # 20 timed runs per query
+    python bench_queries.py --runs 100
+"""
+
+import argparse
+import time
+
+import mysql.connector
+from tabulate import tabulate
+
+from load_data import DB_CONFIG
+
+# (name, SQL, function building params from the sample values)
+WORKLOAD = [
+    ('point: asset_id + date',
+     'SELECT price, volume FROM DailyMarketData WHERE asset_id = %s AND obs_date = %s',
+     lambda s: (s['asset_id'], s['mid_date'])),
+    ('point: symbol join + date',
+     'SELECT d.price FROM DailyMarketData d JOIN Asset a ON a.asset_id = d.asset_id '
+     'WHERE a.symbol = %s AND d.obs_date = %s',
+     lambda s: (s['symbol'], s['mid_date'])),
+    ('symbol lookup',
+     'SELECT asset_id, name FROM Asset WHERE symbol = %s',
+     lambda s: (s['symbol'],)),
+    ('range: one symbol, 3 months',
+     'SELECT d.obs_date, d.price FROM DailyMarketData d JOIN Asset a ON a.asset_id = d.asset_id '
+     'WHERE a.symbol = %s AND d.obs_date BETWEEN %s AND %s ORDER BY d.obs_date',
+     lambda s: (s['symbol'], s['range_start'], s['mid_date'])),
+    ('cross-section: all assets on a date',
+     'SELECT a.symbol, d.price FROM DailyMarketData d JOIN Asset a ON a.asset_id = d.asset_id '
+     'WHERE d.obs_date = %s',
+     lambda s: (s['mid_date'],)),
+    ('cross-section: rank by price on a date',
+     'SELECT d.asset_id, d.price FROM DailyMarketData d WHERE d.obs_date = %s '
+     'ORDER BY d.price DESC LIMIT 5',
+     lambda s: (s['mid_date'],)),
+    ('cross-section: daily averages, 3 months',
+     'SELECT obs_date, COUNT(*) AS n, AVG(price) AS avg_price FROM DailyMarketData '
+     'WHERE obs_date BETWEEN %s AND %s GROUP BY obs_date',
+     lambda s: (s['range_start'], s['mid_date'])),
+    ('cross-section: latest date',
+     'SELECT a.symbol, d.price FROM DailyMarketData d JOIN Asset a ON a.asset_id = d.asset_id '
+     'WHERE d.obs_date = (SELECT MAX(obs_date) FROM DailyMarketData)',
+     lambda s: ()),
+]
+
+
+def sample_values(cursor):
+    """Pick an asset and dates in the middle of the data so every query returns rows."""
+    cursor.execute('SELECT asset_id, symbol FROM Asset ORDER BY asset_id LIMIT 1')
+    asset_id, symbol = cursor.fetchone()
+    cursor.execute('SELECT obs_date FROM DailyMarketData WHERE asset_id = %s ORDER BY obs_date',
+                   (asset_id,))
+    dates = [row[0] for row in cursor.fetchall()]
+    if not dates:
+        raise RuntimeError('DailyMarketData is empty; load data before benchmarking.')
+    mid = len(dates) // 2
+    return {
+        'asset_id': asset_id,
+        'symbol': symbol,
+        'mid_date': str(dates[mid]),
+        'range_start': str(dates[max(mid - 63, 0)]),
+    }
+
+
+def _percentile(sorted_values, pct):
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_workload(conn, runs=20):
+    """
+    Time every workload query `runs` times (after one warm-up run).
+    Returns {name: {'p50_ms', 'p95_ms', 'rows', 'access'}} where access is the
+    DailyMarketData (or Asset) access type and key from EXPLAIN.
+    """
+    cursor = conn.cursor()
+    samples = sample_values(cursor)
+    results = {}
+    for name, sql, make_params in WORKLOAD:
+        params = make_params(samples)
+
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = cursor.column_names
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        steps = [p for p in plan if p.get('table') in ('d', 'DailyMarketData')] or plan
+        access = ', '.join(f"{p.get('type')}/{p.get('key') or '-'}" for p in steps)
+
+        cursor.execute(sql, params)
+        rows = len(cursor.fetchall())
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[name] = {
+            'p50_ms': _percentile(timings, 50),
+            'p95_ms': _percentile(timings, 95),
+            'rows': rows,
+            'access': access,
+        }
+    cursor.close()
+    return results
+
+
+def print_comparison(snapshots):
+    """
+    Print one row per query with p50 latency for each (label, results)
+    snapshot, plus the access path of the first and last snapshot.
+    """
+    headers = ['query'] + [f'{label} p50 ms' for label, _ in snapshots]
+    if len(snapshots) > 1:
+        headers += ['speed-up', 'access before', 'access after']
+    else:
+        headers += ['p95 ms', 'access']
+    table = []
+    for name, _, _ in WORKLOAD:
+        row = [name] + [f"{results[name]['p50_ms']:.2f}" for _, results in snapshots]
+        first, last = snapshots[0][1][name], snapshots[-1][1][name]
+        if len(snapshots) > 1:
+            speedup = first['p50_ms'] / last['p50_ms'] if last['p50_ms'] else 0
+            row += [f'{speedup:.1f}x', first['access'], last['access']]
+        else:
+            row += [f"{first['p95_ms']:.2f}", first['access']]
+        table.append(row)
+    print(tabulate(table, headers=headers, tablefmt='grid', disable_numparse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as err:
+        print(f"Error connecting to database: {err}")
+        return
+    try:
+        print_comparison([('current', run_workload(conn, args.runs))])
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""
+Replay a question corpus against the /api/query pipeline and report latency.
+
+The Flask app runs in-process (test client, one per worker thread). The
+Anthropic client is replaced by llm_stub.StubAnthropic with configurable
+latency and canned SQL, and the database by an embedded SQLite (or, with
+--db duckdb, DuckDB) copy of `Stock Market Dataset.csv` built by
+embedded_db.py, so no API key or MySQL server is needed. Pass --db mysql to
+use the MySQL database from the environment.
+
+The corpus is JSON lines like requests.jsonl: {"query": ..., "sql": ...},
+where "sql" is the canned LLM answer (optional; fast-path questions don't
+need one).
+
+Usage:
+    python bench_replay.py                                  # bench_corpus.jsonl, 200 requests, 8 workers
+    python bench_replay.py --requests 1000 --concurrency 32 --llm-latency-ms 1200
+    python bench_replay.py --output run.json --compare baseline.json
+    python bench_replay.py --llm-prefill-ms-per-1k 150 --llm-token-ms 15 \
+        --llm-trailing-text " This query returns..." --no-prompt-cache --no-llm-stream
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tabulate import tabulate
+
+# Stages timed by wrapping app functions. Times are exclusive: a stage
+# called inside another (e.g. the asset list inside the LLM call) is not
+# counted twice.
+STAGES = [
+    ("asset_reference", "get_asset_reference"),
+    ("fastpath", "match_question"),
+    ("llm", "generate_sql_from_llm"),
+    ("data_version", "_load_data_version"),
+    ("cost_check", "check_query_cost"),
+    ("execute", "run_sql"),
+]
+
+_local = threading.local()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def latency_summary(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def load_corpus(path):
+    corpus = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if not entry.get("query"):
+                    raise ValueError(f"Corpus entry without a query: {line.strip()}")
+                corpus.append(entry)
+    return corpus
+
+
+def instrument(app_module):
+    """Wrap the stage functions in app.py so each request records its span times."""
+
+    def wrap(stage, fn):
+        def timed(*args, **kwargs):
+            spans = getattr(_local, "spans", None)
+            if spans is None:
+                return fn(*args, **kwargs)
+            stack = _local.stack
+            stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                children = stack.pop()
+                spans[stage] = spans.get(stage, 0.0) + (elapsed - children) * 1000
+                if stack:
+                    stack[-1] += elapsed
+
+        return timed
+
+    for stage, name in STAGES:
+        setattr(app_module, name, wrap(stage, getattr(app_module, name)))
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    corpus = load_corpus(args.corpus)
+    workdir = tempfile.mkdtemp(prefix="bench_replay_")
+
+    # The app reads its settings at import time.
+    os.environ["SQL_CACHE_PATH"] = os.path.join(workdir, "sql_cache.json")
+    os.environ["SQL_CACHE_ENABLED"] = "false" if args.no_sql_cache else "true"
+    os.environ["RESULT_CACHE_ENABLED"] = "false" if args.no_result_cache else "true"
+    os.environ["FASTPATH_ENABLED"] = "false" if args.no_fastpath else "true"
+    os.environ["LLM_PROMPT_CACHE_ENABLED"] = "false" if args.no_prompt_cache else "true"
+    os.environ["LLM_STREAM_ENABLED"] = "false" if args.no_llm_stream else "true"
+    os.environ["MYSQL_POOL_SIZE"] = str(args.concurrency)
+    os.environ["DB_BACKEND"] = args.db
+    if args.db != "mysql":
+        import embedded_db
+
+        db_path = os.path.join(workdir, embedded_db.default_path(args.db))
+        started = time.perf_counter()
+        count = embedded_db.build_database(db_path, args.csv, engine=args.db)
+        print(f"Built {args.db} stand-in with {count:,} rows in {time.perf_counter() - started:.2f}s")
+        os.environ["EMBEDDED_DB_PATH"] = db_path
+
+    import app as app_module
+    from llm_stub import StubAnthropic, min_cache_tokens
+
+    stub = StubAnthropic(
+        canned_sql={e["query"]: e["sql"] for e in corpus if e.get("sql")},
+        latency_ms=args.llm_latency_ms,
+        jitter_ms=args.llm_jitter_ms,
+        seed=args.seed,
+        prefill_ms_per_1k=args.llm_prefill_ms_per_1k,
+        token_ms=args.llm_token_ms,
+        trailing_text=args.llm_trailing_text,
+        min_cache_tokens=args.llm_min_cache_tokens,
+    )
+    app_module.anthropic_client = stub
+    instrument(app_module)
+
+    rng = random.Random(args.seed)
+    schedule = [corpus[i % len(corpus)] for i in range(args.requests)]
+    rng.shuffle(schedule)
+    warmup = [corpus[i % len(corpus)] for i in range(args.warmup)]
+
+    results = []
+    results_lock = threading.Lock()
+    clients = threading.local()
+
+    def send(entry, record=True):
+        client = getattr(clients, "client", None)
+        if client is None:
+            client = clients.client = app_module.app.test_client()
+        _local.spans, _local.stack = {}, []
+        started = time.perf_counter()
+        response = client.post("/api/query", json={"query": entry["query"]})
+        total = (time.perf_counter() - started) * 1000
+        spans, _local.spans = _local.spans, None
+        body = response.get_json(silent=True) or {}
+        if record:
+            with results_lock:
+                results.append(
+                    {
+                        "query": entry["query"],
+                        "status": response.status_code,
+                        "source": body.get("sql_source", "error"),
+                        "from_cache": body.get("from_cache"),
+                        "total_ms": total,
+                        "spans": spans,
+                    }
+                )
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda e: send(e, record=False), warmup))
+        started = time.perf_counter()
+        list(pool.map(send, schedule))
+        wall = time.perf_counter() - started
+
+    ok = [r for r in results if r["status"] == 200]
+    stages = {}
+    for stage, _ in STAGES + [("other", None)]:
+        values = []
+        for r in results:
+            if stage == "other":
+                values.append(max(r["total_ms"] - sum(r["spans"].values()), 0.0))
+            elif stage in r["spans"]:
+                values.append(r["spans"][stage])
+        summary = latency_summary(values)
+        summary["total_ms"] = round(sum(values), 3)
+        stages[stage] = summary
+
+    by_source = {}
+    for source in sorted({r["source"] for r in results}):
+        by_source[source] = latency_summary([r["total_ms"] for r in results if r["source"] == source])
+
+    statuses = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+
+    return {
+        "meta": {
+            "app_version": app_module.APP_VERSION,
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "corpus": args.corpus,
+            "corpus_size": len(corpus),
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "db": args.db,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_prefill_ms_per_1k": args.llm_prefill_ms_per_1k,
+            "llm_token_ms": args.llm_token_ms,
+            "llm_trailing_text": args.llm_trailing_text,
+            "llm_model": app_module.ANTHROPIC_MODEL,
+            "llm_min_cache_tokens": (args.llm_min_cache_tokens if args.llm_min_cache_tokens is not None
+                                     else min_cache_tokens(app_module.ANTHROPIC_MODEL)),
+            "prompt_cache": not args.no_prompt_cache,
+            "llm_stream": not args.no_llm_stream,
+            "sql_cache": not args.no_sql_cache,
+            "result_cache": not args.no_result_cache,
+            "fastpath": not args.no_fastpath,
+        },
+        "summary": {
+            "duration_s": round(wall, 3),
+            "throughput_rps": round(len(results) / wall, 2) if wall else None,
+            "errors": len(results) - len(ok),
+            "status_codes": statuses,
+            "llm_calls": stub.calls,
+            "llm_tokens": dict(stub.tokens),
+            "llm_prefix_tokens": stub.prefix_tokens,
+            "llm_short_prefix_calls": stub.short_prefix_calls,
+            "latency": latency_summary([r["total_ms"] for r in results]),
+        },
+        "by_source": by_source,
+        "stages": stages,
+    }
+
+
+def print_report(report):
+    summary = report["summary"]
+    latency = summary["latency"]
+    print(
+        f"\n{report['meta']['requests']} requests, concurrency {report['meta']['concurrency']}: "
+        f"{summary['throughput_rps']} req/s, {summary['errors']} error(s), "
+        f"{summary['llm_calls']} LLM call(s)"
+    )
+    tokens = summary.get("llm_tokens")
+    if tokens:
+        print(
+            f"LLM tokens: {tokens['input']} input, {tokens['cache_read']} cache read, "
+            f"{tokens['cache_write']} cache write, {tokens['output']} output"
+        )
+    if summary.get("llm_short_prefix_calls"):
+        meta = report["meta"]
+        print(
+            f"Prompt cache: the cacheable prefix is {summary['llm_prefix_tokens']} tokens, below the "
+            f"{meta['llm_min_cache_tokens']}-token minimum for {meta['llm_model']}, so it was not cached "
+            f"on {summary['llm_short_prefix_calls']} call(s)"
+        )
+    print(
+        f"Latency ms: p50 {latency.get('p50_ms')}  p95 {latency.get('p95_ms')}  "
+        f"p99 {latency.get('p99_ms')}  max {latency.get('max_ms')}\n"
+    )
+    print(tabulate(
+        [[source, s["count"], s.get("p50_ms"), s.get("p95_ms"), s.get("p99_ms")]
+         for source, s in report["by_source"].items()],
+        headers=["sql_source", "requests", "p50 ms", "p95 ms", "p99 ms"],
+        tablefmt="grid",
+    ))
+    print()
+    print(tabulate(
+        [[stage, s["count"], s.get("mean_ms"), s.get("p50_ms"), s.get("p95_ms"), s.get("p99_ms"), s["total_ms"]]
+         for stage, s in report["stages"].items()],
+        headers=["stage", "calls", "mean ms", "p50 ms", "p95 ms", "p99 ms", "total ms"],
+        tablefmt="grid",
+    ))
+
+
+def print_comparison(baseline, report):
+    """Print headline metrics of a previous run next to this one."""
+    def metrics(r):
+        latency = r["summary"]["latency"]
+        return {
+            "throughput_rps": r["summary"]["throughput_rps"],
+            "p50_ms": latency.get("p50_ms"),
+            "p95_ms": latency.get("p95_ms"),
+            "p99_ms": latency.get("p99_ms"),
+            "errors": r["summary"]["errors"],
+            "llm_input_tokens": r["summary"].get("llm_tokens", {}).get("input"),
+            "llm_output_tokens": r["summary"].get("llm_tokens", {}).get("output"),
+        }
+
+    before, after = metrics(baseline), metrics(report)
+    rows = []
+    for key in before:
+        a, b = before[key], after[key]
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ""
+        rows.append([key, a, b, change])
+    print(f"\nCompared with {baseline['meta'].get('git_revision')} ({baseline['meta'].get('timestamp')}):")
+    print(tabulate(rows, headers=["metric", "baseline", "this run", "change"], tablefmt="grid"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default="bench_corpus.jsonl")
+    parser.add_argument("--csv", default="Stock Market Dataset.csv", help="data for the SQLite stand-in")
+    parser.add_argument("--db", choices=["sqlite", "duckdb", "mysql"], default="sqlite")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=0, help="unrecorded requests sent first")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--llm-prefill-ms-per-1k", type=float, default=0.0,
+                        help="stub time to first token per 1,000 uncached input tokens")
+    parser.add_argument("--llm-token-ms", type=float, default=0.0, help="stub time per output token")
+    parser.add_argument("--llm-trailing-text", default="",
+                        help="text the stub writes after the SQL, e.g. an explanation")
+    parser.add_argument("--llm-min-cache-tokens", type=int, default=None,
+                        help="shortest prefix the stub caches (default: the model's minimum)")
+    parser.add_argument("--no-prompt-cache", action="store_true")
+    parser.add_argument("--no-llm-stream", action="store_true")
+    parser.add_argument("--no-sql-cache", action="store_true")
+    parser.add_argument("--no-result-cache", action="store_true")
+    parser.add_argument("--no-fastpath", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="previous JSON report to compare with")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Compare DailyMarketData storage layouts: the default table (INT asset ids,
+DECIMAL(18,4) prices, no partitions) and the compact profile of migration
+0006 (SMALLINT ids, DECIMAL(12,4) prices, yearly RANGE partitions on
+obs_date, zlib page compression).
+
+Both layouts are built side by side as scratch tables filled from
+DailyMarketData, optionally scaled up with synthetic copies of every asset,
+and compared on:
+- table size: logical data + index bytes, and bytes allocated on disk
+  (below the logical size only where page compression could punch holes)
+- buffer pool footprint: pages of each table resident after the scans;
+  the pool caches uncompressed pages, so only the tighter types shrink it
+- range-scan latency: p50/p95 of date-range queries, with the partitions
+  EXPLAIN says each one reads
+
+The scratch tables have no foreign key (the synthetic asset ids aren't in
+Asset) and are dropped afterwards unless --keep is given. Reading
+INNODB_BUFFER_PAGE scans the whole buffer pool; avoid it on a busy server.
+
+Usage:
+    python bench_storage.py                 # current data, 20 runs per query
+    python bench_storage.py --scale 100     # 100 copies of every asset
+    python bench_storage.py --keep          # leave the scratch tables for inspection
+"""
+
+import argparse
+import time
+
+import mysql.connector
+from tabulate import tabulate
+
+from load_data import DB_CONFIG
+
+LAYOUTS = {
+    'default': """
+        CREATE TABLE {table} (
+            asset_id    INT NOT NULL,
+            obs_date    DATE NOT NULL,
+            price       DECIMAL(18,4) NOT NULL,
+            volume      BIGINT NULL,
+            PRIMARY KEY (asset_id, obs_date),
+            INDEX idx_dmd_date_price (obs_date, price),
+            CHECK (price > 0),
+            CHECK (volume IS NULL OR volume >= 0)
+        )
+    """,
+    'compact': """
+        CREATE TABLE {table} (
+            asset_id    SMALLINT UNSIGNED NOT NULL,
+            obs_date    DATE NOT NULL,
+            price       DECIMAL(12,4) NOT NULL,
+            volume      BIGINT UNSIGNED NULL,
+            PRIMARY KEY (asset_id, obs_date),
+            INDEX idx_dmd_date_price (obs_date, price),
+            CHECK (price > 0),
+            CHECK (volume IS NULL OR volume >= 0)
+        ) COMPRESSION = 'zlib'
+        PARTITION BY RANGE COLUMNS (obs_date) ({partitions})
+    """,
+}
+
+# (name, SQL with {table}, function building params from the sample values)
+WORKLOAD = [
+    ('range: one asset, 1 year',
+     'SELECT obs_date, price FROM {table} WHERE asset_id = %s AND obs_date BETWEEN %s AND %s '
+     'ORDER BY obs_date',
+     lambda s: (s['asset_id'], s['year_start'], s['year_end'])),
+    ('range: all assets, 1 month',
+     'SELECT asset_id, obs_date, price FROM {table} WHERE obs_date BETWEEN %s AND %s',
+     lambda s: (s['month_start'], s['month_end'])),
+    ('range: daily averages, 1 year',
+     'SELECT obs_date, AVG(price), SUM(volume) FROM {table} WHERE obs_date BETWEEN %s AND %s '
+     'GROUP BY obs_date',
+     lambda s: (s['year_start'], s['year_end'])),
+    ('full scan: average per asset',
+     'SELECT asset_id, AVG(price) FROM {table} GROUP BY asset_id',
+     lambda s: ()),
+]
+
+
+def scratch_table(layout):
+    return f'DailyMarketData_bench_{layout}'
+
+
+def partition_clause(first_year, last_year):
+    """Yearly partitions like migration 0006's, covering first_year..last_year."""
+    parts = [f"PARTITION p_old VALUES LESS THAN ('{first_year}-01-01')"]
+    parts += [f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')"
+              for year in range(first_year, last_year + 1)]
+    parts.append('PARTITION p_future VALUES LESS THAN (MAXVALUE)')
+    return ', '.join(parts)
+
+
+def build_tables(conn, scale):
+    """(Re)create and fill both scratch tables; returns the row count of each."""
+    cursor = conn.cursor()
+    cursor.execute('SELECT MIN(obs_date), MAX(obs_date), MAX(asset_id) FROM DailyMarketData')
+    first, last, max_asset_id = cursor.fetchone()
+    if first is None:
+        raise RuntimeError('DailyMarketData is empty; load data before benchmarking.')
+    # Copy k of asset a becomes asset a + k * stride
+    stride = max_asset_id + 1
+    if (scale - 1) * stride + max_asset_id > 65535:
+        raise RuntimeError(f'--scale {scale} needs asset ids past SMALLINT UNSIGNED; '
+                           f'use at most {65535 // stride}')
+
+    counts = {}
+    for layout, ddl in LAYOUTS.items():
+        table = scratch_table(layout)
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute(ddl.format(table=table, partitions=partition_clause(first.year, last.year)))
+        started = time.perf_counter()
+        for copy in range(scale):
+            cursor.execute(
+                f'INSERT INTO {table} (asset_id, obs_date, price, volume) '
+                'SELECT asset_id + %s, obs_date, price, volume FROM DailyMarketData',
+                (copy * stride,),
+            )
+            conn.commit()
+        cursor.execute(f'ANALYZE TABLE {table}')
+        cursor.fetchall()
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        counts[layout] = cursor.fetchone()[0]
+        print(f"Built {table}: {counts[layout]:,} rows in {time.perf_counter() - started:.2f}s")
+    cursor.close()
+    return counts
+
+
+def sample_values(cursor):
+    """The first asset and the last full year (or the last year) in the data."""
+    cursor.execute('SELECT MIN(asset_id), MIN(obs_date), MAX(obs_date) FROM DailyMarketData')
+    asset_id, first, last = cursor.fetchone()
+    year = last.year - 1 if last.year - 1 >= first.year else last.year
+    return {
+        'asset_id': asset_id,
+        'year_start': f'{year}-01-01',
+        'year_end': f'{year}-12-31',
+        'month_start': f'{year}-06-01',
+        'month_end': f'{year}-06-30',
+    }
+
+
+def table_sizes(cursor, table):
+    """(logical data + index bytes, file bytes, bytes allocated on disk)."""
+    cursor.execute('SET SESSION information_schema_stats_expiry = 0')
+    cursor.execute(
+        'SELECT DATA_LENGTH + INDEX_LENGTH FROM information_schema.TABLES '
+        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+        (table,),
+    )
+    logical = cursor.fetchone()[0]
+    # One tablespace per table, or per partition (name#p#partition)
+    cursor.execute(
+        'SELECT COALESCE(SUM(FILE_SIZE), 0), COALESCE(SUM(ALLOCATED_SIZE), 0) '
+        'FROM information_schema.INNODB_TABLESPACES '
+        "WHERE NAME = CONCAT(DATABASE(), '/', %s) OR NAME LIKE CONCAT(DATABASE(), '/', %s, '#p#%%')",
+        (table, table),
+    )
+    file_size, allocated = cursor.fetchone()
+    return int(logical), int(file_size), int(allocated)
+
+
+def buffer_pool_pages(cursor, table):
+    """(pages, bytes of data in them) of `table` currently in the buffer pool."""
+    cursor.execute(
+        'SELECT COUNT(*), COALESCE(SUM(DATA_SIZE), 0) FROM information_schema.INNODB_BUFFER_PAGE '
+        "WHERE TABLE_NAME LIKE CONCAT('`', DATABASE(), '`.`', %s, '`%%')",
+        (table,),
+    )
+    pages, data_size = cursor.fetchone()
+    return int(pages), int(data_size)
+
+
+def _percentile(sorted_values, pct):
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_workload(conn, table, samples, runs):
+    """{name: {'p50_ms', 'p95_ms', 'rows', 'partitions'}} after one warm-up run per query."""
+    cursor = conn.cursor()
+    results = {}
+    for name, sql, make_params in WORKLOAD:
+        sql, params = sql.format(table=table), make_params(samples)
+        cursor.execute('EXPLAIN ' + sql, params)
+        plan = [dict(zip(cursor.column_names, row)) for row in cursor.fetchall()]
+        read = {p for step in plan if step.get('partitions') for p in step['partitions'].split(',')}
+
+        cursor.execute(sql, params)
+        rows = len(cursor.fetchall())
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results[name] = {
+            'p50_ms': _percentile(timings, 50),
+            'p95_ms': _percentile(timings, 95),
+            'rows': rows,
+            'partitions': str(len(read)) if read else '-',
+        }
+    cursor.close()
+    return results
+
+
+def _mb(size):
+    return f'{size / 1024 / 1024:,.1f}'
+
+
+def _ratio(before, after):
+    return f'{after / before:.2f}x' if before else '-'
+
+
+def print_report(counts, sizes, pools, timings):
+    layouts = list(LAYOUTS)
+    rows = [['rows'] + [f'{counts[layout]:,}' for layout in layouts] + ['']]
+    for label, index in (('data + index MB', 0), ('file MB', 1), ('allocated on disk MB', 2)):
+        rows.append([label] + [_mb(sizes[layout][index]) for layout in layouts]
+                    + [_ratio(sizes['default'][index], sizes['compact'][index])])
+    rows.append(['buffer pool pages'] + [f'{pools[layout][0]:,}' for layout in layouts]
+                + [_ratio(pools['default'][0], pools['compact'][0])])
+    rows.append(['buffer pool data MB'] + [_mb(pools[layout][1]) for layout in layouts]
+                + [_ratio(pools['default'][1], pools['compact'][1])])
+    print(tabulate(rows, headers=['storage'] + layouts + ['compact / default'],
+                   tablefmt='grid', disable_numparse=True))
+
+    headers = ['query'] + [f'{layout} p50 ms' for layout in layouts] + ['compact p95 ms', 'speed-up',
+                                                              'partitions read', 'rows']
+    table = []
+    for name, _, _ in WORKLOAD:
+        default, compact = timings['default'][name], timings['compact'][name]
+        speedup = default['p50_ms'] / compact['p50_ms'] if compact['p50_ms'] else 0
+        rows_check = str(default['rows']) if default['rows'] == compact['rows'] else \
+            f"MISMATCH {default['rows']}/{compact['rows']}"
+        table.append([name, f"{default['p50_ms']:.2f}", f"{compact['p50_ms']:.2f}",
+                      f"{compact['p95_ms']:.2f}", f'{speedup:.1f}x', compact['partitions'],
+                      rows_check])
+    print(tabulate(table, headers=headers, tablefmt='grid', disable_numparse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help='copies of every asset to load')
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch tables')
+    args = parser.parse_args()
+
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as err:
+        print(f"Error connecting to database: {err}")
+        return
+    try:
+        try:
+            counts = build_tables(conn, max(args.scale, 1))
+        except RuntimeError as err:
+            print(err)
+            return
+        cursor = conn.cursor()
+        samples = sample_values(cursor)
+        sizes, pools, timings = {}, {}, {}
+        for layout in LAYOUTS:
+            table = scratch_table(layout)
+            timings[layout] = run_workload(conn, table, samples, args.runs)
+            sizes[layout] = table_sizes(cursor, table)
+            pools[layout] = buffer_pool_pages(cursor, table)
+        print(f"\n{args.runs} timed runs per query:")
+        print_report(counts, sizes, pools, timings)
+        if not args.keep:
+            for layout in LAYOUTS:
+                cursor.execute(f'DROP TABLE IF EXISTS {scratch_table(layout)}')
+        cursor.close()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark the wide-to-long CSV transform in load_data.py: the per-cell
+DictReader path (iter_csv_records) against the vectorized numpy path
+(read_csv_columnar + columnar_to_records). No database is needed.
+
+Usage:
+    python bench_transform.py                      # sample file, 5 runs
+    python bench_transform.py --scale 20 --runs 3  # file repeated 20x (longer history)
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from tabulate import tabulate
+
+import load_data
+
+
+def make_scaled_copy(csv_file_path, scale):
+    """Write a copy of the CSV with its data rows repeated `scale` times."""
+    with open(csv_file_path, 'r', encoding='utf-8') as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith('\n'):
+        body += '\n'
+    tmp = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+    with tmp:
+        tmp.write(header)
+        for _ in range(scale):
+            tmp.write(body)
+    return tmp.name
+
+
+def time_path(fn, runs):
+    timings = []
+    records = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        records = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), sum(timings) / len(timings), records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_file', nargs='?', default='Stock Market Dataset.csv')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=1, help='repeat the data rows N times')
+    args = parser.parse_args()
+
+    if load_data.np is None:
+        print("numpy is not installed; install it to benchmark the columnar path.")
+        return
+
+    path = args.csv_file if args.scale == 1 else make_scaled_copy(args.csv_file, args.scale)
+    try:
+        def per_cell():
+            return list(load_data.iter_csv_records(path, {'errors': 0}))
+
+        def columnar():
+            columns = load_data.read_csv_columnar(path, {'errors': 0})
+            return list(load_data.columnar_to_records(columns))
+
+        def columnar_arrays():
+            return load_data.read_csv_columnar(path, {'errors': 0})
+
+        cell_best, cell_mean, cell_records = time_path(per_cell, args.runs)
+        col_best, col_mean, col_records = time_path(columnar, args.runs)
+        arr_best, arr_mean, _ = time_path(columnar_arrays, args.runs)
+    finally:
+        if path != args.csv_file:
+            os.remove(path)
+
+    n = len(cell_records)
+    print(f"File: {args.csv_file} x{args.scale} -> {n:,} records, {args.runs} run(s) each\n")
+    print(tabulate(
+        [
+            ['per-cell (DictReader)', f"{cell_best * 1000:.1f}", f"{cell_mean * 1000:.1f}", f"{n / cell_best:,.0f}"],
+            ['columnar (numpy)', f"{col_best * 1000:.1f}", f"{col_mean * 1000:.1f}", f"{n / col_best:,.0f}"],
+            ['  arrays only (no tuples)', f"{arr_best * 1000:.1f}", f"{arr_mean * 1000:.1f}", f"{n / arr_best:,.0f}"],
+        ],
+        headers=['path', 'best ms', 'mean ms', 'records/sec'],
+        tablefmt='grid',
+    ))
+    print(f"\nSpeed-up (best): {cell_best / col_best:.1f}x")
+    print(f"Outputs identical: {cell_records == col_records}")
+
+
+if __name__ == '__main__':
+    main()
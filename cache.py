@@ -0,0 +1,255 @@
+"""
+In-process caches used by the Flask API.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache whose entries expire after `ttl` seconds.
+
+    get() takes a loader that returns (value, cacheable). Only one thread runs
+    the loader for a given cache at a time; while it does, other threads keep
+    getting the previous (stale) value if there is one, so an expiry never
+    stalls every request behind the database.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        if entry and not self._load_lock.acquire(blocking=False):
+            return entry[0]
+        if not entry:
+            self._load_lock.acquire()
+        try:
+            # Another thread may have refreshed it while we waited.
+            with self._lock:
+                fresh = self._entries.get(key)
+                if fresh and fresh[1] > time.monotonic():
+                    return fresh[0]
+            value, cacheable = loader()
+            if cacheable:
+                with self._lock:
+                    self._entries[key] = (value, time.monotonic() + self.ttl)
+            return value
+        finally:
+            self._load_lock.release()
+
+    def peek(self, key):
+        """The value if present and fresh, else None (for callers that can't block on a loader)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class PersistentLRUCache:
+    """
+    Thread-safe LRU cache of JSON-serialisable values mirrored to a file.
+
+    The file is rewritten atomically on every put() (misses are rare and each
+    one already costs an LLM call, so the write is cheap by comparison).
+    `namespace` is stored alongside the entries; a file written under a
+    different namespace (e.g. another model or prompt version) is ignored.
+    """
+
+    def __init__(self, path, max_entries=1000, namespace=""):
+        self.path = path
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"WARNING: ignoring unreadable cache file {self.path}: {e}")
+            return
+        if stored.get("namespace") != self.namespace:
+            return
+        for key, value in stored.get("entries", []):
+            self._entries[key] = value
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        """Called with the lock held."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"namespace": self.namespace, "entries": list(self._entries.items())},
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"WARNING: could not write cache file {self.path}: {e}")
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def estimate_size(rows):
+    """Approximate in-memory size in bytes of a list of row dicts."""
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row)
+        for value in row.values():
+            total += sys.getsizeof(value)
+    return total
+
+
+class SizedLRUCache:
+    """
+    Thread-safe LRU cache bounded by a memory budget in bytes rather than an
+    entry count. Least recently used entries are evicted until a new entry
+    fits; an entry larger than the whole budget is never stored.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            while self._entries and self._bytes + size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (value, size)
+            self._bytes += size
+            return True
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
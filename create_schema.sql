@@ -27,6 +27,7 @@ CREATE TABLE Asset (
     symbol          VARCHAR(20) NOT NULL,
     asset_type_id   INT NOT NULL,
     base_currency   CHAR(3) NOT NULL DEFAULT 'USD',
+    CONSTRAINT uq_asset_symbol UNIQUE (symbol),
     FOREIGN KEY (asset_type_id) REFERENCES AssetType(asset_type_id)
 );
 
@@ -39,11 +40,163 @@ CREATE TABLE DailyMarketData (
     price       DECIMAL(18,4) NOT NULL,
     volume      BIGINT NULL,
     PRIMARY KEY (asset_id, obs_date),
+    -- Date-first scans: all assets on a date, ranking by price on a date
+    INDEX idx_dmd_date_price (obs_date, price),
     FOREIGN KEY (asset_id) REFERENCES Asset(asset_id),
     CHECK (price > 0),
     CHECK (volume IS NULL OR volume >= 0)
 );
 
+-- Optional storage profile "compact" for histories of tens of millions
+-- of rows: SMALLINT asset ids, DECIMAL(12,4) prices, yearly RANGE
+-- partitions on obs_date and zlib page compression, without the foreign
+-- key (partitioned InnoDB tables can't have one). Same layout as
+-- migrations/0006_compact_daily_market_data.sql. Select it with
+--   mysql -u root -p -e "SET @storage_profile = 'compact'; SOURCE create_schema.sql"
+SET @dmd_fk = (SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+               WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'DailyMarketData' LIMIT 1);
+SET @dmd_drop_fk = IF(@storage_profile = 'compact',
+                      CONCAT('ALTER TABLE DailyMarketData DROP FOREIGN KEY `', @dmd_fk, '`'), 'DO 0');
+PREPARE dmd_drop_fk FROM @dmd_drop_fk;
+EXECUTE dmd_drop_fk;
+DEALLOCATE PREPARE dmd_drop_fk;
+SET @dmd_compact = IF(@storage_profile = 'compact', '
+    ALTER TABLE DailyMarketData
+        MODIFY asset_id SMALLINT UNSIGNED NOT NULL,
+        MODIFY price DECIMAL(12,4) NOT NULL,
+        MODIFY volume BIGINT UNSIGNED NULL,
+        COMPRESSION = ''zlib''
+    PARTITION BY RANGE COLUMNS (obs_date) (
+        PARTITION p_old VALUES LESS THAN (''2019-01-01''),
+        PARTITION p2019 VALUES LESS THAN (''2020-01-01''),
+        PARTITION p2020 VALUES LESS THAN (''2021-01-01''),
+        PARTITION p2021 VALUES LESS THAN (''2022-01-01''),
+        PARTITION p2022 VALUES LESS THAN (''2023-01-01''),
+        PARTITION p2023 VALUES LESS THAN (''2024-01-01''),
+        PARTITION p2024 VALUES LESS THAN (''2025-01-01''),
+        PARTITION p2025 VALUES LESS THAN (''2026-01-01''),
+        PARTITION p2026 VALUES LESS THAN (''2027-01-01''),
+        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+    )', 'DO 0');
+PREPARE dmd_compact FROM @dmd_compact;
+EXECUTE dmd_compact;
+DEALLOCATE PREPARE dmd_compact;
+
+-- ============================================
+-- TABLES: WeeklyMarketData, MonthlyMarketData, YearlyMarketData
+-- Per-asset period rollups of DailyMarketData, maintained by
+-- load_data.py for the periods each load touches. period_start is
+-- the Monday, the first of the month, or January 1.
+-- ============================================
+CREATE TABLE WeeklyMarketData (
+    asset_id        INT NOT NULL,
+    period_start    DATE NOT NULL,
+    first_date      DATE NOT NULL,
+    last_date       DATE NOT NULL,
+    open_price      DECIMAL(18,4) NOT NULL,
+    close_price     DECIMAL(18,4) NOT NULL,
+    high_price      DECIMAL(18,4) NOT NULL,
+    low_price       DECIMAL(18,4) NOT NULL,
+    avg_price       DECIMAL(18,4) NOT NULL,
+    total_volume    BIGINT NULL,
+    obs_count       INT NOT NULL,
+    PRIMARY KEY (asset_id, period_start),
+    FOREIGN KEY (asset_id) REFERENCES Asset(asset_id)
+);
+
+CREATE TABLE MonthlyMarketData (
+    asset_id        INT NOT NULL,
+    period_start    DATE NOT NULL,
+    first_date      DATE NOT NULL,
+    last_date       DATE NOT NULL,
+    open_price      DECIMAL(18,4) NOT NULL,
+    close_price     DECIMAL(18,4) NOT NULL,
+    high_price      DECIMAL(18,4) NOT NULL,
+    low_price       DECIMAL(18,4) NOT NULL,
+    avg_price       DECIMAL(18,4) NOT NULL,
+    total_volume    BIGINT NULL,
+    obs_count       INT NOT NULL,
+    PRIMARY KEY (asset_id, period_start),
+    FOREIGN KEY (asset_id) REFERENCES Asset(asset_id)
+);
+
+CREATE TABLE YearlyMarketData (
+    asset_id        INT NOT NULL,
+    period_start    DATE NOT NULL,
+    first_date      DATE NOT NULL,
+    last_date       DATE NOT NULL,
+    open_price      DECIMAL(18,4) NOT NULL,
+    close_price     DECIMAL(18,4) NOT NULL,
+    high_price      DECIMAL(18,4) NOT NULL,
+    low_price       DECIMAL(18,4) NOT NULL,
+    avg_price       DECIMAL(18,4) NOT NULL,
+    total_volume    BIGINT NULL,
+    obs_count       INT NOT NULL,
+    PRIMARY KEY (asset_id, period_start),
+    FOREIGN KEY (asset_id) REFERENCES Asset(asset_id)
+);
+
+-- ============================================
+-- TABLE: DataVersion
+-- Bumped by load_data.py on every load; the API keys its
+-- result cache on this version.
+-- ============================================
+CREATE TABLE DataVersion (
+    name        VARCHAR(50) PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO DataVersion (name, version) VALUES ('market_data', 0);
+
+-- ============================================
+-- TABLES: LoadRowHash, LoadCheckpoint
+-- Bookkeeping for `load_data.py --incremental`: a content
+-- hash per stored observation and per-file load progress.
+-- ============================================
+CREATE TABLE LoadRowHash (
+    asset_id    INT NOT NULL,
+    obs_date    DATE NOT NULL,
+    row_hash    BIGINT NOT NULL,
+    PRIMARY KEY (asset_id, obs_date)
+);
+
+CREATE TABLE LoadCheckpoint (
+    source_file     VARCHAR(255) PRIMARY KEY,
+    file_sha256     CHAR(64) NOT NULL,
+    status          VARCHAR(20) NOT NULL,
+    changes_total   INT NOT NULL DEFAULT 0,
+    changes_done    INT NOT NULL DEFAULT 0,
+    inserted        INT NOT NULL DEFAULT 0,
+    updated         INT NOT NULL DEFAULT 0,
+    unchanged       INT NOT NULL DEFAULT 0,
+    updated_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- ============================================
+-- TABLE: SchemaMigration
+-- Migrations applied by migrate.py. This script already includes
+-- everything in migrations/ up to the versions recorded below.
+-- ============================================
+CREATE TABLE SchemaMigration (
+    version     CHAR(4) PRIMARY KEY,
+    name        VARCHAR(100) NOT NULL,
+    checksum    CHAR(64) NOT NULL,
+    applied_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO SchemaMigration (version, name, checksum) VALUES
+('0001', 'data_version', '59553110924e80c9d7aeeaf009e8ea9294fc0d4e3b293f3ac16233e3a4f5eba2'),
+('0002', 'load_state_tables', '991aed09859d582a3d19e54ff4e96ca4691afabed68e05593aabdded39be458d'),
+('0003', 'rollup_tables', 'd03ae2454882fc4a5eda5aa4b2e20774649d94309898c5fb90f1531d7998a15a'),
+('0004', 'daily_market_data_date_index', '9ac5e1028982f6dd02adc621f7018edae1fe885ff6ba53e158595aba30e7e6c4'),
+('0005', 'asset_symbol_unique', 'd81d6a87643fe47426fa0512a301e6fb4429399548a95196d1a379d860f8dc6f');
+
+-- 0006 is optional and only included with the compact storage profile
+INSERT INTO SchemaMigration (version, name, checksum)
+SELECT '0006', 'compact_daily_market_data', '0b1ff20e2a7ffe0520f65eec9b148cf74f78394412d4dcd1ba03d6d265746a41'
+FROM DUAL WHERE @storage_profile = 'compact';
+
 -- ============================================
 -- Insert AssetType data
 -- ============================================
@@ -0,0 +1,218 @@
+"""
+A small thread-safe connection pool shared by the Flask routes.
+
+mysql.connector ships its own pool, but it has no overflow, no idle recycling
+and no health check on borrow, so a connection killed by the server's
+wait_timeout is only discovered when a query fails. This pool wraps any
+zero-argument connect function and hands out proxies whose close() returns
+the connection to the pool instead of closing the socket.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class PooledConnection:
+    """Proxy around a raw connection; close() gives it back to the pool."""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(self._raw, self._created_at)
+
+    def discard(self):
+        """Close the underlying connection instead of returning it (e.g. with unread rows)."""
+        if not self._released:
+            self._released = True
+            self._pool._discard_checked_out(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool with bounded overflow.
+
+    - size: connections kept open while idle
+    - max_overflow: extra connections opened under load and closed on return
+    - recycle: seconds a connection may sit idle before it is reopened
+    - pre_ping: ping idle connections on borrow and replace dead ones
+    - timeout: seconds to wait for a free connection before PoolTimeout
+    """
+
+    def __init__(self, connect, size=5, max_overflow=10, recycle=1800,
+                 pre_ping=True, timeout=10):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.timeout = timeout
+
+        self._idle = deque()  # (raw, created_at, idle_since)
+        self._total = 0
+        self._cond = threading.Condition()
+        self._counters = {
+            "borrows": 0,
+            "created": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    def get_connection(self, timeout=None):
+        """
+        Borrow a connection, opening a new one if the pool has room. `timeout`
+        overrides the pool's wait for a free connection.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._counters["borrows"] += 1
+        while True:
+            with self._cond:
+                while True:
+                    if self._idle:
+                        idle = self._idle.pop()
+                        break
+                    if self._total < self.size + self.max_overflow:
+                        self._total += 1
+                        idle = None
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No connection available after {timeout}s "
+                            f"({self._total} open, pool size {self.size}"
+                            f" + overflow {self.max_overflow})"
+                        )
+                    self._counters["waits"] += 1
+                    self._cond.wait(remaining)
+
+            if idle is None:
+                break
+            # The ping (a round-trip) and any close happen outside the lock,
+            # so a slow or dead server doesn't stall other borrowers or
+            # threads returning connections. The popped connection keeps its
+            # slot in _total meanwhile, like a checked-out one.
+            raw, created_at, idle_since = idle
+            if self._usable(raw, idle_since):
+                return PooledConnection(self, raw, created_at)
+            self._discard(raw)
+
+        # Open the socket outside the lock so slow handshakes don't block
+        # other borrowers that could be served from the idle queue.
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._counters["created"] += 1
+        return PooledConnection(self, raw, time.monotonic())
+
+    def _usable(self, raw, idle_since):
+        """Decides whether an idle connection is reusable; called without the lock."""
+        if self.recycle and time.monotonic() - idle_since > self.recycle:
+            failure = "recycled"
+        elif not self.pre_ping:
+            return True
+        else:
+            try:
+                raw.ping(reconnect=False)
+                return True
+            except Exception:
+                failure = "ping_failures"
+        with self._cond:
+            self._counters[failure] += 1
+        return False
+
+    def _discard(self, raw):
+        """Closes a connection (without the lock held) and frees its slot."""
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def _discard_checked_out(self, raw):
+        self._discard(raw)
+
+    def _release(self, raw, created_at):
+        # End any open transaction so the next borrower never inherits a
+        # stale REPEATABLE READ snapshot or half-finished work.
+        try:
+            raw.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            if healthy and len(self._idle) < self.size:
+                self._idle.append((raw, created_at, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(raw)
+
+    def warm(self, count=None):
+        """
+        Open connections now (default: `size`) so the first requests don't pay
+        for the handshakes. Returns how many are idle afterwards.
+        """
+        count = self.size if count is None else min(count, self.size)
+        borrowed = []
+        try:
+            for _ in range(count):
+                borrowed.append(self.get_connection())
+        finally:
+            for conn in borrowed:
+                conn.close()
+        with self._cond:
+            return len(self._idle)
+
+    def dispose(self):
+        """Close every idle connection (checked-out ones close on return)."""
+        with self._cond:
+            idle = [raw for raw, _, _ in self._idle]
+            self._idle.clear()
+        for raw in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "recycle_seconds": self.recycle,
+                "pre_ping": self.pre_ping,
+                "open": self._total,
+                "idle": idle,
+                "checked_out": self._total - idle,
+                **self._counters,
+            }
@@ -0,0 +1,386 @@
+"""
+Embedded SQLite or DuckDB copy of the MySQL market_data database.
+
+build_database() writes a database file with AssetType, Asset,
+DailyMarketData, the weekly/monthly/yearly rollups and DataVersion, from
+create_schema.sql's reference rows and the CSV. connect() returns
+connections that behave like mysql.connector's closely enough for app.py:
+cursor(dictionary=True), %s placeholders, fetchmany, column_names, ping, and
+errors raised as mysql.connector.Error.
+
+DuckDB stores tables column-wise and suits scan-heavy analytical queries;
+SQLite needs nothing beyond the standard library. Generated SQL that uses
+MySQL-only functions will fail on either.
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import mysql.connector
+
+# DuckDB is optional and slow to import, so _check_engine() imports it the
+# first time it is needed; without it only the SQLite engine is available.
+duckdb = None
+
+ENGINES = ("sqlite", "duckdb")
+
+# Worker threads per DuckDB connection. The API runs one query per pooled
+# connection and gets its parallelism from concurrent requests, so a thread
+# pool per connection would only oversubscribe the CPU.
+DUCKDB_THREADS = int(os.environ.get("DUCKDB_THREADS", "1"))
+
+# {date} and {price} are filled in per engine; SQLite has no DATE or DECIMAL
+# storage class, DuckDB keeps the MySQL types (and returns date/Decimal).
+SCHEMA = [
+    """
+    CREATE TABLE AssetType (
+        asset_type_id   INTEGER PRIMARY KEY,
+        name            VARCHAR NOT NULL UNIQUE,
+        description     VARCHAR
+    )
+    """,
+    """
+    CREATE TABLE Asset (
+        asset_id        INTEGER PRIMARY KEY,
+        name            VARCHAR NOT NULL,
+        symbol          VARCHAR NOT NULL UNIQUE,
+        asset_type_id   INTEGER NOT NULL REFERENCES AssetType(asset_type_id),
+        base_currency   VARCHAR NOT NULL DEFAULT 'USD'
+    )
+    """,
+    """
+    CREATE TABLE DailyMarketData (
+        asset_id    INTEGER NOT NULL REFERENCES Asset(asset_id),
+        obs_date    {date} NOT NULL,
+        price       {price} NOT NULL,
+        volume      BIGINT,
+        PRIMARY KEY (asset_id, obs_date)
+    ){without_rowid}
+    """,
+    "CREATE INDEX idx_dmd_date_price ON DailyMarketData (obs_date, price)",
+    """
+    CREATE TABLE DataVersion (
+        name        VARCHAR PRIMARY KEY,
+        version     BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+ROLLUP_TABLE = """
+    CREATE TABLE {table} (
+        asset_id        INTEGER NOT NULL,
+        period_start    {date} NOT NULL,
+        first_date      {date} NOT NULL,
+        last_date       {date} NOT NULL,
+        open_price      {price} NOT NULL,
+        close_price     {price} NOT NULL,
+        high_price      {price} NOT NULL,
+        low_price       {price} NOT NULL,
+        avg_price       {price} NOT NULL,
+        total_volume    BIGINT,
+        obs_count       INTEGER NOT NULL,
+        PRIMARY KEY (asset_id, period_start)
+    )
+"""
+
+_TYPES = {
+    "sqlite": {"date": "TEXT", "price": "REAL", "without_rowid": " WITHOUT ROWID"},
+    "duckdb": {"date": "DATE", "price": "DECIMAL(18,4)", "without_rowid": ""},
+}
+
+_ASSET_TYPE_ROW = re.compile(r"^\((\d+), '([^']*)', '([^']*)'\)", re.M)
+_ASSET_ROW = re.compile(r"^\((\d+), '([^']*)', '([^']*)', (\d+), '([^']*)'\)", re.M)
+
+
+def _check_engine(engine):
+    global duckdb
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown embedded engine {engine!r}; use one of {ENGINES}.")
+    if engine == "duckdb" and duckdb is None:
+        try:
+            import duckdb as module
+        except ImportError:
+            raise RuntimeError("The duckdb package is not installed.")
+        duckdb = module
+
+
+def default_path(engine):
+    return "market_data.duckdb" if engine == "duckdb" else "market_data.sqlite"
+
+
+def reference_rows(schema_path):
+    """AssetType and Asset rows from the INSERT statements in create_schema.sql."""
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    type_block = sql[sql.index('INSERT INTO AssetType'):]
+    type_block = type_block[:type_block.index(';')]
+    asset_block = sql[sql.index('INSERT INTO Asset ('):]
+    asset_block = asset_block[:asset_block.index(';')]
+    asset_types = [(int(i), n, d) for i, n, d in _ASSET_TYPE_ROW.findall(type_block)]
+    assets = [(int(i), n, s, int(t), c) for i, n, s, t, c in _ASSET_ROW.findall(asset_block)]
+    return asset_types, assets
+
+
+def rollup_rows(records, period_start):
+    """
+    One row per (asset, period) in the rollup table layout, from sorted
+    (asset_id, 'YYYY-MM-DD', price, volume) records. Same values as the
+    INSERT ... SELECT in load_data.refresh_rollups().
+    """
+    rows = []
+    current, group = None, []
+
+    def flush():
+        prices = [p for _, p, _ in group]
+        volumes = [v for _, _, v in group if v is not None]
+        rows.append((
+            current[0], current[1].isoformat(), group[0][0], group[-1][0],
+            prices[0], prices[-1], max(prices), min(prices),
+            round(sum(prices) / len(prices), 4),
+            sum(volumes) if volumes else None, len(group),
+        ))
+
+    for asset_id, obs_date, price, volume in records:
+        key = (asset_id, period_start(date.fromisoformat(obs_date)))
+        if key != current:
+            if group:
+                flush()
+            current, group = key, []
+        group.append((obs_date, price, volume))
+    if group:
+        flush()
+    return rows
+
+
+def _asset_mapping(csv_file_path, asset_types, assets):
+    """
+    The CSV's asset columns mapped like load_data.resolve_asset_mapping()
+    does for MySQL: (Asset rows including new ones, mapping).
+    """
+    # Only building needs the loader; the API imports this module to connect
+    import load_data
+
+    columns = load_data.discover_asset_columns(load_data.read_header(csv_file_path))
+    asset_ids, new_assets = load_data.plan_assets(
+        [price for price, _ in columns], [asset[:3] for asset in assets])
+    if new_assets:
+        type_id = next((t[0] for t in asset_types if t[1] == load_data.DEFAULT_ASSET_TYPE), None)
+        if type_id is None:
+            raise RuntimeError(f"Unknown asset type {load_data.DEFAULT_ASSET_TYPE!r} for new assets")
+        next_id = max((asset[0] for asset in assets), default=0) + 1
+        assets = list(assets)
+        for asset_id, (column, name, symbol) in enumerate(new_assets, next_id):
+            assets.append((asset_id, name, symbol, type_id, 'USD'))
+            asset_ids[column] = asset_id
+    return assets, [(price, volume, asset_ids[price]) for price, volume in columns]
+
+
+def _read_records(csv_file_path, mapping):
+    import load_data
+
+    stats = {'errors': 0}
+    records = load_data.read_records(csv_file_path, stats, mapping=mapping)
+    # The CSV can repeat a date; keep the last value like the MySQL upsert.
+    latest = {(asset_id, obs_date): (price, volume) for asset_id, obs_date, price, volume in records}
+    return sorted((key[0], key[1], price, volume) for key, (price, volume) in latest.items())
+
+
+def _insert_rows(conn, engine, table, rows):
+    if engine == 'sqlite':
+        columns = len(rows[0]) if rows else 0
+        conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * columns)})", rows)
+        return
+    # DuckDB's executemany runs one statement per row (about a minute for the
+    # full CSV); bulk-reading a temporary CSV takes well under a second.
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as f:
+        csv.writer(f).writerows(['' if value is None else value for value in row] for row in rows)
+    try:
+        quoted = f.name.replace("'", "''")
+        conn.execute(
+            f"INSERT INTO {table} SELECT * FROM read_csv('{quoted}', header = false, "
+            f"all_varchar = true, nullstr = '')"
+        )
+    finally:
+        os.remove(f.name)
+
+
+def build_database(path, csv_file_path='Stock Market Dataset.csv', schema_path='create_schema.sql',
+                   engine='sqlite', version=None):
+    """
+    (Re)build the embedded database at `path` from the CSV and return the
+    row count. The file is written next to `path` and moved into place, so
+    readers never see a half-built database; open connections notice the
+    new file on their next ping.
+    """
+    import load_data
+
+    _check_engine(engine)
+    asset_types, assets = reference_rows(schema_path)
+    assets, mapping = _asset_mapping(csv_file_path, asset_types, assets)
+    records = _read_records(csv_file_path, mapping)
+    types = _TYPES[engine]
+    if version is None:
+        # Rebuilt files must never repeat a version, or the API's result
+        # cache would serve the previous file's rows.
+        version = time.time_ns() // 1_000_000
+
+    tmp_path = f"{path}.building"
+    for stale in (tmp_path, tmp_path + '.wal'):
+        if os.path.exists(stale):
+            os.remove(stale)
+    if engine == 'duckdb':
+        conn = duckdb.connect(tmp_path)
+    else:
+        conn = sqlite3.connect(tmp_path)
+    try:
+        for ddl in SCHEMA:
+            conn.execute(ddl.format(**types))
+        _insert_rows(conn, engine, 'AssetType', asset_types)
+        _insert_rows(conn, engine, 'Asset', assets)
+        _insert_rows(conn, engine, 'DailyMarketData', records)
+        for table, _, period_start, _ in load_data.ROLLUPS:
+            conn.execute(ROLLUP_TABLE.format(table=table, **types))
+            _insert_rows(conn, engine, table, rollup_rows(records, period_start))
+        conn.execute("INSERT INTO DataVersion (name, version) VALUES ('market_data', ?)", (version,))
+        count = conn.execute('SELECT COUNT(*) FROM DailyMarketData').fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    return count
+
+
+def seed_database(path, csv_file_path='Stock Market Dataset.csv', schema_path='create_schema.sql'):
+    """SQLite stand-in for benchmarks; see build_database()."""
+    return build_database(path, csv_file_path, schema_path, engine='sqlite')
+
+
+def _translate(sql, params, engine):
+    """
+    mysql.connector paramstyle to qmark: %s -> ?, %% -> % (only when params
+    are given). DuckDB also needs MySQL's `backtick` identifiers in double quotes.
+    """
+    if engine == 'duckdb':
+        sql = sql.replace('`', '"')
+    if params is None:
+        return sql, ()
+    return sql.replace('%s', '?').replace('%%', '%'), tuple(params)
+
+
+def _db_error(err):
+    return mysql.connector.Error(msg=f"{type(err).__name__}: {err}")
+
+
+def _engine_errors():
+    return (sqlite3.Error, duckdb.Error) if duckdb is not None else (sqlite3.Error,)
+
+
+class EmbeddedCursor:
+    def __init__(self, raw, engine, dictionary=False):
+        self._raw = raw
+        self._engine = engine
+        self._dictionary = dictionary
+        self.column_names = ()
+
+    def execute(self, sql, params=None):
+        sql, params = _translate(sql, params, self._engine)
+        try:
+            self._raw.execute(sql, params)
+        except _engine_errors() as err:
+            raise _db_error(err)
+        self.column_names = tuple(d[0] for d in self._raw.description or ())
+
+    def _rows(self, rows):
+        if not self._dictionary:
+            return rows
+        return [dict(zip(self.column_names, row)) for row in rows]
+
+    def fetchall(self):
+        return self._rows(self._raw.fetchall())
+
+    def fetchmany(self, size=1):
+        return self._rows(self._raw.fetchmany(size))
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    def close(self):
+        if self._engine == 'sqlite':
+            self._raw.close()
+
+
+class EmbeddedConnection:
+    def __init__(self, path, engine='sqlite'):
+        _check_engine(engine)
+        if not os.path.exists(path):
+            raise mysql.connector.Error(
+                msg=f"Embedded database {path} does not exist; build it with load_data.py --embedded."
+            )
+        self.path = path
+        self.engine = engine
+        self._file_id = self._current_file_id()
+        if engine == 'duckdb':
+            # A private in-memory instance with the file attached read-only:
+            # duckdb.connect(path) would share one cached instance per path and
+            # keep serving a file that load_data.py has since replaced.
+            self._raw = duckdb.connect(':memory:', config={'threads': DUCKDB_THREADS})
+            quoted = path.replace("'", "''")
+            self._raw.execute(f"ATTACH '{quoted}' AS market_data (READ_ONLY)")
+            self._raw.execute('USE market_data')
+        else:
+            # Pooled connections move between request threads, one at a time.
+            uri = Path(path).resolve().as_uri() + "?mode=ro"
+            self._raw = sqlite3.connect(uri, uri=True, check_same_thread=False)
+
+    def _current_file_id(self):
+        stat = os.stat(self.path)
+        return (stat.st_dev, stat.st_ino)
+
+    def cursor(self, dictionary=False, **kwargs):
+        # A DuckDB connection is its own cursor; one pooled connection serves
+        # one request at a time.
+        raw = self._raw.cursor() if self.engine == 'sqlite' else self._raw
+        return EmbeddedCursor(raw, self.engine, dictionary)
+
+    def ping(self, reconnect=False):
+        try:
+            replaced = self._current_file_id() != self._file_id
+        except OSError as err:
+            raise _db_error(err)
+        if replaced:
+            raise mysql.connector.Error(msg=f"{self.path} was rebuilt; reconnect to read the new data.")
+        try:
+            self._raw.execute('SELECT 1')
+        except _engine_errors() as err:
+            raise _db_error(err)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        try:
+            self._raw.rollback()
+        except _engine_errors() as err:
+            # DuckDB refuses to roll back in autocommit mode; there is nothing to undo.
+            if 'no transaction is active' not in str(err):
+                raise _db_error(err)
+
+    def close(self):
+        self._raw.close()
+
+
+def connect(path, engine='sqlite'):
+    return EmbeddedConnection(path, engine)
@@ -0,0 +1,316 @@
+"""
+Deterministic SQL for the common /api/query intents, without an LLM call.
+
+match_question() recognises a small grammar over the normalized question
+(see questions.py): asset names or symbols, a few date expressions and a
+fixed vocabulary of filler words. Supported intents:
+
+- latest price of SYMBOL
+- price of SYMBOL on DATE (last observation on or before it)
+- price history of SYMBOL over a range
+- highest / lowest / average price of SYMBOL over a range (or all time)
+- compare two symbols day by day (optionally over a range)
+
+Anything outside the grammar returns None and the caller falls back to the
+LLM, so an unknown word can never be silently misread. The SQL templates are
+fixed and every value is passed as a query parameter.
+"""
+
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+from questions import normalize_question
+
+FastPathQuery = namedtuple("FastPathQuery", ["intent", "sql", "params"])
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10,
+    "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+
+AGGREGATE_WORDS = {
+    "max": {"highest", "max", "maximum", "peak", "high", "top"},
+    "min": {"lowest", "min", "minimum", "low", "bottom"},
+    "avg": {"average", "avg", "mean"},
+}
+LATEST_WORDS = {"latest", "current", "currently", "now", "today", "recent", "last"}
+COMPARE_WORDS = {"compare", "comparison", "vs", "versus", "against"}
+# Ask for every row (of the range, if any) rather than the latest one.
+HISTORY_WORDS = {"history", "historical"}
+
+# Words that may appear around the recognised parts without changing the
+# meaning. Any other word sends the question to the LLM.
+FILLER_WORDS = {
+    "what", "whats", "was", "is", "were", "are", "the", "a", "an", "of", "for",
+    "s", "price", "prices", "priced", "close", "closing", "closed", "value",
+    "quote", "show", "me", "give", "get", "tell", "list", "find", "please",
+    "and", "with", "to", "on", "in", "at", "during", "over", "did", "does",
+    "do", "how", "much", "cost", "trade", "traded", "trading", "stock",
+    "share", "shares", "all", "time", "ever",
+    "daily", "most", "point", "level", "its", "it", "by", "day", "date",
+}
+
+_MONTH = "(?:" + "|".join(sorted(MONTHS, key=len, reverse=True)) + ")"
+_ORDINAL = r"\d{1,2}(?:st|nd|rd|th)?"
+# A date expression: full date, month + year, or a bare year.
+_SPAN = (
+    r"(?:\d{4} \d{1,2} \d{1,2}"
+    rf"|{_MONTH} {_ORDINAL} \d{{4}}"
+    rf"|{_ORDINAL} {_MONTH} \d{{4}}"
+    rf"|{_MONTH} \d{{4}}"
+    r"|(?:19|20)\d{2})"
+)
+_SPAN_RE = re.compile(rf"\b{_SPAN}\b")
+_BETWEEN_RE = re.compile(
+    rf"\b(?:between|from) ({_SPAN}) (?:and|to|until|through|thru) ({_SPAN})\b"
+)
+_SINCE_RE = re.compile(rf"\b(since|after|from) ({_SPAN})\b")
+# "the day after 2023-01-05", "2 weeks before march 2023": a date relative to
+# another one, which the fast path doesn't compute.
+_OFFSET_RE = re.compile(r"\b(?:day|week|month|year)s? (?:after|before)\b")
+_RELATIVE_RE = re.compile(
+    r"\b(?:(?:in|over|during) (?:the )?)?(?:last|past|previous) (?:(\d{1,4}) )?"
+    r"(day|week|month|year)s?\b"
+)
+_THIS_RE = re.compile(r"\b(?:this|current) (week|month|year)\b|\b(?:ytd|year to date)\b")
+
+
+def _shift_months(d, months):
+    month_index = d.year * 12 + d.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    day = d.day
+    while True:
+        try:
+            return date(year, month, day)
+        except ValueError:
+            day -= 1
+
+
+def _month_end(year, month):
+    return _shift_months(date(year, month, 1), -1) - timedelta(days=1)
+
+
+def parse_span(text):
+    """(start, end, is_point) for one date expression matched by _SPAN, or None."""
+    parts = text.split()
+    try:
+        if len(parts) == 3 and parts[0].isdigit() and len(parts[0]) == 4:
+            d = date(int(parts[0]), int(parts[1]), int(parts[2]))
+            return d, d, True
+        if len(parts) == 3:
+            if parts[0] in MONTHS:
+                month, day = MONTHS[parts[0]], parts[1]
+            else:
+                month, day = MONTHS[parts[1]], parts[0]
+            d = date(int(parts[2]), month, int(re.match(r"\d+", day).group()))
+            return d, d, True
+        if len(parts) == 2:
+            year, month = int(parts[1]), MONTHS[parts[0]]
+            return date(year, month, 1), _month_end(year, month), False
+        year = int(parts[0])
+        return date(year, 1, 1), date(year, 12, 31), False
+    except (ValueError, KeyError):
+        return None
+
+
+def _relative_range(count, unit, today):
+    count = int(count or 1)
+    if unit == "day":
+        start = today - timedelta(days=count)
+    elif unit == "week":
+        start = today - timedelta(weeks=count)
+    elif unit == "month":
+        start = _shift_months(today, count)
+    else:
+        start = _shift_months(today, 12 * count)
+    return start, today
+
+
+def extract_dates(text, today):
+    """
+    Find the (single) date expression in a normalized question.
+    Returns (text_without_it, (start, end) or None, is_point), or None when
+    the dates can't be read unambiguously.
+    """
+    if _OFFSET_RE.search(text):
+        return None
+    found = []
+
+    def take(regex, convert):
+        nonlocal text
+        for m in regex.finditer(text):
+            value = convert(m)
+            if value is None:
+                return False
+            found.append(value)
+        text = regex.sub(" ", text)
+        return True
+
+    def between(m):
+        first, second = parse_span(m.group(1)), parse_span(m.group(2))
+        if not first or not second or first[0] > second[1]:
+            return None
+        return first[0], second[1], False
+
+    def since(m):
+        span = parse_span(m.group(2))
+        if not span:
+            return None
+        # "after 2023-01-05" starts the day after; "since"/"from" include it
+        start = span[1] + timedelta(days=1) if m.group(1) == "after" else span[0]
+        return (start, today, False) if start <= today else None
+
+    def relative(m):
+        return (*_relative_range(m.group(1), m.group(2), today), False)
+
+    def this(m):
+        unit = m.group(1) or "year"
+        if unit == "week":
+            start = today - timedelta(days=today.weekday())
+        elif unit == "month":
+            start = today.replace(day=1)
+        else:
+            start = today.replace(month=1, day=1)
+        return start, today, False
+
+    def span(m):
+        return parse_span(m.group(0))
+
+    # Ranges first, so their endpoints aren't read as separate dates.
+    for regex, convert in (
+        (_BETWEEN_RE, between),
+        (_SINCE_RE, since),
+        (_RELATIVE_RE, relative),
+        (_THIS_RE, this),
+        (_SPAN_RE, span),
+    ):
+        if not take(regex, convert):
+            return None
+
+    if len(found) > 1:
+        return None
+    if not found:
+        return " ".join(text.split()), None, False
+    start, end, is_point = found[0]
+    return " ".join(text.split()), (start, end), is_point
+
+
+def _price_column(symbol):
+    return "`" + re.sub(r"\W", "_", symbol.lower()) + "_price`"
+
+
+def build_query(intent, symbols, date_range):
+    """SQL template and parameters for a recognised intent."""
+    where = ["a.symbol = %s"]
+    params = [symbols[0]]
+    if date_range and intent != "price_on_date":
+        where.append("d.obs_date BETWEEN %s AND %s")
+        params.extend(str(d) for d in date_range)
+
+    select = "SELECT d.asset_id, a.symbol, a.name, d.obs_date, d.price, d.volume"
+    source = "FROM DailyMarketData d JOIN Asset a ON a.asset_id = d.asset_id"
+
+    if intent == "latest":
+        order = "ORDER BY d.obs_date DESC LIMIT 1"
+    elif intent == "price_on_date":
+        where.append("d.obs_date <= %s")
+        params.append(str(date_range[1]))
+        order = "ORDER BY d.obs_date DESC LIMIT 1"
+    elif intent == "history":
+        order = "ORDER BY d.obs_date"
+    elif intent == "max":
+        order = "ORDER BY d.price DESC, d.obs_date LIMIT 1"
+    elif intent == "min":
+        order = "ORDER BY d.price ASC, d.obs_date LIMIT 1"
+    elif intent == "avg":
+        select = (
+            "SELECT a.symbol, a.name, AVG(d.price) AS avg_price, "
+            "MIN(d.obs_date) AS first_date, MAX(d.obs_date) AS last_date, "
+            "COUNT(*) AS observations"
+        )
+        order = "GROUP BY a.symbol, a.name"
+    elif intent == "compare":
+        sql = (
+            f"SELECT d1.asset_id, d1.obs_date, d1.price AS {_price_column(symbols[0])}, "
+            f"d2.price AS {_price_column(symbols[1])} "
+            "FROM DailyMarketData d1 "
+            "JOIN Asset a1 ON a1.asset_id = d1.asset_id "
+            "JOIN DailyMarketData d2 ON d2.obs_date = d1.obs_date "
+            "JOIN Asset a2 ON a2.asset_id = d2.asset_id "
+            "WHERE a1.symbol = %s AND a2.symbol = %s"
+        )
+        params = list(symbols)
+        if date_range:
+            sql += " AND d1.obs_date BETWEEN %s AND %s"
+            params.extend(str(d) for d in date_range)
+        return sql + " ORDER BY d1.obs_date", tuple(params)
+    else:
+        raise ValueError(f"Unknown intent: {intent}")
+
+    return f"{select} {source} WHERE {' AND '.join(where)} {order}", tuple(params)
+
+
+def match_question(question, asset_aliases, today=None):
+    """
+    Return a FastPathQuery for a question in the fast-path grammar, or None
+    if the question should go to the LLM.
+    """
+    if not asset_aliases:
+        return None
+    today = today or date.today()
+
+    extracted = extract_dates(normalize_question(question, asset_aliases), today)
+    if extracted is None:
+        return None
+    text, date_range, is_point = extracted
+
+    known_symbols = {symbol.lower(): symbol for symbol in asset_aliases.values()}
+    symbols = []
+    words = set()
+    for word in text.split():
+        if word in known_symbols:
+            if known_symbols[word] not in symbols:
+                symbols.append(known_symbols[word])
+        else:
+            words.add(word)
+
+    aggregates = [name for name, vocab in AGGREGATE_WORDS.items() if words & vocab]
+    allowed = FILLER_WORDS | LATEST_WORDS | COMPARE_WORDS | HISTORY_WORDS
+    for vocab in AGGREGATE_WORDS.values():
+        allowed |= vocab
+    if not symbols or len(symbols) > 2 or len(aggregates) > 1 or words - allowed:
+        return None
+
+    if len(symbols) == 2:
+        if aggregates or words & LATEST_WORDS:
+            return None
+        intent = "compare"
+    elif words & COMPARE_WORDS:
+        return None
+    elif aggregates:
+        intent = aggregates[0]
+    elif words & HISTORY_WORDS:
+        # A history on one date or of the latest price isn't a clear request
+        if is_point or words & LATEST_WORDS:
+            return None
+        intent = "history"
+    elif is_point:
+        intent = "price_on_date"
+    elif date_range and not words & LATEST_WORDS:
+        intent = "history"
+    else:
+        intent = "latest"
+
+    sql, params = build_query(intent, symbols, date_range)
+    return FastPathQuery(intent, sql, params)
+
+
+def render_sql(sql, params):
+    """The SQL with parameters inlined as literals, for display only."""
+    if not params:
+        return sql
+    return sql % tuple("'" + str(p).replace("'", "''") + "'" for p in params)
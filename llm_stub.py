@@ -0,0 +1,296 @@
+"""
+Local stand-in for the Anthropic client used by benchmarks and offline runs.
+
+StubAnthropic().messages.create(...) accepts the same arguments as the real
+client, sleeps for a configurable latency and answers with canned SQL looked
+up by the question in the prompt. The response carries `content[0].text`
+and `usage.input_tokens` / `usage.output_tokens` like the real one.
+
+messages.stream(...) returns a context manager with `text_stream` (one chunk
+per token) and `current_message_snapshot`, like the real client's
+MessageStream, so callers can stop reading early.
+
+Prompt caching is simulated too: system blocks up to the last one marked
+with `cache_control` form a prefix that is remembered for CACHE_TTL_SECONDS.
+A later call with the same prefix reports it as `cache_read_input_tokens`
+and skips its prefill time; the first one reports
+`cache_creation_input_tokens`. Like the real API, a prefix shorter than the
+model's minimum cacheable length is not cached: it is billed and prefilled
+as ordinary input every time, and counted in `short_prefix_calls`.
+
+AsyncStubAnthropic is the same for AsyncAnthropic callers (async_app.py).
+"""
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+DEFAULT_SQL = (
+    "SELECT a.symbol, d.obs_date, d.price FROM DailyMarketData d "
+    "JOIN Asset a ON a.asset_id = d.asset_id "
+    "WHERE a.symbol = 'AAPL' ORDER BY d.obs_date DESC LIMIT 10"
+)
+
+# Anthropic's default (ephemeral) cache lifetime.
+CACHE_TTL_SECONDS = 300
+# Roughly 4 characters per token, like English text.
+CHARS_PER_TOKEN = 4
+# Shortest prefix Anthropic will cache, by model name prefix; other models
+# get DEFAULT_MIN_CACHE_TOKENS.
+MIN_CACHE_TOKENS = {
+    "claude-haiku-4-5": 4096,
+    "claude-opus-4-5": 4096,
+    "claude-3-5-haiku": 2048,
+    "claude-3-haiku": 2048,
+}
+DEFAULT_MIN_CACHE_TOKENS = 1024
+
+
+def _question_key(text):
+    return " ".join(text.lower().split())
+
+
+def _tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def min_cache_tokens(model):
+    """The minimum cacheable prefix length in tokens for `model`."""
+    for name, tokens in MIN_CACHE_TOKENS.items():
+        if model.startswith(name):
+            return tokens
+    return DEFAULT_MIN_CACHE_TOKENS
+
+
+def question_from_prompt(prompt):
+    """The user's question from a prompt built by generate_sql_from_llm()."""
+    marker = "User question:"
+    if marker in prompt:
+        return prompt.rsplit(marker, 1)[1].strip()
+    return prompt.strip()
+
+
+def _text_parts(content):
+    if isinstance(content, str):
+        return [{"text": content}]
+    return [part if isinstance(part, dict) else {"text": str(part)} for part in content]
+
+
+class _MessageStream:
+    def __init__(self, stub, model, text, usage, delay):
+        self._stub = stub
+        self._text = text
+        self._delay = delay
+        self._sent = 0
+        self.current_message_snapshot = SimpleNamespace(
+            model=model,
+            stop_reason=None,
+            content=[SimpleNamespace(type="text", text="")],
+            usage=usage,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Tokens the caller never read were never generated.
+        self._stub._count(output=self._sent)
+        return False
+
+    @property
+    def text_stream(self):
+        snapshot = self.current_message_snapshot
+        time.sleep(self._delay)
+        for start in range(0, len(self._text), CHARS_PER_TOKEN):
+            if start:
+                time.sleep(self._stub.token_ms / 1000)
+            chunk = self._text[start:start + CHARS_PER_TOKEN]
+            self._sent += 1
+            snapshot.content[0].text += chunk
+            snapshot.usage.output_tokens = self._sent
+            yield chunk
+        snapshot.stop_reason = "end_turn"
+
+    def get_final_message(self):
+        for _ in self.text_stream:
+            pass
+        return self.current_message_snapshot
+
+
+class _AsyncMessageStream(_MessageStream):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    @property
+    async def text_stream(self):
+        snapshot = self.current_message_snapshot
+        await asyncio.sleep(self._delay)
+        for start in range(0, len(self._text), CHARS_PER_TOKEN):
+            if start:
+                await asyncio.sleep(self._stub.token_ms / 1000)
+            chunk = self._text[start:start + CHARS_PER_TOKEN]
+            self._sent += 1
+            snapshot.content[0].text += chunk
+            snapshot.usage.output_tokens = self._sent
+            yield chunk
+        snapshot.stop_reason = "end_turn"
+
+    async def get_final_message(self):
+        async for _ in self.text_stream:
+            pass
+        return self.current_message_snapshot
+
+
+class _Messages:
+    def __init__(self, stub):
+        self._stub = stub
+
+    def create(self, model, max_tokens, messages, system=None, **kwargs):
+        text, usage, delay = self._stub._respond(model, messages, system)
+        output_tokens = _tokens(text)
+        time.sleep(delay + max(output_tokens - 1, 0) * self._stub.token_ms / 1000)
+        usage.output_tokens = output_tokens
+        self._stub._count(output=output_tokens)
+        return SimpleNamespace(
+            model=model,
+            stop_reason="end_turn",
+            content=[SimpleNamespace(type="text", text=text)],
+            usage=usage,
+        )
+
+    def stream(self, model, max_tokens, messages, system=None, **kwargs):
+        text, usage, delay = self._stub._respond(model, messages, system)
+        return _MessageStream(self._stub, model, text, usage, delay)
+
+
+class _AsyncMessages:
+    def __init__(self, stub):
+        self._stub = stub
+
+    async def create(self, model, max_tokens, messages, system=None, **kwargs):
+        text, usage, delay = self._stub._respond(model, messages, system)
+        output_tokens = _tokens(text)
+        await asyncio.sleep(delay + max(output_tokens - 1, 0) * self._stub.token_ms / 1000)
+        usage.output_tokens = output_tokens
+        self._stub._count(output=output_tokens)
+        return SimpleNamespace(
+            model=model,
+            stop_reason="end_turn",
+            content=[SimpleNamespace(type="text", text=text)],
+            usage=usage,
+        )
+
+    def stream(self, model, max_tokens, messages, system=None, **kwargs):
+        text, usage, delay = self._stub._respond(model, messages, system)
+        return _AsyncMessageStream(self._stub, model, text, usage, delay)
+
+
+class StubAnthropic:
+    """
+    - canned_sql: {question: sql}; matching ignores case and whitespace
+    - default_sql: answer for questions without canned SQL
+    - latency_ms / jitter_ms: time to the first token is latency +- uniform jitter
+    - prefill_ms_per_1k: extra time to the first token per 1,000 uncached input tokens
+    - token_ms: time per output token after the first
+    - trailing_text: appended to every answer (e.g. an explanation after the SQL)
+    - min_cache_tokens: shortest prefix that is cached; None uses the
+      requested model's minimum (see MIN_CACHE_TOKENS)
+    """
+
+    def __init__(self, canned_sql=None, default_sql=DEFAULT_SQL, latency_ms=800.0,
+                 jitter_ms=0.0, seed=None, prefill_ms_per_1k=0.0, token_ms=0.0,
+                 trailing_text="", min_cache_tokens=None):
+        self.canned_sql = {_question_key(q): sql for q, sql in (canned_sql or {}).items()}
+        self.default_sql = default_sql
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.token_ms = token_ms
+        self.trailing_text = trailing_text
+        self.min_cache_tokens = min_cache_tokens
+        self.messages = _Messages(self)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prompt_cache = {}
+        self.calls = 0
+        # Calls whose marked prefix was too short to cache, and its size
+        self.short_prefix_calls = 0
+        self.prefix_tokens = None
+        self.tokens = {"input": 0, "cache_read": 0, "cache_write": 0, "output": 0}
+
+    def _count(self, **tokens):
+        with self._lock:
+            for direction, count in tokens.items():
+                self.tokens[direction] += count
+
+    def _cached_prefix(self, model, system):
+        """(tokens in the cacheable prefix, whether it was already cached)."""
+        blocks = _text_parts(system or [])
+        marked = [i for i, block in enumerate(blocks) if block.get("cache_control")]
+        if not marked:
+            return 0, False
+        prefix = "".join(block["text"] for block in blocks[:marked[-1] + 1])
+        minimum = self.min_cache_tokens
+        if minimum is None:
+            minimum = min_cache_tokens(model)
+        with self._lock:
+            self.prefix_tokens = _tokens(prefix)
+        if _tokens(prefix) < minimum:
+            with self._lock:
+                self.short_prefix_calls += 1
+            return 0, False
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._prompt_cache.get(key, 0) > now
+            # Reading a cache entry refreshes its lifetime.
+            self._prompt_cache[key] = now + CACHE_TTL_SECONDS
+        return _tokens(prefix), hit
+
+    def _respond(self, model, messages, system):
+        """(answer text, usage without output tokens, seconds to the first token)."""
+        system_text = "".join(block["text"] for block in _text_parts(system or []))
+        prompt = "".join(
+            part["text"]
+            for message in messages
+            for part in _text_parts(message["content"])
+        )
+        question = question_from_prompt(prompt)
+        sql = self.canned_sql.get(_question_key(question), self.default_sql)
+        if self.trailing_text:
+            sql = sql.rstrip().rstrip(";") + ";" + self.trailing_text
+
+        total_tokens = _tokens(system_text + prompt)
+        prefix_tokens, hit = self._cached_prefix(model, system)
+        usage = SimpleNamespace(
+            input_tokens=total_tokens - prefix_tokens,
+            cache_read_input_tokens=prefix_tokens if hit else 0,
+            cache_creation_input_tokens=0 if hit else prefix_tokens,
+            output_tokens=0,
+        )
+        uncached = usage.input_tokens + usage.cache_creation_input_tokens
+        self._count(
+            input=usage.input_tokens,
+            cache_read=usage.cache_read_input_tokens,
+            cache_write=usage.cache_creation_input_tokens,
+        )
+
+        with self._lock:
+            self.calls += 1
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = self.latency_ms + jitter + self.prefill_ms_per_1k * uncached / 1000
+        return sql, usage, max(delay, 0.0) / 1000
+
+
+class AsyncStubAnthropic(StubAnthropic):
+    """StubAnthropic with awaitable messages.create() and an async messages.stream()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = _AsyncMessages(self)
@@ -1,8 +1,22 @@
+import argparse
 import csv
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
 import mysql.connector
-from datetime import datetime
+from mysql.connector import errorcode
+from datetime import date, datetime, timedelta
 import re
 
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Columnar parsing needs numpy; fall back to the per-cell parser
+
 # Database connection configuration
 DB_CONFIG = {
     'host': '127.0.0.1',
@@ -12,7 +26,10 @@ DB_CONFIG = {
     'database': 'market_data'
 }
 
-# Mapping of CSV column names to asset_id
+# Columns of the bundled dataset whose Asset rows are known up front (several
+# don't match their asset's name, e.g. Google_Price is Alphabet Inc.). Other
+# `<Name>_Price` columns are matched to Asset by name or symbol, or get a new
+# Asset row; see resolve_asset_mapping().
 # Format: (price_column, volume_column, asset_id)
 ASSET_MAPPING = [
     ('Natural_Gas_Price', 'Natural_Gas_Vol.', 1),
@@ -36,6 +53,105 @@ ASSET_MAPPING = [
     ('Gold_Price', 'Gold_Vol.', 17),
 ]
 
+PRICE_SUFFIX = '_Price'
+VOLUME_SUFFIXES = ('_Vol.', '_Volume', '_Vol')
+# AssetType of assets created for unmatched columns (--asset-type)
+DEFAULT_ASSET_TYPE = os.environ.get('LOAD_ASSET_TYPE', 'EQUITY')
+
+def read_header(csv_file_path):
+    with open(csv_file_path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), [])
+
+def discover_asset_columns(header):
+    """
+    [(price_column, volume_column or None)] for every `<Name>_Price` column
+    in the header, in header order. The volume column is `<Name>_Vol.` (or
+    `_Volume` / `_Vol`) when the file has one.
+    """
+    names = set(header)
+    columns = []
+    for column in header:
+        if not column.endswith(PRICE_SUFFIX) or column == PRICE_SUFFIX:
+            continue
+        base = column[:-len(PRICE_SUFFIX)]
+        volume = next((base + suffix for suffix in VOLUME_SUFFIXES if base + suffix in names), None)
+        columns.append((column, volume))
+    return columns
+
+def _asset_key(text):
+    """Name used to match a column to an Asset row: 'Crude_oil' and 'Crude Oil' match."""
+    return ' '.join(text.replace('_', ' ').lower().split())
+
+def plan_assets(price_columns, assets):
+    """
+    Match price columns to existing assets, given as (asset_id, name, symbol)
+    rows. A column maps to its ASSET_MAPPING entry if that asset exists, else
+    to the asset whose name or symbol is the column's `<Name>` part (case,
+    spaces and underscores ignored).
+
+    Returns ({price_column: asset_id}, [(price_column, name, symbol)] for the
+    columns that need a new asset). New symbols are derived from the column
+    name and made unique.
+    """
+    known = {price: asset_id for price, _, asset_id in ASSET_MAPPING}
+    existing = {asset_id for asset_id, _, _ in assets}
+    by_key = {}
+    for asset_id, name, symbol in assets:
+        by_key.setdefault(_asset_key(name), asset_id)
+        by_key.setdefault(_asset_key(symbol), asset_id)
+    taken = {symbol.upper() for _, _, symbol in assets}
+
+    asset_ids, new_assets = {}, []
+    for column in price_columns:
+        base = column[:-len(PRICE_SUFFIX)]
+        if known.get(column) in existing:
+            asset_ids[column] = known[column]
+        elif _asset_key(base) in by_key:
+            asset_ids[column] = by_key[_asset_key(base)]
+        else:
+            symbol = re.sub(r'[^A-Z0-9.&]', '', base.upper())[:20] or 'ASSET'
+            candidate, n = symbol, 2
+            while candidate in taken:
+                candidate = symbol[:20 - len(str(n))] + str(n)
+                n += 1
+            taken.add(candidate)
+            new_assets.append((column, ' '.join(base.replace('_', ' ').split())[:50], candidate))
+    return asset_ids, new_assets
+
+def resolve_asset_mapping(conn, csv_files, asset_type=DEFAULT_ASSET_TYPE):
+    """
+    Discover the asset columns of every file and map them to Asset rows,
+    inserting rows (of `asset_type`) for columns no asset matches. Returns
+    [(csv_file, mapping)] with mapping in ASSET_MAPPING's format.
+    """
+    headers = [(path, discover_asset_columns(read_header(path))) for path in csv_files]
+    price_columns = list(dict.fromkeys(price for _, columns in headers for price, _ in columns))
+
+    cursor = conn.cursor()
+    cursor.execute('SELECT asset_id, name, symbol FROM Asset')
+    asset_ids, new_assets = plan_assets(price_columns, cursor.fetchall())
+    if new_assets:
+        cursor.execute('SELECT asset_type_id FROM AssetType WHERE name = %s', (asset_type,))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.close()
+            raise ValueError(f"unknown asset type {asset_type!r} for new assets")
+        for column, name, symbol in new_assets:
+            cursor.execute(
+                'INSERT INTO Asset (name, symbol, asset_type_id) VALUES (%s, %s, %s)',
+                (name, symbol, row[0]),
+            )
+            asset_ids[column] = cursor.lastrowid
+            print(f"Created asset {name} ({symbol}) as asset_id {cursor.lastrowid} for {column}")
+        conn.commit()
+    cursor.close()
+
+    for path, columns in headers:
+        if not columns:
+            print(f"Warning: no {PRICE_SUFFIX} columns in {path}")
+    return [(path, [(price, volume, asset_ids[price]) for price, volume in columns])
+            for path, columns in headers]
+
 def clean_number(value):
     """Remove commas and convert to float, return None if empty"""
     if not value or value.strip() == '':
@@ -56,81 +172,1027 @@ def parse_date(date_str):
         print(f"Warning: Could not parse date: {date_str}")
         return None
 
-def load_csv_to_db(csv_file_path):
-    """Load CSV data into MySQL database"""
-    
-    # Connect to database
+def notify_app_cache_invalidation(caches=None):
+    """Ask the running Flask app to drop its cached data (best effort)."""
+    app_url = os.environ.get('APP_URL', 'http://127.0.0.1:5001')
+    body = json.dumps({'caches': caches} if caches else {}).encode('utf-8')
+    req = urllib.request.Request(
+        f"{app_url.rstrip('/')}/api/admin/cache/invalidate",
+        data=body,
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if admin_token:
+        req.add_header('X-Admin-Token', admin_token)
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        print("Connected to database successfully")
-    except mysql.connector.Error as err:
-        print(f"Error connecting to database: {err}")
-        return
-    
-    # Read CSV file
-    inserted_count = 0
-    error_count = 0
-    
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            print(f"App caches invalidated: {resp.read().decode('utf-8')}")
+    except OSError as err:
+        print(f"Note: could not invalidate app caches at {app_url} ({err})")
+
+def bump_data_version(cursor):
+    """Increment the DataVersion token so the API's result cache is invalidated."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS DataVersion (
+            name        VARCHAR(50) PRIMARY KEY,
+            version     BIGINT NOT NULL DEFAULT 0,
+            updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO DataVersion (name, version) VALUES ('market_data', 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """)
+
+UPSERT_COLUMNS = '(asset_id, obs_date, price, volume)'
+UPSERT_SUFFIX = """
+    ON DUPLICATE KEY UPDATE
+        price = VALUES(price),
+        volume = VALUES(volume)
+"""
+
+def iter_csv_records(csv_file_path, stats, mapping=ASSET_MAPPING):
+    """
+    Yield (asset_id, obs_date, price, volume) tuples from the wide CSV for the
+    columns in `mapping`. Unparseable dates are counted in stats['errors'].
+    """
     with open(csv_file_path, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
-        
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 because row 1 is header
+
+        for row in reader:
             date_str = row.get('Date', '').strip()
             if not date_str:
                 continue
-            
+
             obs_date = parse_date(date_str)
             if not obs_date:
-                error_count += 1
+                stats['errors'] += 1
                 continue
-            
+
             # Process each asset
-            for price_col, vol_col, asset_id in ASSET_MAPPING:
+            for price_col, vol_col, asset_id in mapping:
                 price_val = clean_number(row.get(price_col, ''))
-                
+
                 # Skip if price is missing (required field)
                 if price_val is None or price_val <= 0:
                     continue
-                
+
                 # Get volume (can be None)
                 volume_val = None
                 if vol_col:
                     vol_raw = clean_number(row.get(vol_col, ''))
                     if vol_raw is not None and vol_raw >= 0:
                         volume_val = int(vol_raw)
-                
-                # Insert into database
-                try:
-                    insert_query = """
-                        INSERT INTO DailyMarketData (asset_id, obs_date, price, volume)
-                        VALUES (%s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE
-                            price = VALUES(price),
-                            volume = VALUES(volume)
-                    """
-                    cursor.execute(insert_query, (asset_id, obs_date, price_val, volume_val))
-                    inserted_count += 1
-                except mysql.connector.Error as err:
-                    print(f"Error inserting row {row_num}, asset_id {asset_id}, date {obs_date}: {err}")
-                    error_count += 1
-            
-            # Commit every 100 rows for better performance
-            if inserted_count % 100 == 0:
+
+                yield (asset_id, obs_date, price_val, volume_val)
+
+def _char_matrix(values):
+    """
+    View a numpy unicode array as a (width, n) matrix of code points, one row
+    per character position, so per-position operations run on contiguous data.
+    """
+    flat = np.ascontiguousarray(values).reshape(-1)
+    width = flat.dtype.itemsize // 4
+    if width == 0:
+        return np.zeros((1, flat.size), dtype=np.uint32)
+    return np.ascontiguousarray(flat.view(np.uint32).reshape(flat.size, width).T)
+
+def _parse_dates_columnar(date_strs):
+    """
+    Vectorized DD-MM-YYYY parsing. Returns (datetime64[D] array, valid mask);
+    invalid entries are NaT.
+    """
+    date_strs = np.char.strip(date_strs)
+    valid = np.char.str_len(date_strs) == 10
+    chars = _char_matrix(date_strs.astype('U10')).astype(np.int64)
+    digits = chars - ord('0')
+
+    for pos in (0, 1, 3, 4, 6, 7, 8, 9):
+        valid &= (digits[pos] >= 0) & (digits[pos] <= 9)
+    valid &= (chars[2] == ord('-')) & (chars[5] == ord('-'))
+
+    day = digits[0] * 10 + digits[1]
+    month = digits[3] * 10 + digits[4]
+    year = digits[6] * 1000 + digits[7] * 100 + digits[8] * 10 + digits[9]
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype('datetime64[M]')
+    dates = months.astype('datetime64[D]') + np.where(valid, day - 1, 0)
+    # Reject days past the end of the month (e.g. 31-04-2023)
+    valid &= dates.astype('datetime64[M]') == months
+
+    return np.where(valid, dates, np.datetime64('NaT')), valid
+
+def _parse_numbers_columnar(values):
+    """
+    Vectorized clean_number() over an array of any shape: strips Western and
+    Indian-style thousands separators ("43,194.70", "5,89,498"); empty cells
+    are NaN.
+
+    Plain decimals are parsed arithmetically on the code-point matrix
+    (integer mantissa / 10**fraction_digits, which rounds exactly like
+    float()). Anything else (signs, exponents, stray text, >15 digits) falls
+    back to clean_number() for just those cells.
+    """
+    shape = values.shape
+    flat = values.reshape(-1)
+    chars = _char_matrix(flat)
+    n = flat.size
+
+    # Horner's rule across the (short) character axis; 15 digits stay exact in float64
+    mantissa = np.zeros(n)
+    n_digits = np.zeros(n, dtype=np.int64)
+    frac_digits = np.zeros(n, dtype=np.int64)
+    n_dots = np.zeros(n, dtype=np.int64)
+    plain = np.ones(n, dtype=bool)
+    for row in chars:
+        digit = (row >= ord('0')) & (row <= ord('9'))
+        dot = row == ord('.')
+        mantissa = np.where(digit, mantissa * 10 + (row.astype(np.float64) - ord('0')), mantissa)
+        n_digits += digit
+        frac_digits += digit & (n_dots > 0)
+        n_dots += dot
+        # Only digits, one dot, thousands separators and padding are allowed
+        plain &= digit | dot | (row == ord(',')) | (row == 0)
+
+    fast = plain & (n_dots <= 1) & (n_digits >= 1) & (n_digits <= 15)
+    result = np.where(fast, mantissa / 10.0 ** frac_digits, np.nan)
+
+    for i in np.nonzero(~fast & (n_digits > 0))[0]:
+        parsed = clean_number(str(flat[i]))
+        result[i] = np.nan if parsed is None else parsed
+    return result.reshape(shape)
+
+def read_csv_columnar(csv_file_path, stats, mapping=ASSET_MAPPING):
+    """
+    Parse the whole wide CSV in bulk and melt the columns in `mapping` into
+    long form.
+
+    Returns a dict of parallel arrays: asset_id (int64), obs_date
+    (datetime64[D]), price (float64) and volume (float64, NaN = no volume),
+    in the same order iter_csv_records() yields them. Unparseable dates are
+    counted in stats['errors'].
+    """
+    with open(csv_file_path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        # Only the date and the mapped columns are kept, so a worker loading a
+        # few assets of a wide file doesn't build the whole table
+        positions = {name: i for i, name in enumerate(header)}
+        wanted = ['Date'] + [p for p, _, _ in mapping] + [v for _, v, _ in mapping if v]
+        used = [name for name in dict.fromkeys(wanted) if name in positions]
+        picks = [positions[name] for name in used]
+        width = len(header)
+        # One extra empty column stands in for missing ones (e.g. S&P 500 volume)
+        rows = [
+            [row[i] for i in picks] + [''] if len(row) >= width
+            else [row[i] if i < len(row) else '' for i in picks] + ['']
+            for row in reader
+        ]
+    index = {name: i for i, name in enumerate(used)}
+    missing = len(used)
+
+    table = np.array(rows, dtype=str).reshape(len(rows), missing + 1)
+
+    date_strs = table[:, index.get('Date', missing)]
+    present = np.char.str_len(np.char.strip(date_strs)) > 0
+    obs_dates, valid_dates = _parse_dates_columnar(date_strs)
+    stats['errors'] += int((present & ~valid_dates).sum())
+    for bad in date_strs[present & ~valid_dates]:
+        print(f"Warning: Could not parse date: {bad}")
+
+    # (n_rows, n_assets) blocks, each parsed in a single pass
+    prices = _parse_numbers_columnar(
+        table[:, [index.get(p, missing) for p, _, _ in mapping]])
+    volumes = _parse_numbers_columnar(
+        table[:, [index.get(v, missing) if v else missing for _, v, _ in mapping]])
+    asset_ids = np.array([asset_id for _, _, asset_id in mapping], dtype=np.int64)
+
+    # price > 0 is required; NaN compares False so missing prices drop out too
+    keep = valid_dates[:, None] & (prices > 0)
+    row_idx, asset_idx = np.nonzero(keep)
+
+    volume = volumes[row_idx, asset_idx]
+    return {
+        'asset_id': asset_ids[asset_idx],
+        'obs_date': obs_dates[row_idx],
+        'price': prices[row_idx, asset_idx],
+        # volume >= 0 or NULL
+        'volume': np.where(volume >= 0, np.floor(volume), np.nan),
+    }
+
+def columnar_to_records(columns):
+    """Turn read_csv_columnar() output into the tuples the DB writers take."""
+    # Format each distinct date once instead of once per record
+    unique_dates, date_idx = np.unique(columns['obs_date'], return_inverse=True)
+    obs_dates = np.array(unique_dates.astype(str), dtype=object)[date_idx]
+
+    volume = columns['volume']
+    volumes = np.nan_to_num(volume).astype(np.int64).astype(object)
+    volumes[np.isnan(volume)] = None
+    return zip(
+        columns['asset_id'].tolist(),
+        obs_dates.tolist(),
+        columns['price'].tolist(),
+        volumes.tolist(),
+    )
+
+# Set in worker processes so their progress lines say which shard they are
+PROGRESS_PREFIX = ''
+
+class Progress:
+    """Prints rows written and rows/sec every `every` rows."""
+
+    def __init__(self, every):
+        self.every = every
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._next_report = every
+
+    def add(self, n):
+        self.rows += n
+        if self.rows >= self._next_report:
+            self.report()
+            while self._next_report <= self.rows:
+                self._next_report += self.every
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self, label='Written'):
+        print(f"{PROGRESS_PREFIX}{label} {self.rows:,} records ({self.rate():,.0f} rows/sec)")
+
+# Parallel loads upsert into one table from several connections, which can
+# deadlock on shared index pages; such a batch is simply run again.
+LOCK_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+LOCK_RETRIES = 3
+
+def upsert_rows(cursor, rows, stats, lock_retries=0):
+    """
+    One multi-row upsert; on failure retry row by row so bad rows are reported.
+    A deadlock or lock wait timeout is retried up to `lock_retries` times
+    first, which is only safe when the batch is the whole transaction.
+    Returns the rows that were written.
+    """
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    query = f"INSERT INTO DailyMarketData {UPSERT_COLUMNS} VALUES {placeholders} {UPSERT_SUFFIX}"
+    params = [value for row in rows for value in row]
+    for attempt in range(lock_retries + 1):
+        try:
+            cursor.execute(query, params)
+            stats['inserted'] += len(rows)
+            return rows
+        except mysql.connector.Error as err:
+            if err.errno in LOCK_ERRORS and attempt < lock_retries:
+                time.sleep(0.05 * (attempt + 1))
+                continue
+            print(f"Batch of {len(rows)} rows failed ({err}); retrying row by row")
+            break
+
+    written = []
+    for row in rows:
+        try:
+            cursor.execute(
+                f"INSERT INTO DailyMarketData {UPSERT_COLUMNS} VALUES (%s, %s, %s, %s) {UPSERT_SUFFIX}",
+                row,
+            )
+            stats['inserted'] += 1
+            written.append(row)
+        except mysql.connector.Error as err:
+            print(f"Error inserting asset_id {row[0]}, date {row[1]}: {err}")
+            stats['errors'] += 1
+    return written
+
+def write_batched(conn, records, stats, batch_size, commit_every):
+    """Multi-row upserts of `batch_size` rows, committing every `commit_every` rows."""
+    cursor = conn.cursor()
+    progress = Progress(commit_every)
+    # Lock errors can be retried when each batch is its own transaction
+    lock_retries = LOCK_RETRIES if commit_every <= batch_size else 0
+    batch = []
+    uncommitted = 0
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            upsert_rows(cursor, batch, stats, lock_retries)
+            uncommitted += len(batch)
+            progress.add(len(batch))
+            batch = []
+            if uncommitted >= commit_every:
                 conn.commit()
-                print(f"Processed {row_num} rows, inserted {inserted_count} records...")
-    
-    # Final commit
+                uncommitted = 0
+    if batch:
+        upsert_rows(cursor, batch, stats, lock_retries)
+        progress.add(len(batch))
+    conn.commit()
+    progress.report('Finished:')
+    cursor.close()
+
+def write_infile(conn, records, stats):
+    """
+    Stage rows into a temporary table with LOAD DATA LOCAL INFILE, then merge
+    them into DailyMarketData with one set-based upsert. Requires local_infile
+    to be enabled on the server.
+    """
+    cursor = conn.cursor()
+    progress = Progress(100000)
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as tmp:
+        writer = csv.writer(tmp)
+        staged = 0
+        for asset_id, obs_date, price, volume in records:
+            writer.writerow([asset_id, obs_date, price, r'\N' if volume is None else volume])
+            staged += 1
+        tmp_path = tmp.name
+
+    try:
+        cursor.execute("""
+            CREATE TEMPORARY TABLE DailyMarketDataStaging (
+                asset_id    INT NOT NULL,
+                obs_date    DATE NOT NULL,
+                price       DECIMAL(18,4) NOT NULL,
+                volume      BIGINT NULL
+            )
+        """)
+        cursor.execute(
+            f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE DailyMarketDataStaging
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\r\\n'
+            {UPSERT_COLUMNS}
+            """,
+            (tmp_path,),
+        )
+        # Commit the staged rows so a deadlock in the merge (possible when
+        # parallel workers merge at once) rolls back only the merge, which is
+        # then run again
+        conn.commit()
+        for attempt in range(LOCK_RETRIES + 1):
+            try:
+                cursor.execute(f"""
+                    INSERT INTO DailyMarketData {UPSERT_COLUMNS}
+                    SELECT asset_id, obs_date, price, volume FROM DailyMarketDataStaging
+                    {UPSERT_SUFFIX}
+                """)
+                break
+            except mysql.connector.Error as err:
+                if err.errno not in LOCK_ERRORS or attempt == LOCK_RETRIES:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+        conn.commit()
+        stats['inserted'] += staged
+        progress.add(staged)
+        progress.report('Finished:')
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"Error during LOAD DATA merge: {err}")
+        stats['errors'] += staged
+    finally:
+        cursor.execute('DROP TEMPORARY TABLE IF EXISTS DailyMarketDataStaging')
+        cursor.close()
+        os.remove(tmp_path)
+
+def write_row_by_row(conn, records, stats, commit_every):
+    """Original one-statement-per-record path, kept for comparison."""
+    cursor = conn.cursor()
+    progress = Progress(commit_every)
+    lock_retries = LOCK_RETRIES if commit_every <= 1 else 0
+    uncommitted = 0
+    for record in records:
+        upsert_rows(cursor, [record], stats, lock_retries)
+        uncommitted += 1
+        progress.add(1)
+        if uncommitted >= commit_every:
+            conn.commit()
+            uncommitted = 0
+    conn.commit()
+    progress.report('Finished:')
+    cursor.close()
+
+STATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS LoadRowHash (
+        asset_id    INT NOT NULL,
+        obs_date    DATE NOT NULL,
+        row_hash    BIGINT NOT NULL,
+        PRIMARY KEY (asset_id, obs_date)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS LoadCheckpoint (
+        source_file     VARCHAR(255) PRIMARY KEY,
+        file_sha256     CHAR(64) NOT NULL,
+        status          VARCHAR(20) NOT NULL,
+        changes_total   INT NOT NULL DEFAULT 0,
+        changes_done    INT NOT NULL DEFAULT 0,
+        inserted        INT NOT NULL DEFAULT 0,
+        updated         INT NOT NULL DEFAULT 0,
+        unchanged       INT NOT NULL DEFAULT 0,
+        updated_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+]
+
+def ensure_state_tables(cursor):
+    """Create the incremental-load bookkeeping tables on databases that predate them."""
+    for ddl in STATE_TABLES:
+        cursor.execute(ddl)
+
+def row_hash(price, volume):
+    """
+    Content hash of one observation as a signed 64-bit int. Prices are
+    formatted at DECIMAL(18,4) precision so CSV floats and stored values agree.
+    """
+    text = f"{float(price):.4f}|{'' if volume is None else int(volume)}"
+    return int.from_bytes(hashlib.blake2b(text.encode('ascii'), digest_size=8).digest(), 'big', signed=True)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def diff_records(cursor, records):
+    """
+    Split records into new / changed / unchanged against what is already stored.
+
+    Rows dated after an asset's MAX(obs_date) are new without further checks.
+    Older rows are compared by content hash with LoadRowHash; rows loaded before
+    hashes were kept are hashed from DailyMarketData once and remembered.
+    Returns (changes, hashes, counts) where changes is a list of
+    (record, is_new) and hashes maps (asset_id, obs_date) -> hash.
+    """
+    cursor.execute('SELECT asset_id, MAX(obs_date) FROM DailyMarketData GROUP BY asset_id')
+    max_dates = {asset_id: str(max_date) for asset_id, max_date in cursor.fetchall()}
+
+    hashes = {}
+    candidates = []
+    changes = []
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    for record in records:
+        asset_id, obs_date, price, volume = record
+        hashes[(asset_id, obs_date)] = row_hash(price, volume)
+        max_date = max_dates.get(asset_id)
+        if max_date is None or obs_date > max_date:
+            changes.append((record, True))
+        else:
+            candidates.append(record)
+
+    if candidates:
+        first = min(r[1] for r in candidates)
+        last = max(r[1] for r in candidates)
+        stored = {}
+        cursor.execute(
+            'SELECT asset_id, obs_date, row_hash FROM LoadRowHash WHERE obs_date BETWEEN %s AND %s',
+            (first, last),
+        )
+        for asset_id, obs_date, h in cursor.fetchall():
+            stored[(asset_id, str(obs_date))] = h
+
+        if any((r[0], r[1]) not in stored for r in candidates):
+            cursor.execute(
+                """
+                SELECT d.asset_id, d.obs_date, d.price, d.volume
+                FROM DailyMarketData d
+                LEFT JOIN LoadRowHash h ON h.asset_id = d.asset_id AND h.obs_date = d.obs_date
+                WHERE h.asset_id IS NULL AND d.obs_date BETWEEN %s AND %s
+                """,
+                (first, last),
+            )
+            bootstrap = [(a, str(d), row_hash(p, v)) for a, d, p, v in cursor.fetchall()]
+            for asset_id, obs_date, h in bootstrap:
+                stored[(asset_id, obs_date)] = h
+            write_row_hashes(cursor, bootstrap)
+
+        for record in candidates:
+            key = (record[0], record[1])
+            if key not in stored:
+                changes.append((record, True))
+            elif stored[key] != hashes[key]:
+                changes.append((record, False))
+            else:
+                counts['unchanged'] += 1
+
+    for _, is_new in changes:
+        counts['inserted' if is_new else 'updated'] += 1
+    return changes, hashes, counts
+
+def write_row_hashes(cursor, rows, batch_size=1000):
+    """Upsert (asset_id, obs_date, row_hash) rows."""
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        placeholders = ', '.join(['(%s, %s, %s)'] * len(batch))
+        cursor.execute(
+            f"""
+            INSERT INTO LoadRowHash (asset_id, obs_date, row_hash) VALUES {placeholders}
+            ON DUPLICATE KEY UPDATE row_hash = VALUES(row_hash)
+            """,
+            [value for row in batch for value in row],
+        )
+
+def write_incremental(conn, records, stats, batch_size, commit_every, source_file, sha256):
+    """
+    Write only new or changed rows. Data, their hashes and the checkpoint are
+    committed together every `commit_every` rows, so after a crash a re-run
+    diffs against what was committed and picks up where it stopped.
+    """
+    cursor = conn.cursor()
+    ensure_state_tables(cursor)
+
+    cursor.execute('SELECT file_sha256, status, changes_done, changes_total '
+                   'FROM LoadCheckpoint WHERE source_file = %s', (source_file,))
+    previous = cursor.fetchone()
+    if previous and previous[1] == 'in_progress':
+        same = 'same file' if previous[0] == sha256 else 'file has changed since'
+        print(f"Resuming interrupted load of {source_file} ({same}; "
+              f"{previous[2]:,} of {previous[3]:,} changes were committed)")
+
+    changes, hashes, counts = diff_records(cursor, list(records))
+    print(f"Incremental diff: {counts['inserted']:,} new, {counts['updated']:,} changed, "
+          f"{counts['unchanged']:,} unchanged")
+
+    def save_checkpoint(status, done):
+        cursor.execute(
+            """
+            INSERT INTO LoadCheckpoint (source_file, file_sha256, status, changes_total,
+                                        changes_done, inserted, updated, unchanged)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE file_sha256 = VALUES(file_sha256), status = VALUES(status),
+                changes_total = VALUES(changes_total), changes_done = VALUES(changes_done),
+                inserted = VALUES(inserted), updated = VALUES(updated), unchanged = VALUES(unchanged)
+            """,
+            (source_file, sha256, status, len(changes), done,
+             counts['inserted'], counts['updated'], counts['unchanged']),
+        )
+
+    save_checkpoint('in_progress', 0)
+    conn.commit()
+
+    # upsert_rows counts every row it writes as inserted; changed rows are
+    # written separately so they can be reported as updated instead
+    updates = {'inserted': 0, 'errors': 0}
+    progress = Progress(commit_every)
+    done = 0
+    uncommitted = 0
+    for start in range(0, len(changes), batch_size):
+        batch = [record for record, _ in changes[start:start + batch_size]]
+        new_rows = [record for record, is_new in changes[start:start + batch_size] if is_new]
+        changed_rows = [record for record, is_new in changes[start:start + batch_size] if not is_new]
+        written = []
+        if new_rows:
+            written += upsert_rows(cursor, new_rows, stats)
+        if changed_rows:
+            written += upsert_rows(cursor, changed_rows, updates)
+        # Rows that failed keep their old hash (or none), so a re-run retries them
+        write_row_hashes(cursor, [(a, d, hashes[(a, d)]) for a, d, _, _ in written])
+        done += len(batch)
+        uncommitted += len(batch)
+        progress.add(len(batch))
+        if uncommitted >= commit_every:
+            save_checkpoint('in_progress', done)
+            conn.commit()
+            uncommitted = 0
+
+    save_checkpoint('complete', done)
+    conn.commit()
+    progress.report('Finished:')
+    cursor.close()
+    stats['updated'] = updates['inserted']
+    stats['unchanged'] = counts['unchanged']
+    stats['errors'] += updates['errors']
+    return changes
+
+def reset_row_hashes(conn):
+    """
+    Full loads don't maintain LoadRowHash, so drop it; the next incremental
+    run re-hashes from DailyMarketData instead of trusting stale hashes.
+    """
+    cursor = conn.cursor()
+    ensure_state_tables(cursor)
+    cursor.execute('DELETE FROM LoadRowHash')
+    conn.commit()
+    cursor.close()
+
+def ensure_partitions(cursor, through_year=None):
+    """
+    On the compact storage profile (DailyMarketData partitioned by year, see
+    migration 0006), split the MAXVALUE partition so every year up to
+    `through_year` (default: next year) has its own partition and date-range
+    scans keep pruning. Splitting only copies rows already in the MAXVALUE
+    partition, which is normally empty. No-op on the default layout.
+    """
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'DailyMarketData'
+          AND PARTITION_METHOD = 'RANGE COLUMNS'
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    partitions = cursor.fetchall()
+    if len(partitions) < 2 or partitions[-1][1] != 'MAXVALUE':
+        return []
+    # Bounds look like '2027-01-01'; the last one starts the MAXVALUE partition
+    next_year = int(partitions[-2][1].strip("'")[:4])
+    through_year = through_year or date.today().year + 1
+    years = list(range(next_year, through_year + 1))
+    if not years:
+        return []
+    catch_all = partitions[-1][0]
+    new_partitions = ', '.join(
+        f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')" for year in years)
+    cursor.execute(
+        f"ALTER TABLE DailyMarketData REORGANIZE PARTITION {catch_all} INTO "
+        f"({new_partitions}, PARTITION {catch_all} VALUES LESS THAN (MAXVALUE))"
+    )
+    print(f"Added DailyMarketData partition(s) {', '.join(f'p{year}' for year in years)}")
+    return years
+
+# Period rollups of DailyMarketData: table, SQL expression for the period
+# start of obs_date, and in Python the period start of a date and the start
+# of the period after a given one.
+ROLLUPS = [
+    ('WeeklyMarketData', 'DATE_SUB(obs_date, INTERVAL WEEKDAY(obs_date) DAY)',
+     lambda d: d - timedelta(days=d.weekday()),
+     lambda start: start + timedelta(days=7)),
+    ('MonthlyMarketData', 'DATE_SUB(obs_date, INTERVAL DAYOFMONTH(obs_date) - 1 DAY)',
+     lambda d: d.replace(day=1),
+     lambda start: (start + timedelta(days=32)).replace(day=1)),
+    ('YearlyMarketData', 'MAKEDATE(YEAR(obs_date), 1)',
+     lambda d: date(d.year, 1, 1),
+     lambda start: date(start.year + 1, 1, 1)),
+]
+
+ROLLUP_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        asset_id        INT NOT NULL,
+        period_start    DATE NOT NULL,
+        first_date      DATE NOT NULL,
+        last_date       DATE NOT NULL,
+        open_price      DECIMAL(18,4) NOT NULL,
+        close_price     DECIMAL(18,4) NOT NULL,
+        high_price      DECIMAL(18,4) NOT NULL,
+        low_price       DECIMAL(18,4) NOT NULL,
+        avg_price       DECIMAL(18,4) NOT NULL,
+        total_volume    BIGINT NULL,
+        obs_count       INT NOT NULL,
+        PRIMARY KEY (asset_id, period_start),
+        FOREIGN KEY (asset_id) REFERENCES Asset(asset_id)
+    )
+"""
+
+ROLLUP_REFRESH = """
+    INSERT INTO {table} (asset_id, period_start, first_date, last_date, open_price, close_price,
+                         high_price, low_price, avg_price, total_volume, obs_count)
+    SELECT asset_id, period_start, MIN(obs_date), MAX(obs_date), MIN(open_price), MIN(close_price),
+           MAX(price), MIN(price), ROUND(AVG(price), 4), SUM(volume), COUNT(*)
+    FROM (
+        SELECT asset_id, obs_date, price, volume, {period} AS period_start,
+               FIRST_VALUE(price) OVER w AS open_price,
+               LAST_VALUE(price) OVER w AS close_price
+        FROM DailyMarketData
+        {where}
+        WINDOW w AS (PARTITION BY asset_id, {period} ORDER BY obs_date
+                     ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+    ) p
+    GROUP BY asset_id, period_start
+    ON DUPLICATE KEY UPDATE
+        first_date = VALUES(first_date), last_date = VALUES(last_date),
+        open_price = VALUES(open_price), close_price = VALUES(close_price),
+        high_price = VALUES(high_price), low_price = VALUES(low_price),
+        avg_price = VALUES(avg_price), total_volume = VALUES(total_volume),
+        obs_count = VALUES(obs_count)
+"""
+
+def ensure_rollup_tables(cursor):
+    """Create the rollup tables on databases that predate them."""
+    for table, _, _, _ in ROLLUPS:
+        cursor.execute(ROLLUP_TABLE.format(table=table))
+
+def _period_runs(starts, next_start):
+    """
+    Merge period starts into (first_day, last_day) date ranges, joining
+    consecutive periods so one statement covers a contiguous run.
+    """
+    runs = []
+    for start in sorted(starts):
+        if runs and runs[-1][1] == start:
+            runs[-1][1] = next_start(start)
+        else:
+            runs.append([start, next_start(start)])
+    return [(first, after - timedelta(days=1)) for first, after in runs]
+
+def refresh_rollups(cursor, touched=None):
+    """
+    Recompute weekly/monthly/yearly rollups. With `touched` (an iterable of
+    (asset_id, 'YYYY-MM-DD') keys written by this load) only the periods those
+    rows fall in are recomputed; with None, or when a rollup table is still
+    empty, every period is rebuilt.
+    """
+    ensure_rollup_tables(cursor)
+    started = time.perf_counter()
+
+    dates_by_asset = None
+    if touched is not None:
+        dates_by_asset = {}
+        for asset_id, obs_date in touched:
+            dates_by_asset.setdefault(asset_id, set()).add(obs_date)
+
+    statements = 0
+    for table, period_sql, period_start, next_start in ROLLUPS:
+        cursor.execute(f'SELECT 1 FROM {table} LIMIT 1')
+        empty = cursor.fetchone() is None
+        if dates_by_asset is None or empty:
+            cursor.execute(ROLLUP_REFRESH.format(table=table, period=period_sql, where=''))
+            statements += 1
+            continue
+        for asset_id, obs_dates in dates_by_asset.items():
+            starts = {period_start(date.fromisoformat(d)) for d in obs_dates}
+            for first, last in _period_runs(starts, next_start):
+                cursor.execute(
+                    ROLLUP_REFRESH.format(
+                        table=table, period=period_sql,
+                        where='WHERE asset_id = %s AND obs_date BETWEEN %s AND %s',
+                    ),
+                    (asset_id, first.isoformat(), last.isoformat()),
+                )
+                statements += 1
+    print(f"Rollups refreshed ({statements} statement(s), {time.perf_counter() - started:.2f}s)")
+
+def track_keys(records, keys):
+    """Pass records through, remembering their (asset_id, obs_date) in `keys`."""
+    for record in records:
+        keys.add((record[0], record[1]))
+        yield record
+
+def read_records(csv_file_path, stats, parser='columnar', mapping=ASSET_MAPPING):
+    """(asset_id, obs_date, price, volume) tuples for the columns in `mapping`."""
+    if parser == 'columnar' and np is not None:
+        return columnar_to_records(read_csv_columnar(csv_file_path, stats, mapping))
+    return iter_csv_records(csv_file_path, stats, mapping)
+
+def write_records(conn, records, stats, mode, batch_size, commit_every):
+    if mode == 'infile':
+        write_infile(conn, records, stats)
+    elif mode == 'row':
+        write_row_by_row(conn, records, stats, commit_every)
+    else:
+        write_batched(conn, records, stats, batch_size, commit_every)
+
+def plan_shards(file_mappings, workers):
+    """
+    Split a load of [(csv_file, mapping)] into shards of the same shape for
+    about `workers` processes. Each asset belongs to exactly one shard, which
+    reads that asset's files in the given order; a repeated (asset, date)
+    therefore ends up with the same value as in a sequential load, whatever
+    order the shards run in.
+
+    Assets found in the same files are split into chunks (sharding by asset,
+    e.g. the columns of one wide file); files whose assets appear nowhere
+    else become a shard each unless they hold more than a chunk (sharding by
+    file).
+    """
+    files_by_asset = {}
+    for i, (_, mapping) in enumerate(file_mappings):
+        for _, _, asset_id in mapping:
+            files = files_by_asset.setdefault(asset_id, [])
+            if not files or files[-1] != i:
+                files.append(i)
+    groups = {}
+    for asset_id, files in files_by_asset.items():
+        groups.setdefault(tuple(files), []).append(asset_id)
+
+    chunk = max(1, -(-len(files_by_asset) // max(workers, 1)))
+    shards = []
+    for files, asset_ids in groups.items():
+        for start in range(0, len(asset_ids), chunk):
+            members = set(asset_ids[start:start + chunk])
+            shards.append([
+                (file_mappings[i][0], [entry for entry in file_mappings[i][1] if entry[2] in members])
+                for i in files
+            ])
+    return shards
+
+def load_shard(number, shard, mode, batch_size, parser):
+    """
+    Load one shard over its own connection; runs in a worker process. Every
+    batch is its own transaction so a deadlock with another worker only
+    means running that batch again. Returns (stats, touched keys, seconds).
+    """
+    global PROGRESS_PREFIX
+    PROGRESS_PREFIX = f'[shard {number}] '
+    started = time.perf_counter()
+    stats = {'inserted': 0, 'errors': 0}
+    touched = set()
+    conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=(mode == 'infile'))
+    try:
+        for csv_file_path, mapping in shard:
+            records = track_keys(read_records(csv_file_path, stats, parser, mapping), touched)
+            write_records(conn, records, stats, mode, batch_size, commit_every=batch_size)
+    finally:
+        conn.close()
+    return stats, touched, time.perf_counter() - started
+
+def count_shard_records(shard, parser, touched):
+    """
+    Records a shard holds, for reporting a failed shard in rows; their keys go
+    into `touched` so rollups cover whatever the shard committed before it
+    failed. A file that can't be parsed here either is counted as every data
+    line times the shard's columns in it.
+    """
+    count = 0
+    for csv_file_path, mapping in shard:
+        keys = set()
+        try:
+            count += sum(1 for _ in track_keys(
+                read_records(csv_file_path, {'inserted': 0, 'errors': 0}, parser, mapping), keys))
+        except Exception:
+            with open(csv_file_path, 'r', encoding='utf-8', newline='') as f:
+                count += max(sum(1 for _ in f) - 1, 0) * len(mapping)
+        touched.update(keys)
+    return count
+
+def load_parallel(file_mappings, stats, touched, mode, batch_size, parser, workers):
+    """Run the shards of plan_shards() on a process pool and merge their stats and keys."""
+    shards = plan_shards(file_mappings, workers)
+    processes = max(1, min(workers, len(shards)))
+    print(f"Loading {len(shards)} shard(s) on {processes} worker process(es)")
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(load_shard, number, shard, mode, batch_size, parser)
+                   for number, shard in enumerate(shards, 1)]
+        for number, (shard, future) in enumerate(zip(shards, futures), 1):
+            try:
+                shard_stats, shard_touched, elapsed = future.result()
+            except Exception as err:
+                # Any worker failure (including a broken pool) costs this
+                # shard only; the other shards' results are still merged
+                lost = count_shard_records(shard, parser, touched)
+                print(f"Error loading shard {number} ({lost:,} records not loaded or "
+                      f"partly loaded): {type(err).__name__}: {err}")
+                stats['errors'] += lost
+                continue
+            assets = len({entry[2] for _, mapping in shard for entry in mapping})
+            print(f"Shard {number}: {assets} asset(s) from {len(shard)} file(s), "
+                  f"{shard_stats['inserted']:,} records, {shard_stats['errors']} error(s) "
+                  f"in {elapsed:.2f}s")
+            stats['inserted'] += shard_stats['inserted']
+            stats['errors'] += shard_stats['errors']
+            touched.update(shard_touched)
+
+def load_csv_to_db(csv_files, mode='batch', batch_size=1000, commit_every=10000,
+                   parser='columnar', incremental=False, workers=1,
+                   asset_type=DEFAULT_ASSET_TYPE):
+    """
+    Load one CSV file or a list of them into MySQL. Assets come from the
+    files' `<Name>_Price` columns (see resolve_asset_mapping()). With
+    `workers` > 1 a full load is split across that many processes, each
+    writing over its own connection (see plan_shards()).
+    """
+    if isinstance(csv_files, str):
+        csv_files = [csv_files]
+
+    # Connect to database
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG, allow_local_infile=(mode == 'infile'))
+        print("Connected to database successfully")
+    except mysql.connector.Error as err:
+        print(f"Error connecting to database: {err}")
+        return
+
+    stats = {'inserted': 0, 'errors': 0}
+    started = time.perf_counter()
+    try:
+        file_mappings = resolve_asset_mapping(conn, csv_files, asset_type)
+        cursor = conn.cursor()
+        ensure_partitions(cursor)
+        cursor.close()
+    except (mysql.connector.Error, ValueError, OSError) as err:
+        print(f"Error preparing the load: {err}")
+        conn.close()
+        return
+
+    if incremental:
+        if workers > 1:
+            print("Note: incremental loads run on one connection; ignoring --workers")
+        changes = []
+        stats.update(updated=0, unchanged=0)
+        for csv_file_path, mapping in file_mappings:
+            file_stats = {'inserted': 0, 'errors': 0}
+            records = read_records(csv_file_path, file_stats, parser, mapping)
+            changes += write_incremental(conn, records, file_stats, batch_size, commit_every,
+                                         os.path.basename(csv_file_path), file_sha256(csv_file_path))
+            for key in stats:
+                stats[key] += file_stats[key]
+        touched = [(record[0], record[1]) for record, _ in changes]
+    else:
+        reset_row_hashes(conn)
+        touched = set()
+        if workers > 1:
+            load_parallel(file_mappings, stats, touched, mode, batch_size, parser, workers)
+        else:
+            for csv_file_path, mapping in file_mappings:
+                records = track_keys(read_records(csv_file_path, stats, parser, mapping), touched)
+                write_records(conn, records, stats, mode, batch_size, commit_every)
+        changes = None
+
+    cursor = conn.cursor()
+    refresh_rollups(cursor, touched)
     conn.commit()
+    # A no-op incremental run leaves the API caches alone
+    if changes is None or changes:
+        bump_data_version(cursor)
+        conn.commit()
+    elapsed = time.perf_counter() - started
     print(f"\nData loading complete!")
-    print(f"Total records inserted: {inserted_count}")
-    print(f"Errors encountered: {error_count}")
-    
+    if incremental:
+        print(f"New records inserted: {stats['inserted']}")
+        print(f"Changed records updated: {stats['updated']}")
+        print(f"Unchanged records skipped: {stats['unchanged']}")
+    else:
+        print(f"Total records inserted: {stats['inserted']}")
+    print(f"Errors encountered: {stats['errors']}")
+    print(f"Elapsed: {elapsed:.2f}s ({stats['inserted'] / elapsed if elapsed else 0:,.0f} rows/sec)")
+
+    cursor.close()
+    conn.close()
+
+def rebuild_rollups():
+    """Recompute every rollup period from DailyMarketData (e.g. after upgrading a database)."""
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as err:
+        print(f"Error connecting to database: {err}")
+        return
+    cursor = conn.cursor()
+    refresh_rollups(cursor)
+    bump_data_version(cursor)
+    conn.commit()
     cursor.close()
     conn.close()
 
+def build_embedded(csv_file_path, engine, path=None):
+    """Build or refresh the embedded SQLite/DuckDB file the API can read from (DB_BACKEND)."""
+    import embedded_db  # imports this module
+
+    path = path or os.environ.get('EMBEDDED_DB_PATH') or embedded_db.default_path(engine)
+    started = time.perf_counter()
+    try:
+        count = embedded_db.build_database(path, csv_file_path, engine=engine)
+    except (RuntimeError, OSError) as err:
+        print(f"Error building embedded database: {err}")
+        return
+    print(f"Built {engine} database {path}: {count:,} rows in {time.perf_counter() - started:.2f}s")
+
 if __name__ == '__main__':
-    csv_file = 'Stock Market Dataset.csv'
-    print(f"Loading data from {csv_file}...")
-    load_csv_to_db(csv_file)
+    parser = argparse.ArgumentParser(description='Load wide market CSV files into MySQL.')
+    parser.add_argument('csv_files', nargs='*', default=['Stock Market Dataset.csv'],
+                        metavar='csv_file', help='files to load, in order (later files win '
+                        'for a repeated asset and date)')
+    parser.add_argument('--mode', choices=['batch', 'infile', 'row'],
+                        default=os.environ.get('LOAD_MODE', 'batch'),
+                        help='batch: multi-row upserts (default); infile: LOAD DATA LOCAL INFILE '
+                             'into a staging table then one merge; row: one upsert per record')
+    parser.add_argument('--batch-size', type=int,
+                        default=int(os.environ.get('LOAD_BATCH_SIZE', '1000')),
+                        help='rows per multi-row INSERT in batch mode')
+    parser.add_argument('--commit-every', type=int,
+                        default=int(os.environ.get('LOAD_COMMIT_EVERY', '10000')),
+                        help='rows per transaction (also the progress interval)')
+    parser.add_argument('--parser', choices=['columnar', 'rows'], default='columnar',
+                        help='columnar: vectorized numpy parsing of the whole file (default); '
+                             'rows: per-cell parsing with csv.DictReader')
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('LOAD_WORKERS', '1')),
+                        help='worker processes for a full load, each with its own connection; '
+                             'assets (or files) are split between them')
+    parser.add_argument('--asset-type', default=DEFAULT_ASSET_TYPE,
+                        help='AssetType name for assets created for unknown price columns')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only write rows that are new or whose content changed; '
+                             'resumable after a crash')
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help='recompute the weekly/monthly/yearly rollup tables from '
+                             'DailyMarketData and exit without loading the CSV')
+    parser.add_argument('--embedded', choices=['sqlite', 'duckdb'],
+                        help='build (or refresh) an embedded database file from the CSV '
+                             'instead of loading MySQL')
+    parser.add_argument('--embedded-path',
+                        help='embedded database file (default: EMBEDDED_DB_PATH, then '
+                             'market_data.sqlite / market_data.duckdb)')
+    args = parser.parse_args()
+    if args.embedded and len(args.csv_files) > 1:
+        parser.error('--embedded builds from a single CSV file')
 
+    if args.rebuild_rollups:
+        rebuild_rollups()
+    elif args.embedded:
+        build_embedded(args.csv_files[0], args.embedded, args.embedded_path)
+    else:
+        print(f"Loading data from {', '.join(args.csv_files)}...")
+        load_csv_to_db(args.csv_files, mode=args.mode, batch_size=args.batch_size,
+                       commit_every=args.commit_every, parser=args.parser,
+                       incremental=args.incremental, workers=args.workers,
+                       asset_type=args.asset_type)
+    # Results are keyed on DataVersion and generated SQL doesn't depend on
+    # the data, so only the asset list and the cached version need dropping
+    notify_app_cache_invalidation(['assets', 'data_version'])
@@ -0,0 +1,237 @@
+"""
+Low-overhead request instrumentation and Prometheus text exposition.
+
+Stages of a request are timed with `with span("llm"): ...`. Each span is
+observed in the stage histogram and added to the current request's trace,
+which the app uses for the slow-request log. A span costs two perf_counter()
+calls and one short lock, so instrumentation can stay on in production.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+
+# Seconds; spans range from microseconds (safety check) to seconds (LLM).
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Gauge or counter read from existing state at scrape time; `collect`
+    returns [(labels dict, value)].
+    """
+
+    def __init__(self, name, help_text, metric_type, collect):
+        self.name = name
+        self.help = help_text
+        self.type = metric_type
+        self.collect = collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in self.collect():
+            if value is None:
+                continue
+            names = tuple(labels)
+            lines.append(
+                f"{self.name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}"
+            )
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "market_api_request_duration_seconds",
+    "Time spent handling an HTTP request.",
+    ("endpoint", "status"),
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "market_api_stage_duration_seconds",
+    "Time spent in one stage of a request (asset_list, llm, safety_check, db_connect, ...).",
+    ("stage",),
+))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "market_api_llm_tokens_total",
+    "Tokens sent to and received from the LLM.",
+    ("direction",),
+))
+QUERY_SOURCES = REGISTRY.register(Counter(
+    "market_api_queries_total",
+    "Answered /api/query requests by where the SQL came from.",
+    ("sql_source",),
+))
+RESULT_ROWS = REGISTRY.register(Histogram(
+    "market_api_result_rows",
+    "Rows returned per response.",
+    ("endpoint",),
+    ROW_BUCKETS,
+))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    "market_api_response_bytes",
+    "Response payload size in bytes.",
+    ("endpoint",),
+    BYTE_BUCKETS,
+))
+
+
+# =========================
+# Per-request traces
+# =========================
+
+_current_trace = contextvars.ContextVar("market_api_trace", default=None)
+
+
+class RequestTrace:
+    __slots__ = ("started", "spans", "attrs")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.attrs = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def start_trace():
+    """Begin a trace for the current request; returns a token for end_trace()."""
+    return _current_trace.set(RequestTrace())
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def end_trace(token):
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    return trace
+
+
+def annotate(**attrs):
+    """Attach values (sql_source, rows, tokens, ...) to the current request's trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+class span:
+    """Context manager timing one stage of the current request."""
+
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans[self.stage] = trace.spans.get(self.stage, 0.0) + elapsed
+        return False
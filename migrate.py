@@ -0,0 +1,189 @@
+"""
+Versioned schema migrations for an existing market_data database.
+
+Migrations are the numbered .sql files in migrations/ (NNNN_description.sql),
+applied in order. Each applied version is recorded in the SchemaMigration
+table with a checksum of its file; a fresh database built from
+create_schema.sql already records the versions it includes. A file whose
+first line starts with `-- optional` (e.g. the compact storage profile,
+0006) is only applied when named with --include.
+
+Usage:
+    python migrate.py                  # apply all pending migrations
+    python migrate.py --status         # list applied and pending migrations
+    python migrate.py --target 0004    # apply pending migrations up to 0004
+    python migrate.py --include 0006   # also apply optional migration 0006
+    python migrate.py --dry-run        # print the SQL that would run
+    python migrate.py --benchmark      # time the query workload before and after each one
+"""
+
+import argparse
+import hashlib
+import os
+import re
+
+import mysql.connector
+
+from load_data import DB_CONFIG
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+OPTIONAL_MARKER = '-- optional'
+
+SCHEMA_MIGRATION_TABLE = """
+    CREATE TABLE IF NOT EXISTS SchemaMigration (
+        version     CHAR(4) PRIMARY KEY,
+        name        VARCHAR(100) NOT NULL,
+        checksum    CHAR(64) NOT NULL,
+        applied_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path, sql, checksum)] sorted by version."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, 'r', encoding='utf-8') as f:
+            sql = f.read()
+        # Line endings are normalized so a Windows checkout matches create_schema.sql
+        checksum = hashlib.sha256(sql.replace('\r\n', '\n').encode('utf-8')).hexdigest()
+        migrations.append((match.group(1), match.group(2), path, sql, checksum))
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def is_optional(migration):
+    return migration[3].lstrip().startswith(OPTIONAL_MARKER)
+
+
+def split_statements(sql):
+    """Split a migration file into statements (drops -- comments; no ; inside literals)."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [s.strip() for s in '\n'.join(lines).split(';') if s.strip()]
+
+
+def applied_migrations(cursor):
+    cursor.execute(SCHEMA_MIGRATION_TABLE)
+    cursor.execute('SELECT version, checksum FROM SchemaMigration')
+    return dict(cursor.fetchall())
+
+
+def apply_migration(conn, migration):
+    """
+    Run one migration and record it. MySQL commits DDL implicitly, so a
+    failure part-way leaves earlier statements applied; the version is only
+    recorded once every statement succeeded.
+    """
+    version, name, _, sql, checksum = migration
+    cursor = conn.cursor()
+    try:
+        for statement in split_statements(sql):
+            cursor.execute(statement)
+        cursor.execute(
+            'INSERT INTO SchemaMigration (version, name, checksum) VALUES (%s, %s, %s)',
+            (version, name, checksum),
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def print_status(migrations, applied):
+    for migration in migrations:
+        version, name, _, _, checksum = migration
+        if version not in applied:
+            state = 'optional (--include to apply)' if is_optional(migration) else 'pending'
+        elif applied[version] != checksum:
+            state = 'applied (file changed since)'
+        else:
+            state = 'applied'
+        print(f"  {version} {name:<40} {state}")
+    unknown = sorted(set(applied) - {m[0] for m in migrations})
+    for version in unknown:
+        print(f"  {version} {'(no file)':<40} applied")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help='list migrations and exit')
+    parser.add_argument('--target', help='last version to apply (default: all)')
+    parser.add_argument('--include', action='append', default=[], metavar='VERSION',
+                        help='also apply this optional migration (repeatable)')
+    parser.add_argument('--dry-run', action='store_true', help='print pending SQL without running it')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='run the bench_queries.py workload before and after each migration')
+    parser.add_argument('--runs', type=int, default=20, help='timed runs per query when benchmarking')
+    args = parser.parse_args()
+
+    migrations = discover_migrations()
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as err:
+        print(f"Error connecting to database: {err}")
+        return
+
+    try:
+        cursor = conn.cursor()
+        applied = applied_migrations(cursor)
+        cursor.close()
+        conn.commit()
+
+        if args.status:
+            print_status(migrations, applied)
+            return
+
+        unknown = set(args.include) - {m[0] for m in migrations}
+        if unknown:
+            print(f"ERROR: no migration file for --include {', '.join(sorted(unknown))}")
+            return
+        pending = [m for m in migrations
+                   if m[0] not in applied and (args.target is None or m[0] <= args.target)
+                   and (not is_optional(m) or m[0] in args.include)]
+        for version, name, _, _, checksum in migrations:
+            if version in applied and applied[version] != checksum:
+                print(f"WARNING: migration {version} {name} was edited after it was applied")
+        if not pending:
+            print("Database is up to date.")
+            return
+
+        if args.dry_run:
+            for version, name, _, sql, _ in pending:
+                print(f"-- {version} {name}")
+                for statement in split_statements(sql):
+                    print(statement + ';\n')
+            return
+
+        snapshots = []
+        if args.benchmark:
+            import bench_queries
+            print("Benchmarking before migrations...")
+            snapshots.append(('before', bench_queries.run_workload(conn, args.runs)))
+
+        for migration in pending:
+            version, name = migration[0], migration[1]
+            print(f"Applying {version} {name}...")
+            try:
+                apply_migration(conn, migration)
+            except mysql.connector.Error as err:
+                print(f"ERROR applying {version} {name}: {err}")
+                print("Stopping; fix the problem and re-run to continue from this migration.")
+                break
+            if args.benchmark:
+                snapshots.append((f'after {version}', bench_queries.run_workload(conn, args.runs)))
+
+        if len(snapshots) > 1:
+            print()
+            bench_queries.print_comparison(snapshots)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
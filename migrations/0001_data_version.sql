@@ -0,0 +1,9 @@
+-- DataVersion: bumped by load_data.py on every load; the API keys its
+-- result cache on this version.
+CREATE TABLE IF NOT EXISTS DataVersion (
+    name        VARCHAR(50) PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO DataVersion (name, version) VALUES ('market_data', 0);
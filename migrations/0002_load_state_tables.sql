@@ -0,0 +1,19 @@
+-- Bookkeeping for `load_data.py --incremental`.
+CREATE TABLE IF NOT EXISTS LoadRowHash (
+    asset_id    INT NOT NULL,
+    obs_date    DATE NOT NULL,
+    row_hash    BIGINT NOT NULL,
+    PRIMARY KEY (asset_id, obs_date)
+);
+
+CREATE TABLE IF NOT EXISTS LoadCheckpoint (
+    source_file     VARCHAR(255) PRIMARY KEY,
+    file_sha256     CHAR(64) NOT NULL,
+    status          VARCHAR(20) NOT NULL,
+    changes_total   INT NOT NULL DEFAULT 0,
+    changes_done    INT NOT NULL DEFAULT 0,
+    inserted        INT NOT NULL DEFAULT 0,
+    updated         INT NOT NULL DEFAULT 0,
+    unchanged       INT NOT NULL DEFAULT 0,
+    updated_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,49 @@
+-- Per-asset weekly/monthly/yearly rollups of DailyMarketData. They start
+-- empty; the next load (or `load_data.py --rebuild-rollups`) fills them.
+CREATE TABLE IF NOT EXISTS WeeklyMarketData (
+    asset_id        INT NOT NULL,
+    period_start    DATE NOT NULL,
+    first_date      DATE NOT NULL,
+    last_date       DATE NOT NULL,
+    open_price      DECIMAL(18,4) NOT NULL,
+    close_price     DECIMAL(18,4) NOT NULL,
+    high_price      DECIMAL(18,4) NOT NULL,
+    low_price       DECIMAL(18,4) NOT NULL,
+    avg_price       DECIMAL(18,4) NOT NULL,
+    total_volume    BIGINT NULL,
+    obs_count       INT NOT NULL,
+    PRIMARY KEY (asset_id, period_start),
+    FOREIGN KEY (asset_id) REFERENCES Asset(asset_id)
+);
+
+CREATE TABLE IF NOT EXISTS MonthlyMarketData (
+    asset_id        INT NOT NULL,
+    period_start    DATE NOT NULL,
+    first_date      DATE NOT NULL,
+    last_date       DATE NOT NULL,
+    open_price      DECIMAL(18,4) NOT NULL,
+    close_price     DECIMAL(18,4) NOT NULL,
+    high_price      DECIMAL(18,4) NOT NULL,
+    low_price       DECIMAL(18,4) NOT NULL,
+    avg_price       DECIMAL(18,4) NOT NULL,
+    total_volume    BIGINT NULL,
+    obs_count       INT NOT NULL,
+    PRIMARY KEY (asset_id, period_start),
+    FOREIGN KEY (asset_id) REFERENCES Asset(asset_id)
+);
+
+CREATE TABLE IF NOT EXISTS YearlyMarketData (
+    asset_id        INT NOT NULL,
+    period_start    DATE NOT NULL,
+    first_date      DATE NOT NULL,
+    last_date       DATE NOT NULL,
+    open_price      DECIMAL(18,4) NOT NULL,
+    close_price     DECIMAL(18,4) NOT NULL,
+    high_price      DECIMAL(18,4) NOT NULL,
+    low_price       DECIMAL(18,4) NOT NULL,
+    avg_price       DECIMAL(18,4) NOT NULL,
+    total_volume    BIGINT NULL,
+    obs_count       INT NOT NULL,
+    PRIMARY KEY (asset_id, period_start),
+    FOREIGN KEY (asset_id) REFERENCES Asset(asset_id)
+);
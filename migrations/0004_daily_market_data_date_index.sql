@@ -0,0 +1,6 @@
+-- Date-first access path for cross-sectional queries ("all assets on
+-- 2023-05-01", ranking assets by price on a date). The primary key leads
+-- with asset_id, so without this every such query scans the whole table.
+-- InnoDB appends the primary key to secondary indexes, so (obs_date, price)
+-- also covers asset_id.
+CREATE INDEX idx_dmd_date_price ON DailyMarketData (obs_date, price);
@@ -0,0 +1,4 @@
+-- Every generated query filters on Asset.symbol; make that an index lookup
+-- and guarantee a symbol maps to one asset. Fails if duplicates exist:
+--   SELECT symbol, COUNT(*) FROM Asset GROUP BY symbol HAVING COUNT(*) > 1;
+ALTER TABLE Asset ADD CONSTRAINT uq_asset_symbol UNIQUE (symbol);
@@ -0,0 +1,36 @@
+-- optional: apply with `python migrate.py --include 0006`.
+-- Compact storage profile for large DailyMarketData histories:
+--   asset_id SMALLINT UNSIGNED   (2 bytes instead of 4; up to 65,535 assets)
+--   price    DECIMAL(12,4)       (6 bytes instead of 9; up to 99,999,999.9999)
+--   volume   BIGINT UNSIGNED     (volumes reach 4.47e9, past INT UNSIGNED)
+--   yearly RANGE partitions on obs_date, so date-range scans read only
+--   the years they ask for, and zlib page compression on disk.
+-- Partitioned InnoDB tables can't have foreign keys, so asset_id is no
+-- longer checked against Asset; load_data.py only writes ids it resolved
+-- from Asset. load_data.py adds partitions for new years as it loads.
+-- The ALTER copies the table once; writes wait until it finishes.
+SET @dmd_fk = (SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+               WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'DailyMarketData' LIMIT 1);
+SET @dmd_drop_fk = IF(@dmd_fk IS NULL, 'DO 0',
+                      CONCAT('ALTER TABLE DailyMarketData DROP FOREIGN KEY `', @dmd_fk, '`'));
+PREPARE dmd_drop_fk FROM @dmd_drop_fk;
+EXECUTE dmd_drop_fk;
+DEALLOCATE PREPARE dmd_drop_fk;
+
+ALTER TABLE DailyMarketData
+    MODIFY asset_id SMALLINT UNSIGNED NOT NULL,
+    MODIFY price DECIMAL(12,4) NOT NULL,
+    MODIFY volume BIGINT UNSIGNED NULL,
+    COMPRESSION = 'zlib'
+PARTITION BY RANGE COLUMNS (obs_date) (
+    PARTITION p_old VALUES LESS THAN ('2019-01-01'),
+    PARTITION p2019 VALUES LESS THAN ('2020-01-01'),
+    PARTITION p2020 VALUES LESS THAN ('2021-01-01'),
+    PARTITION p2021 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+);
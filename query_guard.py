@@ -0,0 +1,59 @@
+"""
+Pre-execution cost checks for generated SQL.
+
+The app runs EXPLAIN on a query before executing it and passes the plan rows
+(dicts as returned by a dictionary cursor) to the helpers here.
+"""
+
+
+class QueryRejected(Exception):
+    """Raised when a query's estimated cost is over the configured budget."""
+
+    def __init__(self, message, estimated_rows, row_budget, plan):
+        super().__init__(message)
+        self.estimated_rows = estimated_rows
+        self.row_budget = row_budget
+        self.plan = plan
+
+
+def _number(value, default):
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def estimate_rows_examined(plan):
+    """
+    Rough number of rows MySQL will examine for a traditional EXPLAIN plan.
+
+    Tables with the same select id form a nested-loop join: each table is
+    probed once per row surviving the tables before it, so its `rows` are
+    multiplied by that prefix (scaled by `filtered`). Separate select ids
+    (subqueries, derived tables, UNION parts) are added together.
+    """
+    total = 0.0
+    prefix = {}
+    for step in plan:
+        select_id = step.get("id")
+        rows = _number(step.get("rows"), 0.0)
+        filtered = _number(step.get("filtered"), 100.0) / 100.0
+        fanout = prefix.get(select_id, 1.0)
+        total += fanout * rows
+        prefix[select_id] = fanout * max(rows * filtered, 1.0)
+    return int(total)
+
+
+def summarize_plan(plan):
+    """The columns of an EXPLAIN plan that are useful for tuning the budget."""
+    keys = ("id", "select_type", "table", "type", "key", "rows", "filtered", "Extra")
+    return [{key: step.get(key) for key in keys} for step in plan]
+
+
+def with_limit(sql, limit):
+    """
+    Wrap a query so it returns at most `limit` rows. With the derived table as
+    the only source, MySQL keeps the inner ORDER BY.
+    """
+    inner = sql.strip().rstrip(";").rstrip()
+    return f"SELECT * FROM ({inner}) AS limited LIMIT {int(limit)}"
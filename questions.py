@@ -0,0 +1,62 @@
+"""
+Question text normalization shared by the SQL cache and the fast path.
+"""
+
+import re
+
+# Words dropped from asset names to get the short form people type ("Apple").
+ASSET_NAME_SUFFIXES = {"inc", "corp", "corporation", "co", "com", "ltd", "platforms"}
+
+
+# Bumped when normalize_question() output changes, so cached SQL stored under
+# keys of the old form is discarded (see app.question_cache).
+KEY_VERSION = 2
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase, turn punctuation into spaces and collapse whitespace. Decimal
+    points, comparison operators (< > = != <=...), percent signs and minus signs
+    change what the SQL means, so they are kept: "price > 100" and
+    "price < 100" must not share a cache entry.
+    """
+    text = text.lower()
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text)
+    text = re.sub(r"[<>!=]=|<>|[<>=%]", lambda m: f" {m.group()} ", text)
+    text = re.sub(r"[^\w\s.<>=!%-]|!(?!=)", " ", text)
+    # A hyphen is a minus sign only in front of a number, not inside a word
+    # or a date like 2023-01-05
+    text = re.sub(r"(?<=\w)-|-(?!\d)", " ", text)
+    return " ".join(text.split())
+
+
+def build_asset_aliases(assets):
+    """
+    Map normalized asset wording to its symbol, e.g.
+    'apple inc' / 'apple' / 'aapl' -> 'AAPL'.
+    """
+    aliases = {}
+    for row in assets:
+        symbol = row["symbol"]
+        name = normalize_text(row["name"])
+        short_name = " ".join(w for w in name.split() if w not in ASSET_NAME_SUFFIXES)
+        for alias in (normalize_text(symbol), name, short_name):
+            if alias:
+                aliases.setdefault(alias, symbol)
+    return aliases
+
+
+def normalize_question(question: str, asset_aliases) -> str:
+    """
+    Canonical form of a question used as the SQL cache key: case, punctuation
+    and whitespace are normalized and asset names/aliases become symbols, so
+    "Apple price last week?" and "aapl price  last week" share an entry.
+    """
+    text = normalize_text(question)
+    if asset_aliases:
+        # Longest alias first so "apple inc" wins over "apple".
+        pattern = r"\b(" + "|".join(
+            re.escape(a) for a in sorted(asset_aliases, key=len, reverse=True)
+        ) + r")\b"
+        text = re.sub(pattern, lambda m: asset_aliases[m.group(1)].lower(), text)
+    return text
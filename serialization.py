@@ -0,0 +1,92 @@
+"""
+Fast JSON encoding, columnar result layout and response compression.
+
+orjson and brotli are optional: without orjson the stdlib encoder is used
+(same output, slower), and without brotli only gzip is offered.
+"""
+
+import datetime
+import decimal
+import gzip
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson", "text/plain")
+GZIP_LEVEL = 6
+# Brotli's higher qualities are meant for static assets; 4 compresses about
+# as well as gzip -6 and faster.
+BROTLI_QUALITY = 4
+
+
+def _default(value):
+    # DECIMAL prices become JSON numbers, DATE columns ISO strings.
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Encode obj as compact UTF-8 JSON, handling Decimal and dates."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def to_columnar(rows):
+    """
+    (columns, values) for a list of row dicts: column names once and one
+    list of values per column, in the same order.
+    """
+    if not rows:
+        return [], []
+    columns = list(rows[0])
+    return columns, [[row[column] for row in rows] for column in columns]
+
+
+def parse_accept_encoding(accept_encoding: str):
+    """{coding: q} from an Accept-Encoding header."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            offered[coding.strip().lower()] = q
+    return offered
+
+
+def choose_encoding(accept_encoding: str):
+    """'br', 'gzip' or None from an Accept-Encoding header (q=0 disables a coding)."""
+    offered = parse_accept_encoding(accept_encoding)
+    wildcard = offered.get("*", 0.0)
+    if brotli is not None and offered.get("br", wildcard) > 0:
+        return "br"
+    if offered.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
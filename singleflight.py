@@ -0,0 +1,109 @@
+"""
+In-flight call coalescing ("single flight").
+
+When several threads ask for the same key at once, only the first runs the
+function; the others wait for it and receive the same result (or exception).
+Nothing is cached: once the call returns, the next caller runs it again.
+
+AsyncSingleFlight does the same for coroutines on one event loop.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        """
+        Return (result, shared). shared is True when the result came from a
+        call another thread was already making. Results are shared objects;
+        callers must not mutate them.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+            else:
+                call.followers += 1
+                self.followers += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "calls": self.leaders,
+                "coalesced": self.followers,
+            }
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, coro_fn):
+        """
+        Return (result, shared) like SingleFlight.do(). The call runs as its
+        own task, so a caller that is cancelled (e.g. its client went away)
+        doesn't cancel it for the others.
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.followers += 1
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(coro_fn())
+        self._calls[key] = task
+        self.leaders += 1
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), False
+
+    def _finish(self, key, task):
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller gave up.
+            task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.leaders,
+            "coalesced": self.followers,
+        }
@@ -27,6 +27,8 @@ function formatDate(dateStr) {
     year: 'numeric',
     month: 'short',
     day: 'numeric',
+    // Dates arrive as midnight UTC; don't let the local offset shift the day.
+    timeZone: 'UTC',
   });
 }
 
@@ -61,6 +63,30 @@ function showLoading() {
 
 // ----------------- rendering ----------------
 
+// Column names, row count and a cell accessor for either result layout:
+// "rows" (list of objects) or "columnar" (columns + one value array each).
+function resultTable(response) {
+  if (response.format === 'columnar') {
+    const columns = response.columns || [];
+    const values = response.data || [];
+    const byName = {};
+    columns.forEach((column, i) => {
+      byName[column] = values[i];
+    });
+    return {
+      keys: columns,
+      count: values.length ? values[0].length : 0,
+      cell: (index, column) => byName[column][index],
+    };
+  }
+  const data = Array.isArray(response.data) ? response.data : [];
+  return {
+    keys: data.length ? Object.keys(data[0]) : [],
+    count: data.length,
+    cell: (index, column) => data[index][column],
+  };
+}
+
 function renderResponse(response) {
   const responseSection = document.getElementById('responseSection');
   if (!responseSection) return;
@@ -108,13 +134,14 @@ ${response.sql}
   }
 
 
-  const data = response.data;
-  if (Array.isArray(data) && data.length > 0) {
-    const keys = Object.keys(data[0]);
+  const table = resultTable(response);
+  if (table.count > 0) {
+    const keys = table.keys;
+    const rowIndexes = Array.from({ length: table.count }, (_, i) => i);
 
     html += `
       <div class="fw-semibold mb-2">
-        Results (${data.length} row${data.length === 1 ? '' : 's'})
+        Results (${table.count} row${table.count === 1 ? '' : 's'})
       </div>
       <div class="table-responsive">
         <table class="table table-striped table-hover table-sm align-middle mb-0">
@@ -131,13 +158,13 @@ ${response.sql}
             </tr>
           </thead>
           <tbody>
-            ${data
-              .map((row) => {
+            ${rowIndexes
+              .map((rowIndex) => {
                 return `
                   <tr>
                     ${keys
                       .map((key) => {
-                        let value = row[key];
+                        let value = table.cell(rowIndex, key);
 
                         if (key.includes('price') && typeof value === 'number') {
                           value = '$' + formatNumber(value);
@@ -189,7 +216,7 @@ async function submitQuery() {
   showLoading();
 
   try {
-    const response = await fetch(`${API_URL}/query`, {
+    const response = await fetch(`${API_URL}/query?format=columnar`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
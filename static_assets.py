@@ -0,0 +1,117 @@
+"""
+Fingerprinted, precompressed static assets for the web UI.
+
+AssetBundle reads index.html and the files it references once, on first use
+(or during the app's warm-up).
+Each referenced file gets a content-hash URL (/assets/script.<hash>.js) that
+can be cached forever, and index.html is rewritten to point at those URLs.
+Every file is held in memory together with gzip and brotli variants, so a
+request never touches the disk or compresses anything.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+from collections import namedtuple
+
+from serialization import brotli, parse_accept_encoding
+
+ASSET_URL_PREFIX = "/assets/"
+# Files referenced from index.html that get fingerprinted URLs.
+FINGERPRINTED = {
+    "style.css": "text/css",
+    "script.js": "application/javascript",
+}
+
+# body: uncompressed bytes; variants: {"br" | "gzip": compressed bytes};
+# digest: content hash used for the ETag and the fingerprinted name.
+StaticAsset = namedtuple("StaticAsset", ["body", "mimetype", "digest", "variants"])
+
+
+def _variants(body):
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    # Tiny files can grow when compressed.
+    return {coding: data for coding, data in variants.items() if len(data) < len(body)}
+
+
+def make_asset(body, mimetype):
+    return StaticAsset(body, mimetype, hashlib.sha256(body).hexdigest()[:16], _variants(body))
+
+
+def fingerprint(name, digest):
+    """style.css -> style.<first 12 hex digits of the hash>.css"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest[:12]}{ext}"
+
+
+def select_variant(asset, accept_encoding):
+    """(body, coding) for the best encoding the client accepts; coding is None for identity."""
+    offered = parse_accept_encoding(accept_encoding)
+    wildcard = offered.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding in asset.variants and offered.get(coding, wildcard) > 0:
+            return asset.variants[coding], coding
+    return asset.body, None
+
+
+def etag_for(asset, coding):
+    # Each encoding is a different representation, so it needs its own tag.
+    return f"{asset.digest}-{coding}" if coding else asset.digest
+
+
+class AssetBundle:
+    def __init__(self, static_folder, index_name="index.html", fingerprinted=FINGERPRINTED,
+                 build=True):
+        self.static_folder = static_folder
+        self.index_name = index_name
+        self.fingerprinted = dict(fingerprinted)
+        self.files = self.assets = self.urls = self.index = None
+        self._mtimes = None
+        if build:
+            self.build()
+
+    def _paths(self):
+        return [os.path.join(self.static_folder, name) for name in [self.index_name, *self.fingerprinted]]
+
+    def _current_mtimes(self):
+        return tuple(os.stat(path).st_mtime_ns for path in self._paths())
+
+    def build(self):
+        """Read and compress every file and render index.html with fingerprinted URLs."""
+        mtimes = self._current_mtimes()
+        files, assets, urls = {}, {}, {}
+        for name, mimetype in self.fingerprinted.items():
+            with open(os.path.join(self.static_folder, name), "rb") as f:
+                asset = make_asset(f.read(), mimetype)
+            files[name] = asset
+            hashed = fingerprint(name, asset.digest)
+            assets[hashed] = asset
+            urls[name] = ASSET_URL_PREFIX + hashed
+
+        with open(os.path.join(self.static_folder, self.index_name), "r", encoding="utf-8") as f:
+            html = f.read()
+        for name, url in urls.items():
+            # href="style.css?v=4" -> href="/assets/style.<hash>.css"
+            pattern = r"""(["'])/?""" + re.escape(name) + r"""(?:\?[^"']*)?\1"""
+            html = re.sub(pattern, lambda m, url=url: f"{m.group(1)}{url}{m.group(1)}", html)
+
+        self.files = files
+        self.assets = assets
+        self.urls = urls
+        self.index = make_asset(html.encode("utf-8"), "text/html")
+        self._mtimes = mtimes
+
+    def ensure_built(self):
+        if self._mtimes is None:
+            self.build()
+
+    def refresh(self):
+        """Rebuild if any file changed on disk (cheap enough to call per page view)."""
+        try:
+            if self._current_mtimes() != self._mtimes:
+                self.build()
+        except OSError as e:
+            print(f"WARNING: could not refresh static assets: {e}")
@@ -0,0 +1,160 @@
+"""
+load_data.write_incremental() against an in-memory stand-in for the MySQL
+tables it touches (DailyMarketData, LoadRowHash, LoadCheckpoint).
+"""
+
+import mysql.connector
+import pytest
+
+import load_data
+
+
+class FakeDatabase:
+    """DailyMarketData and LoadRowHash as dicts; upserts of `failing` keys raise."""
+
+    def __init__(self):
+        self.data = {}    # (asset_id, obs_date) -> (price, volume)
+        self.hashes = {}  # (asset_id, obs_date) -> row_hash
+        self.failing = set()
+        self.checkpoints = {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        db = self.db
+        self._rows = []
+        if sql.startswith("CREATE TABLE") or sql.startswith("DELETE FROM LoadRowHash"):
+            if sql.startswith("DELETE"):
+                db.hashes.clear()
+        elif sql.startswith("SELECT file_sha256"):
+            checkpoint = db.checkpoints.get(params[0])
+            self._rows = [checkpoint] if checkpoint else []
+        elif sql.startswith("INSERT INTO LoadCheckpoint"):
+            source_file, sha256, status, total, done = params[:5]
+            db.checkpoints[source_file] = (sha256, status, done, total)
+        elif sql.startswith("SELECT asset_id, MAX(obs_date) FROM DailyMarketData"):
+            latest = {}
+            for asset_id, obs_date in db.data:
+                latest[asset_id] = max(latest.get(asset_id, obs_date), obs_date)
+            self._rows = list(latest.items())
+        elif sql.startswith("SELECT asset_id, obs_date, row_hash FROM LoadRowHash"):
+            first, last = params
+            self._rows = [(a, d, h) for (a, d), h in db.hashes.items() if first <= d <= last]
+        elif sql.startswith("SELECT d.asset_id, d.obs_date, d.price, d.volume"):
+            first, last = params
+            self._rows = [(a, d, p, v) for (a, d), (p, v) in db.data.items()
+                          if first <= d <= last and (a, d) not in db.hashes]
+        elif sql.startswith("INSERT INTO DailyMarketData"):
+            rows = [tuple(params[i:i + 4]) for i in range(0, len(params), 4)]
+            if any((a, d) in db.failing for a, d, _, _ in rows):
+                raise mysql.connector.Error(msg="Check constraint violated")
+            for asset_id, obs_date, price, volume in rows:
+                db.data[(asset_id, obs_date)] = (price, volume)
+        elif sql.startswith("INSERT INTO LoadRowHash"):
+            for i in range(0, len(params), 3):
+                asset_id, obs_date, h = params[i:i + 3]
+                db.hashes[(asset_id, obs_date)] = h
+        else:
+            raise AssertionError(f"unexpected SQL: {sql}")
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        pass
+
+
+RECORDS = [
+    (1, "2024-01-02", 10.0, 100),
+    (1, "2024-01-03", 11.0, 110),
+    (1, "2024-01-04", 12.0, None),
+    (2, "2024-01-02", 50.0, 5),
+    (2, "2024-01-03", 51.0, 6),
+]
+
+
+def load(db, records, batch_size=2):
+    stats = {"inserted": 0, "errors": 0}
+    load_data.write_incremental(db, records, stats, batch_size, commit_every=10,
+                                source_file="test.csv", sha256="abc")
+    return stats
+
+
+def test_first_load_inserts_everything():
+    db = FakeDatabase()
+    stats = load(db, RECORDS)
+    assert stats == {"inserted": 5, "errors": 0, "updated": 0, "unchanged": 0}
+    assert db.data[(1, "2024-01-04")] == (12.0, None)
+    assert len(db.hashes) == 5
+    assert db.checkpoints["test.csv"][1] == "complete"
+
+
+def test_rerun_skips_unchanged_and_updates_changed_rows():
+    db = FakeDatabase()
+    load(db, RECORDS)
+    changed = list(RECORDS)
+    changed[1] = (1, "2024-01-03", 11.5, 110)
+    changed.append((2, "2024-01-04", 52.0, 7))
+
+    stats = load(db, changed)
+    assert stats == {"inserted": 1, "errors": 0, "updated": 1, "unchanged": 4}
+    assert db.data[(1, "2024-01-03")] == (11.5, 110)
+
+    assert load(db, changed) == {"inserted": 0, "errors": 0, "updated": 0, "unchanged": 6}
+
+
+def test_rows_loaded_without_hashes_are_hashed_from_the_table():
+    db = FakeDatabase()
+    db.data = {(a, d): (p, v) for a, d, p, v in RECORDS}
+    changed = list(RECORDS)
+    changed[0] = (1, "2024-01-02", 9.0, 100)
+
+    stats = load(db, changed)
+    assert stats == {"inserted": 0, "errors": 0, "updated": 1, "unchanged": 4}
+    assert len(db.hashes) == 5
+
+
+@pytest.mark.parametrize("failing", [(1, "2024-01-03"), (1, "2024-01-04")])
+def test_failed_rows_are_retried_on_the_next_run(failing):
+    db = FakeDatabase()
+    db.failing = {failing}
+    stats = load(db, RECORDS)
+    assert stats["inserted"] == 4
+    assert stats["errors"] == 1
+    assert failing not in db.data
+    assert failing not in db.hashes
+
+    db.failing = set()
+    stats = load(db, RECORDS)
+    assert stats == {"inserted": 1, "errors": 0, "updated": 0, "unchanged": 4}
+    assert failing in db.data
+
+
+def test_failed_update_keeps_the_old_hash():
+    db = FakeDatabase()
+    load(db, RECORDS)
+    changed = list(RECORDS)
+    changed[3] = (2, "2024-01-02", 49.0, 5)
+
+    db.failing = {(2, "2024-01-02")}
+    stats = load(db, changed)
+    assert stats == {"inserted": 0, "errors": 1, "updated": 0, "unchanged": 4}
+    assert db.data[(2, "2024-01-02")] == (50.0, 5)
+
+    db.failing = set()
+    assert load(db, changed)["updated"] == 1
+    assert db.data[(2, "2024-01-02")] == (49.0, 5)
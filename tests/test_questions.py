@@ -0,0 +1,51 @@
+import pytest
+
+from questions import build_asset_aliases, normalize_question, normalize_text
+
+ASSETS = [
+    {"symbol": "AAPL", "name": "Apple Inc."},
+    {"symbol": "META", "name": "Meta Platforms"},
+    {"symbol": "BTC", "name": "Bitcoin"},
+]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("  What's the PRICE of Apple?? ", "what s the price of apple"),
+    ("price above 1.5 on 2023-01-05", "price above 1.5 on 2023 01 05"),
+    ("end of sentence. next", "end of sentence next"),
+    ("price>100", "price > 100"),
+    ("price >= 100 and volume != 0", "price >= 100 and volume != 0"),
+    ("price <> 100", "price <> 100"),
+    ("return of -5% or more", "return of -5 % or more"),
+    ("year-to-date return!", "year to date return"),
+])
+def test_normalize_text(text, expected):
+    assert normalize_text(text) == expected
+
+
+@pytest.mark.parametrize("a, b", [
+    ("price > 100", "price < 100"),
+    ("price >= 100", "price > 100"),
+    ("return above 5%", "return above 5"),
+    ("change of -5", "change of 5"),
+    ("price 1.5", "price 15"),
+])
+def test_meaningful_symbols_keep_questions_apart(a, b):
+    assert normalize_text(a) != normalize_text(b)
+
+
+def test_asset_aliases():
+    aliases = build_asset_aliases(ASSETS)
+    assert aliases["apple inc"] == "AAPL"
+    assert aliases["apple"] == "AAPL"
+    assert aliases["aapl"] == "AAPL"
+    assert aliases["meta"] == "META"
+
+
+def test_normalize_question_shares_keys_across_wording():
+    aliases = build_asset_aliases(ASSETS)
+    assert normalize_question("Apple price last week?", aliases) == "aapl price last week"
+    assert normalize_question("aapl  price last week", aliases) == "aapl price last week"
+    assert normalize_question("Apple Inc. price last week", aliases) == "aapl price last week"
+    # Aliases only match whole words
+    assert normalize_question("pineapple price", aliases) == "pineapple price"
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Start `callers` threads on flight.do(key, fn); returns their futures."""
+    pool = ThreadPoolExecutor(max_workers=callers)
+    futures = [pool.submit(flight.do, key, fn) for _ in range(callers)]
+    pool.shutdown(wait=False)
+    return futures
+
+
+def wait_for_followers(flight, count):
+    for _ in range(500):
+        if flight.stats()["coalesced"] >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"only {flight.stats()['coalesced']} follower(s) joined")
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"sql": "SELECT 1"}
+
+    futures = run_concurrently(flight, "q", fn, 5)
+    wait_for_followers(flight, 4)
+    release.set()
+    results = [f.result(timeout=5) for f in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0][0] for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 4}
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("LLM unavailable")
+
+    futures = run_concurrently(flight, "q", fn, 3)
+    wait_for_followers(flight, 2)
+    release.set()
+    for future in futures:
+        with pytest.raises(ValueError, match="LLM unavailable"):
+            future.result(timeout=5)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight()
+    counter = iter(range(10))
+    assert flight.do("q", lambda: next(counter)) == (0, False)
+    assert flight.do("q", lambda: next(counter)) == (1, False)
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        return threading.get_ident()
+
+    a = run_concurrently(flight, "a", fn, 1)[0]
+    b = run_concurrently(flight, "b", fn, 1)[0]
+    release.set()
+    assert a.result(timeout=5)[0] != b.result(timeout=5)[0]
+    assert flight.stats()["calls"] == 2
+
+
+def test_async_calls_share_one_task():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "SELECT 1"
+
+        results = await asyncio.gather(*(flight.do("q", fn) for _ in range(4)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["SELECT 1"] * 4
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 3}
+
+
+def test_async_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        flight = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do("q", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("q", fn))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == ("done", True)
@@ -0,0 +1,109 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+import timeseries  # noqa: E402
+from timeseries import SeriesStore  # noqa: E402
+
+ASSETS = [
+    {"asset_id": 8, "symbol": "AAPL", "name": "Apple"},
+    {"asset_id": 3, "symbol": "BTC", "name": "Bitcoin"},
+]
+# AAPL has no observation on 01-03; BTC starts on 01-02.
+ROWS = [
+    (8, "2024-01-01", 100.0, 10),
+    (8, "2024-01-02", 110.0, 11),
+    (8, "2024-01-04", 99.0, None),
+    (8, "2024-01-05", 121.0, 12),
+    (3, "2024-01-02", 40.0, 1),
+    (3, "2024-01-03", 44.0, 2),
+    (3, "2024-01-04", 33.0, 3),
+    (3, "2024-01-05", 66.0, 4),
+    (99, "2024-01-05", 1.0, 1),  # not in Asset: ignored
+]
+
+
+@pytest.fixture
+def store():
+    return SeriesStore.from_rows(ASSETS, ROWS, version=7)
+
+
+def values(row):
+    return [None if math.isnan(v) else round(float(v), 6) for v in row]
+
+
+def test_from_rows_aligns_assets_and_dates(store):
+    assert store.symbols == ["BTC", "AAPL"]
+    assert timeseries.dates_to_json(store.dates) == [
+        "2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    assert values(store.prices[1]) == [100.0, 110.0, None, 99.0, 121.0]
+    assert values(store.volumes[1]) == [10.0, 11.0, None, None, 12.0]
+    assert values(store.prices[0]) == [None, 40.0, 44.0, 33.0, 66.0]
+    assert store.stats()["version"] == 7
+
+
+def test_rows_for_and_date_slice(store):
+    assert store.rows_for(["aapl"]) == [1]
+    assert store.rows_for([]) == [0, 1]
+    with pytest.raises(ValueError, match="Unknown symbol"):
+        store.rows_for(["MSFT"])
+    columns = store.date_slice("2024-01-02", "2024-01-04")
+    assert (columns.start, columns.stop) == (1, 4)
+
+
+def test_daily_returns_bridge_gaps(store):
+    returns = store.daily_returns(store.rows_for(["AAPL"]))[0]
+    # 01-04 is compared with 01-02, the last observed price
+    assert values(returns) == [None, 0.1, None, -0.1, round(121 / 99 - 1, 6)]
+
+
+def test_total_returns(store):
+    rows = store.rows_for(["AAPL", "BTC"])
+    assert values(store.total_returns(rows, store.date_slice())) == [0.21, 0.65]
+    assert values(store.total_returns(rows, store.date_slice("2024-01-03", "2024-01-04"))) == [0.0, -0.25]
+
+
+def test_rolling_mean_needs_min_periods(store):
+    mean = store.rolling_mean(store.rows_for(["AAPL"]), window=2, min_periods=2)[0]
+    assert values(mean) == [None, 105.0, None, None, 110.0]
+    mean = store.rolling_mean(store.rows_for(["AAPL"]), window=2, min_periods=1)[0]
+    assert values(mean) == [100.0, 105.0, None, 99.0, 110.0]
+
+
+def test_rolling_volatility_matches_sample_std(store):
+    rows = store.rows_for(["BTC"])
+    vol = store.rolling_volatility(rows, window=3, min_periods=3, annualize=False)[0]
+    returns = [44 / 40 - 1, 33 / 44 - 1, 66 / 33 - 1]
+    assert values(vol)[:4] == [None, None, None, None]
+    assert vol[4] == pytest.approx(np.std(returns, ddof=1))
+
+
+def test_drawdowns(store):
+    drawdown, summary = store.drawdowns(store.rows_for(["BTC"]), store.date_slice())
+    assert values(drawdown[0]) == [None, 0.0, 0.0, -0.25, 0.0]
+    assert summary == [(-0.25, 2, 3)]
+
+
+def test_correlation_uses_dates_both_assets_have(store):
+    corr, counts = store.correlation(store.rows_for(["BTC", "AAPL"]), store.date_slice())
+    # BTC has returns on 01-03..01-05, AAPL on 01-02, 01-04 and 01-05
+    assert counts.tolist() == [[3, 2], [2, 3]]
+    assert corr[0, 0] == pytest.approx(1.0)
+    # Only two shared dates: too few for a correlation
+    assert math.isnan(corr[0, 1])
+
+
+def test_correlation_of_perfectly_related_series():
+    days = [f"2024-02-{d:02d}" for d in range(1, 7)]
+    prices = [10.0, 11.0, 9.0, 12.0, 12.5, 8.0]
+    rows = [(8, d, p, None) for d, p in zip(days, prices)]
+    rows += [(3, d, p * 3, None) for d, p in zip(days, prices)]
+    store = SeriesStore.from_rows(ASSETS, rows)
+    corr, counts = store.correlation([0, 1], store.date_slice())
+    assert counts.tolist() == [[5, 5], [5, 5]]
+    assert corr[0, 1] == pytest.approx(1.0)
+
+
+def test_to_json_list_maps_nan_to_none():
+    assert timeseries.to_json_list([1.23456789, np.nan], decimals=3) == [1.235, None]
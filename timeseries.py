@@ -0,0 +1,213 @@
+"""
+In-memory columnar copy of DailyMarketData for analytics.
+
+The whole table is small (about 20 assets x 1,250 dates), so it is held as
+date-aligned NumPy matrices: one row per asset (ordered by asset_id), one
+column per distinct obs_date, NaN where an asset has no observation.
+Every metric below is computed with whole-matrix operations.
+"""
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _forward_fill(matrix):
+    """Carry each row's last observed value forward over NaN gaps."""
+    valid = ~np.isnan(matrix)
+    index = np.where(valid, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    filled = matrix[np.arange(matrix.shape[0])[:, None], index]
+    # Leading gaps have nothing to carry forward.
+    filled[~np.maximum.accumulate(valid, axis=1)] = np.nan
+    return filled
+
+
+def _rolling_sums(values, window):
+    """
+    Rolling (sum, sum of squares, count) over the last `window` columns,
+    skipping NaNs.
+    """
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    sums = []
+    for column in (x, x * x, valid.astype(float)):
+        cumulative = np.cumsum(column, axis=1)
+        shifted = np.zeros_like(cumulative)
+        shifted[:, window:] = cumulative[:, :-window]
+        sums.append(cumulative - shifted)
+    return sums
+
+
+def _default_min_periods(window):
+    return max(1, -(-window * 4 // 5))
+
+
+class SeriesStore:
+    """Date-aligned price/volume matrices for every asset."""
+
+    def __init__(self, assets, dates, prices, volumes, version=None):
+        self.asset_ids = np.array([a["asset_id"] for a in assets], dtype=np.int64)
+        self.symbols = [a["symbol"] for a in assets]
+        self.names = [a["name"] for a in assets]
+        self._row_by_symbol = {s.upper(): i for i, s in enumerate(self.symbols)}
+        self.dates = dates
+        self.prices = prices
+        self.volumes = volumes
+        self.version = version
+
+    @classmethod
+    def from_rows(cls, assets, rows, version=None):
+        """
+        Build the store from Asset rows (dicts with asset_id, symbol, name) and
+        DailyMarketData rows as (asset_id, obs_date, price, volume) tuples.
+        """
+        assets = sorted(assets, key=lambda a: a["asset_id"])
+        asset_ids = np.array([a["asset_id"] for a in assets], dtype=np.int64)
+        n = len(rows)
+        row_assets = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        row_dates = np.array([r[1] for r in rows], dtype="datetime64[D]")
+        row_prices = np.fromiter(
+            (np.nan if r[2] is None else float(r[2]) for r in rows), dtype=float, count=n
+        )
+        row_volumes = np.fromiter(
+            (np.nan if r[3] is None else float(r[3]) for r in rows), dtype=float, count=n
+        )
+
+        dates, date_index = np.unique(row_dates, return_inverse=True)
+        asset_index = np.searchsorted(asset_ids, row_assets)
+        known = (asset_index < len(asset_ids)) & (
+            asset_ids[np.minimum(asset_index, len(asset_ids) - 1)] == row_assets
+        )
+
+        prices = np.full((len(asset_ids), len(dates)), np.nan)
+        volumes = np.full((len(asset_ids), len(dates)), np.nan)
+        prices[asset_index[known], date_index[known]] = row_prices[known]
+        volumes[asset_index[known], date_index[known]] = row_volumes[known]
+        return cls(assets, dates, prices, volumes, version)
+
+    def rows_for(self, symbols):
+        """Matrix row indexes for symbols (all assets when empty); ValueError if unknown."""
+        if not symbols:
+            return list(range(len(self.symbols)))
+        unknown = [s for s in symbols if s.upper() not in self._row_by_symbol]
+        if unknown:
+            raise ValueError(f"Unknown symbol(s): {', '.join(unknown)}")
+        return [self._row_by_symbol[s.upper()] for s in symbols]
+
+    def date_slice(self, start=None, end=None):
+        """Column slice covering obs_date in [start, end] (ISO strings or None)."""
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(start, "D"), "left")
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(end, "D"), "right")
+        return slice(int(lo), int(hi))
+
+    def daily_returns(self, rows):
+        """
+        Simple return between consecutive observations of each asset, placed
+        on the later date (NaN where the asset has no observation that day).
+        """
+        prices = self.prices[rows]
+        filled = _forward_fill(prices)
+        returns = np.full(prices.shape, np.nan)
+        returns[:, 1:] = prices[:, 1:] / filled[:, :-1] - 1.0
+        return returns
+
+    def total_returns(self, rows, columns):
+        """Return from each asset's first to its last observed price within `columns`."""
+        prices = self.prices[rows][:, columns]
+        if not prices.shape[1]:
+            return np.full(len(rows), np.nan)
+        last = _forward_fill(prices)[:, -1]
+        first = _forward_fill(prices[:, ::-1])[:, -1]
+        return last / first - 1.0
+
+    def rolling_mean(self, rows, window, min_periods=None):
+        """
+        Mean price over the trailing `window` dates, ignoring gaps. A value
+        needs at least `min_periods` observations in its window (default 80%
+        of the window), so an isolated missing day doesn't blank a whole window.
+        """
+        min_periods = min_periods or _default_min_periods(window)
+        total, _, count = _rolling_sums(self.prices[rows], window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+        mean[count < min_periods] = np.nan
+        mean[np.isnan(self.prices[rows])] = np.nan
+        return mean
+
+    def rolling_volatility(self, rows, window, min_periods=None, annualize=True):
+        """Sample standard deviation of daily returns over the trailing `window` dates."""
+        min_periods = max(min_periods or _default_min_periods(window), 2)
+        returns = self.daily_returns(rows)
+        total, squares, count = _rolling_sums(returns, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            variance = (squares - total * total / count) / (count - 1)
+        volatility = np.sqrt(np.clip(variance, 0.0, None))
+        volatility[count < min_periods] = np.nan
+        volatility[np.isnan(returns)] = np.nan
+        if annualize:
+            volatility *= np.sqrt(TRADING_DAYS_PER_YEAR)
+        return volatility
+
+    def drawdowns(self, rows, columns):
+        """
+        Drawdown from the running peak within `columns`, plus per-asset
+        (max_drawdown, peak column, trough column) relative to the slice.
+        """
+        prices = _forward_fill(self.prices[rows][:, columns])
+        peaks = np.fmax.accumulate(prices, axis=1)
+        with np.errstate(invalid="ignore"):
+            drawdown = prices / peaks - 1.0
+        drawdown[np.isnan(self.prices[rows][:, columns])] = np.nan
+
+        summary = []
+        filled = np.where(np.isnan(drawdown), np.inf, drawdown)
+        troughs = np.argmin(filled, axis=1) if filled.shape[1] else np.zeros(len(rows), int)
+        for i, trough in enumerate(troughs):
+            if not filled.shape[1] or np.isinf(filled[i, trough]):
+                summary.append((None, None, None))
+                continue
+            peak = int(np.nanargmax(prices[i, : trough + 1]))
+            summary.append((float(drawdown[i, trough]), peak, int(trough)))
+        return drawdown, summary
+
+    def correlation(self, rows, columns):
+        """
+        Pairwise-complete correlation of daily returns: each pair uses the
+        dates on which both assets have a return. Returns (matrix, counts).
+        """
+        returns = self.daily_returns(rows)[:, columns]
+        mask = (~np.isnan(returns)).astype(float)
+        x = np.where(mask > 0, returns, 0.0)
+        n = mask @ mask.T
+        sx = x @ mask.T  # sx[i, j]: sum of i's returns on dates j also has one
+        sxx = (x * x) @ mask.T
+        sxy = x @ x.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxy - sx * sx.T
+            var = n * sxx - sx * sx
+            corr = cov / np.sqrt(var * var.T)
+        corr[n < 3] = np.nan
+        return np.clip(corr, -1.0, 1.0), n.astype(int)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "assets": len(self.symbols),
+            "dates": len(self.dates),
+            "first_date": str(self.dates[0]) if len(self.dates) else None,
+            "last_date": str(self.dates[-1]) if len(self.dates) else None,
+            "bytes": int(self.prices.nbytes + self.volumes.nbytes + self.dates.nbytes),
+        }
+
+
+def to_json_list(values, decimals=6):
+    """Array -> list for JSON, with NaN as None."""
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, decimals).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
+
+
+def dates_to_json(dates):
+    return np.datetime_as_string(dates, unit="D").tolist()